@@ -1,6 +1,7 @@
 import asyncio
 import json
 import os
+from itertools import islice
 
 import streamlit as st
 from db import DB
@@ -8,6 +9,7 @@ from text2sql import Text2sqlQuestion, enrich_all_dbs, execute_questions, load_d
 from utils import evaluate_execution_accuracy, get_schema_from_file, load_benchmark
 
 from agentics import AG
+from agentics.core.utils import iter_json_array
 
 if "benchmark_questions" not in st.session_state:
     st.session_state.benchmark_questions = AG(atype=Text2sqlQuestion)
@@ -26,13 +28,11 @@ with st.sidebar:
 def select_benchmark(benchmark_id):
     st.session_state.benchmark_metadata = load_benchmark(benchmark_id)
     if "datasource_url" in st.session_state.benchmark_metadata:
-        questions = json.load(
-            open(
-                os.path.join(os.getenv("SQL_BENCHMARKS_FOLDER"), benchmark_id + ".json")
-            )
+        questions = iter_json_array(
+            os.path.join(os.getenv("SQL_BENCHMARKS_FOLDER"), benchmark_id + ".json")
         )
         st.session_state.benchmark_questions = AG(atype=Text2sqlQuestion)
-        for question in questions[: n_questions if n_questions > 0 else None]:
+        for question in islice(questions, n_questions if n_questions > 0 else None):
             st.session_state.benchmark_questions.states.append(
                 Text2sqlQuestion(
                     question=question["page_content"],
@@ -91,14 +91,7 @@ async def get_schema(state: Text2sqlQuestion) -> Text2sqlQuestion:
 
 async def enrich_all_dbs(test: AG):
     print("OOOOOOOO")
-    dbs = set()
-    filtered_test = AG(atype=Text2sqlQuestion)
-    for question in test:
-        # print(question.db_id)
-        if question.db_id not in dbs:
-            filtered_test.states.append(question)
-            dbs.add(question.db_id)
-
+    filtered_test = test.distinct("db_id")
     filtered_test = await filtered_test.amap(load_db)
     return await filtered_test.amap(enrich_db)
 
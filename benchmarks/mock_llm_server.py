@@ -0,0 +1,294 @@
+"""
+A local OpenAI-compatible chat completion stub used to benchmark Agentics
+without calling a paid LLM provider.
+
+The server answers ``POST /v1/chat/completions`` with a fake completion after
+sleeping for a latency sampled from a configurable distribution. When the request
+carries a JSON schema (vLLM ``guided_json`` or OpenAI ``response_format``) the
+completion content is a random JSON object conforming to that schema, so it can
+be validated into the target atype.
+
+Usage:
+    with MockLLMServer(latency="lognormal:50,0.5", error_rate=0.01) as server:
+        llm = AsyncOpenAI(api_key="EMPTY", base_url=server.url)
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class LatencyModel:
+    """
+    Latency distribution of the mock server, expressed in milliseconds.
+
+    Specs are strings of the form ``<kind>:<params>``:
+        - ``fixed:50``            always 50ms
+        - ``uniform:20,80``       uniformly distributed between 20ms and 80ms
+        - ``lognormal:50,0.5``    log-normal with median 50ms and sigma 0.5
+    """
+
+    kind: str = "fixed"
+    params: List[float] = field(default_factory=lambda: [0.0])
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        kind, _, params = spec.partition(":")
+        values = [float(x) for x in params.split(",") if x.strip()] or [0.0]
+        if kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {kind}")
+        return cls(kind=kind, params=values)
+
+    def sample(self, rng: random.Random) -> float:
+        """Returns a latency in seconds"""
+        if self.kind == "uniform":
+            low, high = self.params[0], self.params[-1]
+            ms = rng.uniform(low, high)
+        elif self.kind == "lognormal":
+            median = self.params[0]
+            sigma = self.params[1] if len(self.params) > 1 else 0.5
+            ms = rng.lognormvariate(0, sigma) * median
+        else:
+            ms = self.params[0]
+        return max(ms, 0.0) / 1000
+
+
+def fake_from_schema(
+    schema: Dict[str, Any],
+    rng: random.Random,
+    root: Optional[Dict[str, Any]] = None,
+    depth: int = 0,
+) -> Any:
+    """Generate a random value conforming to a (pydantic generated) JSON schema"""
+    root = root or schema
+    if "$ref" in schema:
+        ref = schema["$ref"].split("/")[-1]
+        return fake_from_schema(
+            root.get("$defs", {}).get(ref, {}), rng, root=root, depth=depth
+        )
+    if "enum" in schema:
+        return rng.choice(schema["enum"])
+    if "const" in schema:
+        return schema["const"]
+    for key in ("anyOf", "oneOf"):
+        if key in schema:
+            options = [x for x in schema[key] if x.get("type") != "null"]
+            if not options:
+                return None
+            return fake_from_schema(options[0], rng, root=root, depth=depth)
+    if "allOf" in schema:
+        return fake_from_schema(schema["allOf"][0], rng, root=root, depth=depth)
+
+    kind = schema.get("type")
+    if isinstance(kind, list):
+        kind = next((x for x in kind if x != "null"), None)
+    if kind == "object" or "properties" in schema:
+        if depth > 5:
+            return {}
+        return {
+            name: fake_from_schema(prop, rng, root=root, depth=depth + 1)
+            for name, prop in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        if depth > 5:
+            return []
+        return [
+            fake_from_schema(schema.get("items", {}), rng, root=root, depth=depth + 1)
+            for _ in range(rng.randint(1, 3))
+        ]
+    if kind == "string":
+        return "mock-" + "".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=8))
+    if kind == "integer":
+        return rng.randint(0, 1000)
+    if kind == "number":
+        return round(rng.random(), 4)
+    if kind == "boolean":
+        return rng.random() < 0.5
+    return None
+
+
+def extract_schema(request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Returns the JSON schema the completion has to conform to, if any"""
+    if "guided_json" in request:
+        return request["guided_json"]
+    response_format = request.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        return response_format.get("json_schema", {}).get("schema")
+    return None
+
+
+class MockLLMServer:
+    """
+    OpenAI-compatible stub running its own asyncio loop in a background thread.
+
+    Args:
+        latency: latency spec, see LatencyModel
+        error_rate: probability of answering a request with HTTP 500
+        seed: seed for latencies, errors and fake content
+        host, port: bind address, port 0 picks a free port
+
+    Attributes:
+        latencies: server side latency (seconds) of every served request
+        n_requests, n_errors: request counters
+    """
+
+    def __init__(
+        self,
+        latency: str = "fixed:0",
+        error_rate: float = 0.0,
+        seed: int = 42,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.latency = LatencyModel.parse(latency)
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.host = host
+        self.port = port
+        self.latencies: List[float] = []
+        self.n_requests = 0
+        self.n_errors = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    def reset_stats(self):
+        self.latencies = []
+        self.n_requests = 0
+        self.n_errors = 0
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def __enter__(self) -> "MockLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(
+                self._handle_connection, self.host, self.port, backlog=4096
+            )
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._server.close()
+            pending = asyncio.all_tasks(self._loop)
+            for task in pending:
+                task.cancel()
+            self._loop.run_until_complete(
+                asyncio.gather(*pending, return_exceptions=True)
+            )
+            self._loop.close()
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await self._respond(method, path, body)
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status}\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    "Connection: keep-alive\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+        except (
+            ConnectionError,
+            asyncio.IncompleteReadError,
+            asyncio.CancelledError,
+            ValueError,
+        ):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, method: str, path: str, body: bytes):
+        if method == "GET" and path.rstrip("/").endswith("/models"):
+            return "200 OK", {
+                "object": "list",
+                "data": [{"id": "mock", "object": "model", "owned_by": "agentics"}],
+            }
+        if not path.rstrip("/").endswith("/chat/completions"):
+            return "404 Not Found", {"error": {"message": f"Unknown path {path}"}}
+
+        start = time.perf_counter()
+        self.n_requests += 1
+        request = json.loads(body or b"{}")
+        await asyncio.sleep(self.latency.sample(self.rng))
+        if self.rng.random() < self.error_rate:
+            self.n_errors += 1
+            self.latencies.append(time.perf_counter() - start)
+            return "500 Internal Server Error", {
+                "error": {"message": "Injected mock error", "type": "server_error"}
+            }
+
+        schema = extract_schema(request)
+        if schema:
+            content = json.dumps(fake_from_schema(schema, self.rng))
+        else:
+            content = "mock completion " + str(self.n_requests)
+        prompt_tokens = sum(
+            len(str(m.get("content", "")).split()) for m in request.get("messages", [])
+        )
+        self.latencies.append(time.perf_counter() - start)
+        return "200 OK", {
+            "id": f"chatcmpl-mock-{self.n_requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model") or "mock",
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                    "logprobs": None,
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(content.split()),
+                "total_tokens": prompt_tokens + len(content.split()),
+            },
+        }
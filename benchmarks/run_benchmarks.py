@@ -0,0 +1,267 @@
+"""
+End-to-end load test of Agentics against a local mock OpenAI-compatible LLM.
+
+Drives AG.amap, AG.__lshift__ (<<), AG.self_transduction and AG.map_atypes at
+increasing numbers of states and reports throughput, p50/p99 latency and peak
+memory (measured by a second, separate run) for each scenario. No tokens are
+consumed: every completion is served by benchmarks.mock_llm_server.MockLLMServer.
+
+Examples:
+    python -m benchmarks.run_benchmarks --sizes 1000 10000 --latency lognormal:50,0.5
+    python -m benchmarks.run_benchmarks --sizes 1000 --output report.json \
+        --baseline benchmarks/baseline.json --max-regression 0.25
+
+With --baseline the command exits with a non-zero status when the overhead of a
+scenario grows more than --max-regression above the baseline report, which makes
+it usable as a CI performance gate. Throughput and latencies depend on the machine,
+so the gate compares a machine-independent measure instead: the time a scenario
+spends above the latency floor of the mock server (the server-side latencies of
+its requests, run MAX_CONCURRENCY at a time), per item, expressed in iterations of
+a pure-Python calibration loop timed on the same machine.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field, create_model
+
+from benchmarks.mock_llm_server import MockLLMServer
+
+SCENARIOS = ("amap", "lshift", "self_transduction", "map_atypes")
+
+# map_atypes issues one request per target attribute and every prompt embeds both
+# schemas, so the number of attributes is capped to keep prompts realistic.
+MAX_MAPPED_ATTRIBUTES = 200
+
+
+class Review(BaseModel):
+    text: Optional[str] = None
+    sentiment: Optional[str] = Field(None, description="positive, negative or neutral")
+    score: Optional[float] = None
+    topics: Optional[List[str]] = None
+
+
+class ReviewSummary(BaseModel):
+    summary: Optional[str] = None
+    sentiment: Optional[str] = None
+    score: Optional[float] = None
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, round(q * (len(values) - 1))))
+    return values[k]
+
+
+def calibrate(seconds: float = 0.05, repeats: int = 3) -> float:
+    """Iterations per second of a pure-Python loop (dicts, strings, json), best of repeats"""
+    best = 0.0
+    for _ in range(repeats):
+        n, start = 0, time.perf_counter()
+        while (elapsed := time.perf_counter() - start) < seconds:
+            for i in range(100):
+                json.dumps({"id": i, "text": str(i) * 4, "values": [i, i + 1]})
+            n += 100
+        best = max(best, n / elapsed)
+    return best
+
+
+def make_reviews(n: int) -> List[Review]:
+    return [Review(text=f"review number {i}: the product was fine") for i in range(n)]
+
+
+async def run_scenario(scenario: str, n_states: int, server: MockLLMServer):
+    """
+    Runs one scenario, returns (n_output_states, seconds, latencies).
+
+    seconds is the duration of the Agentics call alone (not of building its inputs).
+    Latencies are measured on the client side, from the start of that call to the
+    arrival of every result (a successful LLM response or a mapped state), so they
+    include the scheduling and concurrency limits of Agentics and not only the
+    latency injected by the server.
+    """
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+    from agentics import AG
+
+    completions: List[float] = []
+
+    async def on_response(response):
+        if response.status_code < 400:
+            completions.append(time.perf_counter())
+
+    # transport errors are retried by AsyncExecutor only, not by the client
+    llm = AsyncOpenAI(
+        api_key="EMPTY",
+        base_url=server.url,
+        max_retries=0,
+        http_client=DefaultAsyncHttpxClient(event_hooks={"response": [on_response]}),
+    )
+    try:
+        return await _run_scenario(AG, scenario, n_states, llm, completions)
+    finally:
+        await llm.close()
+
+
+async def _run_scenario(AG, scenario: str, n_states: int, llm, completions: List):
+    source = AG(atype=Review, states=make_reviews(n_states), llm=llm)
+    source.verbose_transduction = False
+
+    if scenario == "amap":
+
+        async def enrich(state: Review) -> Review:
+            await asyncio.sleep(0)
+            state.score = float(len(state.text))
+            completions.append(time.perf_counter())
+            return state
+
+        call = source.amap(enrich)
+    elif scenario == "lshift":
+        target = AG(atype=ReviewSummary, llm=llm, verbose_transduction=False)
+        call = target << source
+    elif scenario == "self_transduction":
+        call = source.self_transduction(["text"], ["sentiment", "score"])
+    elif scenario == "map_atypes":
+        n_fields = min(n_states, MAX_MAPPED_ATTRIBUTES)
+        wide_atype = create_model(
+            "WideTarget",
+            **{f"attribute_{i}": (Optional[str], None) for i in range(n_fields)},
+        )
+        target = AG(atype=wide_atype, llm=llm, verbose_transduction=False)
+        call = target.map_atypes(source)
+    else:
+        raise ValueError(f"Unknown scenario {scenario}")
+
+    start = time.perf_counter()
+    output = await call
+    elapsed = time.perf_counter() - start
+    n_output = (
+        len(output.attribute_mappings) if scenario == "map_atypes" else len(output)
+    )
+    return n_output, elapsed, [x - start for x in completions]
+
+
+def benchmark(
+    scenario: str, n_states: int, server: MockLLMServer, calibration: float
+) -> Dict[str, float]:
+    from agentics.core.async_executor import MAX_CONCURRENCY
+
+    server.reset_stats()
+    n_output, elapsed, latencies = asyncio.run(run_scenario(scenario, n_states, server))
+    n_requests, n_errors = server.n_requests, server.n_errors
+    latency_floor = sum(server.latencies) / MAX_CONCURRENCY
+
+    # memory is measured by a separate run, tracemalloc slows down every allocation
+    tracemalloc.start()
+    asyncio.run(run_scenario(scenario, n_states, server))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    n_items = n_requests or n_output
+    return {
+        "scenario": scenario,
+        "n_states": n_states,
+        "n_output": n_output,
+        "n_requests": n_requests,
+        "n_errors": n_errors,
+        "seconds": round(elapsed, 4),
+        "throughput": round(n_items / elapsed, 2) if elapsed else None,
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 3) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3) if latencies else None,
+        "mean_ms": (
+            round(statistics.fmean(latencies) * 1000, 3) if latencies else None
+        ),
+        "peak_memory_mb": round(peak / 2**20, 2),
+        "overhead_per_item": round(
+            max(elapsed - latency_floor, 0) * calibration / n_items, 3
+        ),
+    }
+
+
+def compare_with_baseline(
+    results: List[Dict], baseline: List[Dict], max_regression: float
+) -> List[str]:
+    """Returns the list of scenarios whose overhead per item regressed"""
+    reference = {(x["scenario"], x["n_states"]): x for x in baseline}
+    regressions = []
+    for result in results:
+        ref = reference.get((result["scenario"], result["n_states"]))
+        if not ref or not ref.get("overhead_per_item"):
+            continue
+        if result["overhead_per_item"] > ref["overhead_per_item"] * (
+            1 + max_regression
+        ):
+            regressions.append(
+                f"{result['scenario']}@{result['n_states']}: "
+                f"{result['overhead_per_item']} > {ref['overhead_per_item']} "
+                "calibration iterations per item"
+            )
+    return regressions
+
+
+def print_report(results: List[Dict]):
+    header = f"{'scenario':<18}{'states':>8}{'req':>8}{'err':>6}{'sec':>10}{'items/s':>11}{'p50 ms':>10}{'p99 ms':>10}{'peak MB':>10}{'overhead':>10}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['scenario']:<18}{r['n_states']:>8}{r['n_requests']:>8}{r['n_errors']:>6}"
+            f"{r['seconds']:>10}{r['throughput']!s:>11}{r['p50_ms']!s:>10}"
+            f"{r['p99_ms']!s:>10}{r['peak_memory_mb']:>10}{r['overhead_per_item']:>10}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000])
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS)
+    )
+    parser.add_argument("--latency", default="fixed:0", help="e.g. lognormal:50,0.5")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("VLLM_MODEL_ID", "mock")
+    import agentics  # noqa: F401, imported here to keep it out of the measurements
+
+    calibration = calibrate()
+    results = []
+    with MockLLMServer(
+        latency=args.latency, error_rate=args.error_rate, seed=args.seed
+    ) as server:
+        for n_states in args.sizes:
+            for scenario in args.scenarios:
+                results.append(benchmark(scenario, n_states, server, calibration))
+
+    print_report(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_with_baseline(
+                results, json.load(f), args.max_regression
+            )
+        for regression in regressions:
+            print(f"Performance regression: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
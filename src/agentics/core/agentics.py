@@ -5,13 +5,14 @@ import random
 import time
 from collections.abc import Iterable
 from copy import copy, deepcopy
-from functools import partial, reduce
-from itertools import zip_longest
+from functools import partial
+from itertools import chain, islice, repeat, zip_longest
 from typing import (
     Any,
     Callable,
     Dict,
     Generic,
+    Iterator,
     List,
     Optional,
     Tuple,
@@ -26,30 +27,77 @@ from crewai import LLM
 from langchain_core.prompts import PromptTemplate
 from loguru import logger
 from pandas import DataFrame
-from pydantic import BaseModel, Field, ValidationError, create_model
+from pydantic import (
+    BaseModel,
+    Field,
+    PrivateAttr,
+    ValidationError,
+    field_validator,
+)
 
 from agentics.core.async_executor import (
+    MAX_CONCURRENCY,
     PydanticTransducerCrewAI,
+    PydanticTransducerLiteLLM,
     PydanticTransducerVLLM,
+    RawTransducer,
     aMap,
 )
 from agentics.core.atype import (
+    atype_json_schema,
+    cached_model,
+    compile_merge,
     copy_attribute_values,
+    copy_state,
+    csv_rows,
     get_active_fields,
+    infer_file_atype,
     make_all_fields_optional,
     pydantic_model_from_csv,
     pydantic_model_from_dataframe,
-    pydantic_model_from_dict,
     pydantic_model_from_jsonl,
+    pydantic_model_from_parquet,
+    pydantic_text_model_from_csv,
+    validate_states,
 )
 from agentics.core.errors import InvalidStateError
+from agentics.core.incremental import FingerprintStore, transduction_fingerprint
+from agentics.core.index import REDUCERS, JoinHow, StateIndexes, hash_join, hashable
 from agentics.core.llm_connections import available_llms, get_llm_provider
 from agentics.core.mapping import AttributeMapping, ATypeMapping
+from agentics.core.metrics import metrics
+from agentics.core.minhash import NearDuplicates, near_duplicates
+from agentics.core.sampling import reservoir_sample, stratified_sample
+from agentics.core.storage import (
+    BATCH_SIZE,
+    ROW_GROUP_SIZE,
+    ColumnarStates,
+    ProductStates,
+    SQLiteStates,
+    StateList,
+    StateStore,
+    dataframe_rows,
+    iter_json_lines,
+    iter_state_dicts,
+    iter_states_or_rows,
+    state_row,
+    states_to_dataframe,
+)
+from agentics.core.tools import prepare_tools
 from agentics.core.utils import (
-    clean_for_json,
+    chunk_states,
+    estimate_tokens,
+    gc_paused,
     is_str_or_list_of_str,
+    iter_chunks,
+    iter_json_array,
+    iter_jsonl_lines,
+    iter_jsonl_rows,
+    open_compressed,
     remap_dict_keys,
     sanitize_dict_keys,
+    sanitize_field_name,
+    write_chunks,
 )
 
 AG = TypeVar("AG", bound="AG")
@@ -66,6 +114,7 @@ class AG(BaseModel, Generic[T]):
     Internally, Agentics is implemented as a Pydantic model. It holds:
         •	atype: a reference to the Pydantic class shared by all objects in the list.
         •	states: a list of Pydantic instances, each validated to be of type atype.
+            States can also be held in a StateStore, e.g. ColumnarStates (see to_columnar).
         •	tools: a list of tools (CrewAI or Langchain) to be used for transduction
 
     """
@@ -83,15 +132,33 @@ class AG(BaseModel, Generic[T]):
         },
         description="prompt parameter for initializing Crew and Task",
     )
+    deduplicate_sources: bool = Field(
+        True,
+        description="""Send a single request for the states of a transduction whose source
+        prompts are identical, and copy its result to all of them""",
+    )
+    incremental_path: Optional[str] = Field(
+        None,
+        description="""SQLite file storing the fingerprints and outputs of transductions,
+        states whose fingerprint is found are not dispatched again (see agentics.core.incremental)""",
+    )
     instructions: Optional[str] = Field(
         """Generate an object of the specified type from the following input.""",
         description="Special instructions to be given to the agent for executing transduction",
     )
     llm: Any = Field(default_factory=get_llm_provider, exclude=True)
+    max_concurrency: Optional[int] = Field(
+        MAX_CONCURRENCY,
+        description="Max number of LLM calls of a transduction running at once, unbounded if None",
+    )
     max_iter: int = Field(
         3,
         description="Max number of iterations for the agent to provide a final transduction when using tools.",
     )
+    parallel_tool_calls: bool = Field(
+        False,
+        description="Give the agent a tool running several independent tool calls at once",
+    )
     prompt_template: Optional[str] = Field(
         None,
         description="Langchain style prompt pattern to be used when provided as an input for a transduction.  Refer to https://python.langchain.com/docs/concepts/prompt_templates/ ",
@@ -102,6 +169,11 @@ class AG(BaseModel, Generic[T]):
         description="if True, don't compose intentional instruction for Crew Task",
     )
     states: List[BaseModel] = []
+    tool_cache_ttl: Optional[float] = Field(
+        0,
+        description="""Seconds for which the result of a tool call is reused by identical calls
+        (same tool and arguments) of any state, never expires if None, not cached if 0 (default)""",
+    )
     tools: Optional[List[Any]] = Field(None, exclude=True)
     transduce_fields: Optional[List[str]] = Field(
         None,
@@ -116,9 +188,30 @@ class AG(BaseModel, Generic[T]):
     verbose_transduction: bool = True
     verbose_agent: bool = False
 
+    # lazily built field indexes used by the query operators (see agentics.core.index)
+    _indexes: Optional[StateIndexes] = PrivateAttr(default=None)
+
     class Config:
         model_config = {"arbitrary_types_allowed": True}
 
+    @field_validator("states", mode="wrap")
+    @classmethod
+    def _keep_state_store(cls, value, handler):
+        """
+        State stores are kept as they are instead of being copied into a list,
+        lists are held in a StateList, whose modifications are tracked by indexes
+        """
+        if isinstance(value, StateStore):
+            return value
+        return StateList(handler(value))
+
+    def __setattr__(self, name: str, value: Any):
+        if name == "states":
+            self._indexes = None
+            if type(value) is list:
+                value = StateList(value)
+        super().__setattr__(name, value)
+
     @property
     def __name__(self) -> str:
         """Returns the name of the atype"""
@@ -140,24 +233,92 @@ class AG(BaseModel, Generic[T]):
     ################################
     ##### Agentics Utilities   #####
     ################################
-    def clone(agentics_instance):
+    def clone(agentics_instance, deep: bool = False):
+        """
+        Returns a copy whose states can be modified independently (copy-on-write).
+        States are copied shallowly (model_copy): a field assigned on either copy
+        only changes that copy, while field values are shared until they are
+        replaced, so large nested values (e.g. a DB with its schema) are not
+        duplicated. By default nested mutable values (lists, dicts, nested models)
+        are therefore shared with the original, and mutating them in place (e.g.
+        list.append) is seen by both copies: use deep=True to copy them as well.
+        """
         copy_instance = copy(agentics_instance)
-        copy_instance.states = deepcopy(agentics_instance.states)
+        if deep:
+            copy_instance.states = deepcopy(agentics_instance.states)
+        elif isinstance(agentics_instance.states, StateStore):
+            copy_instance.states = copy(agentics_instance.states)
+        else:
+            copy_instance.states = [copy_state(x) for x in agentics_instance.states]
         copy_instance.tools = agentics_instance.tools  # shallow copy, ok if immutable
         return copy_instance
 
+    @property
+    def is_columnar(self) -> bool:
+        return isinstance(self.states, ColumnarStates)
+
+    def to_columnar(self) -> AG:
+        """Moves the states into an Arrow backed ColumnarStates store"""
+        if not self.is_columnar:
+            self.states = ColumnarStates.from_states(self.atype, self.states)
+        return self
+
+    def to_disk(self, path: Optional[str] = None, **kwargs) -> AG:
+        """
+        Moves the states into a SQLite backed SQLiteStates store, in path or in a
+        temporary file. kwargs are passed to SQLiteStates (page_size, cache_pages, ...)
+        """
+        if not isinstance(self.states, SQLiteStates):
+            self.states = SQLiteStates.from_states(
+                self.atype, self.states, path, **kwargs
+            )
+        return self
+
+    def to_list(self) -> AG:
+        """Materializes the states into a plain list of pydantic objects"""
+        if isinstance(self.states, StateStore):
+            self.states = list(self.states)
+        return self
+
+    def column(self, field: str) -> List[Any]:
+        """Returns the (model_dump) values of field for all states"""
+        if isinstance(self.states, StateStore):
+            return self.states.column(field)
+        return [row[field] for row in iter_state_dicts(self.states, [field])]
+
     def filter_states(self, start: int = None, end: int = None) -> AG:
         self.states = self.states[start:end]
         return self
 
-    def get_random_sample(self, percent: float) -> AG:
-        """An AG is returned with randomly selected states, given the percentage of samples to return."""
+    def get_random_sample(
+        self,
+        percent: float,
+        seed: Optional[int] = None,
+        stratify_by: Optional[str] = None,
+    ) -> AG:
+        """
+        An AG is returned with randomly selected states, given the percentage of samples to return.
+        Only the selected states are copied. With stratify_by, percent of the states
+        of each value of that field are selected. The sample is reproducible for a given seed.
+        """
         if not (0 <= percent <= 1):
             raise ValueError("Percent must be between 0 and 1")
 
-        sample_size = int(len(self.states) * percent)
-        output = self.clone()
-        output.states = random.sample(self.states, sample_size)
+        rng = random.Random(seed)
+        if stratify_by:
+            groups = self._state_indexes().groups([stratify_by])
+            positions = [
+                position
+                for group in groups.values()
+                for position in rng.sample(group, round(len(group) * percent))
+            ]
+            rng.shuffle(positions)
+        else:
+            sample_size = int(len(self.states) * percent)
+            positions = rng.sample(range(len(self.states)), sample_size)
+        output = self._take(positions)
+        if not isinstance(output.states, StateStore):
+            output.states = [copy_state(x) for x in output.states]
         return output
 
     #################
@@ -203,6 +364,134 @@ class AG(BaseModel, Generic[T]):
     def append(self, state: BaseModel):
         """Append the state into the list of states"""
         self.states.append(state)
+        if self._indexes is not None:
+            self._indexes.appended(self.states, state)
+
+    ###########################
+    ##### Query Operators #####
+    ###########################
+
+    def _state_indexes(self) -> StateIndexes:
+        if self._indexes is None or not self._indexes.valid_for(self.states):
+            self._indexes = StateIndexes(self.states, self.atype.model_fields)
+        return self._indexes
+
+    def drop_indexes(self) -> AG:
+        """Drops the field indexes, needed after modifying states in place"""
+        self._indexes = None
+        return self
+
+    def _take(self, positions: Iterable[int]) -> AG:
+        """A new AG with the states at positions (states are shared, not copied)"""
+        output = copy(self)
+        if isinstance(self.states, StateStore):
+            output.states = self.states.take(positions)
+        else:
+            output.states = [self.states[i] for i in positions]
+        return output
+
+    def where(
+        self, predicate: Optional[Callable[[BaseModel], bool]] = None, **conditions
+    ) -> AG:
+        """
+        Returns a new AG with the states satisfying all conditions, in their order.
+
+        Conditions are field=value (equality) or field__op=value with op in
+        eq, ne, gt, ge, lt, le, in. Equality and membership use a hash index on the
+        field, ranges a sorted index. predicate, if given, is applied to the states
+        selected by the conditions.
+
+        e.g.    questions.where(db_id="world_1", difficulty__in=["easy", "medium"])
+                people.where(age__ge=18, age__lt=65)
+        """
+        positions = self._state_indexes().where(conditions)
+        if predicate is not None:
+            positions = [i for i in positions if predicate(self.states[i])]
+        return self._take(positions)
+
+    def sort_by(self, *keys: str) -> AG:
+        """
+        Returns a new AG with the states sorted by keys (most significant first).
+        Prefix a field with "-" to sort it in descending order. None values go last.
+        """
+        return self._take(self._state_indexes().order(keys))
+
+    def distinct(self, *fields: str) -> AG:
+        """
+        Returns a new AG keeping the first state for each distinct value of fields
+        (or of the whole state if no fields are given), in their order.
+        """
+        if fields:
+            groups = self._state_indexes().groups(fields)
+            return self._take(positions[0] for positions in groups.values())
+        seen, positions = set(), []
+        for i, state in enumerate(iter_state_dicts(self.states)):
+            key = hashable(state)
+            if key not in seen:
+                seen.add(key)
+                positions.append(i)
+        return self._take(positions)
+
+    def group_by(self, *fields: str) -> Dict[Any, AG]:
+        """
+        Partitions the states by the values of fields. Returns a dict from the field
+        value (a tuple of values for several fields) to the AG of its states.
+        """
+        groups = self._state_indexes().groups(fields)
+        return {key: self._take(positions) for key, positions in groups.items()}
+
+    def aggregate(self, *fields: str, **aggregates: Tuple[str, Any]) -> AG:
+        """
+        Groups the states by fields and reduces each group to a single state, with
+        the group fields and one field per named aggregate (field, reducer). Reducers
+        are count, sum, mean, min, max, first, last, list, nunique or a function of
+        the list of values of the field in the group.
+
+        e.g.    questions.aggregate("db_id", n=("id", "count"), hard=("difficulty", "list"))
+        """
+        indexes = self._state_indexes()
+        if fields:
+            groups = list(indexes.groups(fields).values())
+        else:
+            groups = [list(range(len(self.states)))] if len(self.states) else []
+
+        new_fields = {
+            name: (Optional[self.atype.model_fields[name].annotation], None)
+            for name in fields
+        }
+        reducers = {}
+        for name, (field, reducer) in aggregates.items():
+            annotation = self.atype.model_fields[field].annotation
+            if callable(reducer):
+                reducers[name], annotation = reducer, Any
+            elif reducer in REDUCERS:
+                reducers[name] = REDUCERS[reducer]
+                if reducer in ("count", "nunique"):
+                    annotation = int
+                elif reducer == "mean":
+                    annotation = float
+                elif reducer == "list":
+                    annotation = List[annotation]
+            else:
+                raise ValueError(f"Unknown reducer: {reducer}")
+            new_fields[name] = (Optional[annotation], None)
+        aggregate_atype = cached_model(f"{self.__name__}__aggregate", **new_fields)
+
+        values = {
+            field: indexes.values(field)
+            for field in set(fields) | {field for field, _ in aggregates.values()}
+        }
+        rows = []
+        for positions in groups:
+            row = {field: values[field][positions[0]] for field in fields}
+            for name, (field, _) in aggregates.items():
+                row[name] = reducers[name]([values[field][i] for i in positions])
+            rows.append(row)
+
+        output = copy(self)
+        output.atype = aggregate_atype
+        output.states = validate_states(aggregate_atype, rows)
+        return output
 
     ######################################
     ##### aMapReduce Functionalities #####
@@ -210,11 +499,23 @@ class AG(BaseModel, Generic[T]):
 
     async def amap(self, func: StateOperator, timeout=None) -> AG:
         """Asynchronous map with exception-safe job gathering"""
+        if isinstance(self.states, StateStore) and self.states.map_chunk_size:
+            # only one chunk of states at a time is held in memory
+            output = self.states.empty()
+            for chunk in iter_chunks(self.states, self.states.map_chunk_size):
+                output.extend(await self._amap_states(func, chunk, timeout))
+            self.states = output
+        else:
+            self.states = await self._amap_states(func, self.states, timeout)
+        return self
 
+    async def _amap_states(
+        self, func: StateOperator, states: List[BaseModel], timeout=None
+    ) -> List[BaseModel]:
         mapper = aMap(func=func, timeout=timeout)
         try:
             results = await mapper.execute(
-                *self.states, description=f"Executing amap on {func.__name__}"
+                *states, description=f"Executing amap on {func.__name__}"
             )
             if self.transduction_logs_path:
                 with open(self.transduction_logs_path, "a") as f:
@@ -222,7 +523,7 @@ class AG(BaseModel, Generic[T]):
                         f.write(state.model_dump_json() + "\n")
 
         except Exception:
-            results = self.states
+            results = states
 
         _states = []
         n_errors = 0
@@ -230,16 +531,14 @@ class AG(BaseModel, Generic[T]):
             if isinstance(result, Exception):
                 if self.verbose_transduction:
                     logger.debug(f"⚠️ Error processing state {i}: {result}")
-                _states.append(self.states[i])
+                _states.append(states[i])
                 n_errors += 1
             else:
                 _states.append(result)
         if self.verbose_transduction:
             if n_errors:
                 logger.debug(f"Error, {n_errors} states have not been transduced")
-
-        self.states = _states
-        return self
+        return _states
 
     async def apply(self, func: StateOperator, first_n: Optional[int] = None) -> AG:
         """
@@ -259,11 +558,91 @@ class AG(BaseModel, Generic[T]):
             ] + self.states[first_n:]
         return self
 
-    async def areduce(self, func: StateReducer) -> AG:
-        output = await func(self.states)
+    async def areduce(
+        self,
+        func: StateReducer,
+        fan_in: Optional[int] = None,
+        token_budget: Optional[int] = None,
+    ) -> AG:
+        """
+        Reduce the states with an async reducer taking a list of states.
+
+        Without fan_in and token_budget the whole list is handed to a single reducer call.
+        Otherwise the reduction is hierarchical: states are split in chunks of at most
+        fan_in states (and at most token_budget estimated tokens), chunks are reduced
+        concurrently, and the partial results are reduced level by level until they fit
+        in a single chunk. func must be associative, e.g. a sum, a merge or a summary
+        produced by transduction_reducer.
+        """
+        states = self.states
+        if fan_in is not None and fan_in < 2:
+            raise ValueError("fan_in must be at least 2")
+        level = 0
+        while fan_in or token_budget:
+            chunks = chunk_states(states, max_size=fan_in, token_budget=token_budget)
+            if len(chunks) <= 1:
+                break
+            if len(chunks) == len(states):
+                # no two states fit together in token_budget, chunks can't be reduced
+                tokens = [estimate_tokens(state.model_dump_json()) for state in states]
+                largest = max(range(len(states)), key=tokens.__getitem__)
+                raise ValueError(
+                    f"State {largest} has {tokens[largest]} estimated tokens, no chunk "
+                    f"of two states fits in token_budget={token_budget} at level "
+                    f"{level + 1}, increase token_budget"
+                )
+            level += 1
+            mapper = aMap(func=func, timeout=self.timeout)
+            partials = await mapper.execute(
+                *chunks,
+                description=f"Reducing {len(states)} states in {len(chunks)} chunks, level {level}",
+            )
+            reduced = []
+            for partial in partials:
+                if isinstance(partial, Exception):
+                    raise partial
+                reduced.extend([partial] if isinstance(partial, BaseModel) else partial)
+            if len(reduced) >= len(states):
+                raise ValueError(
+                    f"Reducer {func.__name__} did not reduce the number of states at level {level}"
+                )
+            states = reduced
+
+        output = await func(states)
         self.states = [output] if isinstance(output, BaseModel) else output
+        if self.states and isinstance(self.states[0], BaseModel):
+            self.atype = type(self.states[0])
         return self
 
+    def transduction_reducer(
+        self,
+        atype: Optional[Type[BaseModel]] = None,
+        instructions: Optional[str] = None,
+    ) -> StateReducer:
+        """
+        Returns an LLM reducer for areduce, transducing a list of states into a single
+        state of atype (self.atype by default) using self.llm.
+        Partial results of a hierarchical reduction are reduced in the same way.
+        """
+        target_atype = atype or self.atype
+
+        async def reduce_by_transduction(states: List[BaseModel]) -> BaseModel:
+            target = AG(
+                atype=target_atype,
+                llm=self.llm,
+                tools=self.tools,
+                instructions=instructions
+                or f"Aggregate the following list of states into a single {target_atype.__name__}.",
+                verbose_transduction=self.verbose_transduction,
+            )
+            output = await (
+                target
+                << json.dumps([state.model_dump(mode="json") for state in states])
+            )
+            return output.states[0]
+
+        return reduce_by_transduction
+
     ##################################
     ##### Import Functionalities #####
     ##################################
@@ -294,50 +673,147 @@ class AG(BaseModel, Generic[T]):
         atype: Type[BaseModel] = None,
         max_rows: int = None,
         task_description: str = None,
+        columnar: bool = False,
+        trusted: bool = False,
     ) -> AG:
         """
         Import an object of type Agentics from a CSV file.
-        If atype is not provided it will be automatically inferred from the column names and
-        all attributes will be set as strings
+        If atype is not provided it will be automatically inferred from the header and the
+        first rows, detecting bool, int, float and date columns (see infer_file_atype)
+        If columnar is True, the file is read straight into ColumnarStates.
+        If trusted is True, rows are not validated (see validate_states).
         """
+        if columnar:
+            new_type = atype or pydantic_model_from_csv(csv_file)
+            try:
+                states = ColumnarStates.from_csv(new_type, csv_file, max_rows=max_rows)
+            except ValidationError as e:
+                if atype:
+                    raise
+                new_type = cls._csv_text_fallback(csv_file, e)
+                states = ColumnarStates.from_csv(new_type, csv_file, max_rows=max_rows)
+            return cls(states=states, atype=new_type, task_description=task_description)
+        (output,) = cls.iter_csv(
+            csv_file,
+            atype=atype,
+            chunk_size=None,
+            max_rows=max_rows,
+            trusted=trusted,
+            task_description=task_description,
+        )
+        return output
 
-        states: List = []
-        new_type = None
+    @classmethod
+    def iter_csv(
+        cls,
+        csv_file,
+        atype: Type[BaseModel] = None,
+        chunk_size: Optional[int] = 1000,
+        max_rows: Optional[int] = None,
+        columnar: bool = False,
+        trusted: bool = False,
+        **kwargs,
+    ) -> Iterator[AG]:
+        """
+        Reads a CSV file lazily, yielding Agentics of at most chunk_size states
+        (a single one with all states if chunk_size is None).
+        If atype is not provided it is inferred from the header and the first rows.
+        If a later row doesn't validate into the inferred atype, the file is read
+        with every column typed as str, from the chunk of that row onwards.
+        """
         if atype:
             logger.debug(
                 f"Importing Agentics of type {atype.__name__} from CSV {csv_file}"
             )
-            new_type = atype
-        else:
-            new_type = make_all_fields_optional(pydantic_model_from_csv(csv_file))
-        with open(csv_file, encoding="utf-8-sig") as f:
-            c_row = 0
-            for row in csv.DictReader(f):
-                if not max_rows or c_row < max_rows:
-                    state = new_type(**row)
-                    states.append(state)
-                c_row += 1
-        return cls(states=states, atype=new_type, task_description=task_description)
+            yield from cls._iter_csv_chunks(
+                csv_file, atype, chunk_size, max_rows, columnar, trusted, **kwargs
+            )
+            return
+        n_chunks = 0
+        try:
+            for output in cls._iter_csv_chunks(
+                csv_file,
+                pydantic_model_from_csv(csv_file),
+                chunk_size,
+                max_rows,
+                columnar,
+                trusted,
+                **kwargs,
+            ):
+                yield output
+                n_chunks += 1
+        except ValidationError as e:
+            outputs = cls._iter_csv_chunks(
+                csv_file,
+                cls._csv_text_fallback(csv_file, e),
+                chunk_size,
+                max_rows,
+                columnar,
+                trusted,
+                **kwargs,
+            )
+            yield from islice(outputs, n_chunks, None)
+
+    @classmethod
+    def _iter_csv_chunks(
+        cls,
+        csv_file,
+        atype: Type[BaseModel],
+        chunk_size: Optional[int],
+        max_rows: Optional[int],
+        columnar: bool,
+        trusted: bool,
+        **kwargs,
+    ) -> Iterator[AG]:
+        with open(csv_file, newline="", encoding="utf-8-sig") as f:
+            reader = csv.reader(f)
+            names = [sanitize_field_name(x) for x in next(reader, None) or []]
+            rows = islice((row for row in reader if row), max_rows)
+            rows = csv_rows(names, rows, atype)
+            yield from cls._iter_row_chunks(
+                atype, rows, chunk_size, columnar=columnar, trusted=trusted, **kwargs
+            )
+
+    @staticmethod
+    def _csv_text_fallback(csv_file, error: ValidationError) -> Type[BaseModel]:
+        """The all-str atype of a CSV file whose rows don't match its inferred atype"""
+        logger.warning(
+            f"Rows of {csv_file} don't match the atype inferred from its first rows "
+            f"({error.error_count()} errors), reading every column as str"
+        )
+        return pydantic_text_model_from_csv(csv_file)
 
     @classmethod
     def from_dataframe(
-        cls, dataframe: DataFrame, atype: Type[BaseModel] = None, max_rows: int = None
+        cls,
+        dataframe: DataFrame,
+        atype: Type[BaseModel] = None,
+        max_rows: int = None,
+        columnar: bool = False,
+        trusted: bool = False,
     ) -> AG:
         """
         Import an object of type Agentics from a Pandas DataFrame object.
         If atype is not provided it will be automatically inferred from the column names and
         all attributes will be set as strings
+        If columnar is True, the states are stored in ColumnarStates.
+        If trusted is True, rows are not validated (see validate_states).
         """
-        states: List[BaseModel] = []
         new_type = atype or pydantic_model_from_dataframe(dataframe)
         logger.debug(f"Importing Agentics of type {new_type.__name__} from DataFrame")
-
-        for i, row in dataframe.iterrows():
-            if max_rows and i >= max_rows:
-                break
-            state = new_type(**row.to_dict())
-            states.append(state)
-        return cls(states=states, atype=new_type)
+        if max_rows:
+            dataframe = dataframe.head(max_rows)
+        if columnar:
+            return cls(
+                states=ColumnarStates.from_dataframe(
+                    new_type, dataframe, validate=not trusted
+                ),
+                atype=new_type,
+            )
+        (output,) = cls._iter_row_chunks(
+            new_type, dataframe_rows(dataframe), None, trusted=trusted
+        )
+        return output
 
     @classmethod
     def from_jsonl(
@@ -346,44 +822,236 @@ class AG(BaseModel, Generic[T]):
         atype: Optional[Type[BaseModel]] = None,
         max_rows: Optional[int] = None,
         jsonl: bool = True,
+        columnar: bool = False,
+        trusted: bool = False,
     ) -> AG:
         """
         Import an object of type Agentics from jsonl file.
         If atype is not provided it will be automatically inferred from the json schema.
+        If jsonl is False the file holds a single json array of states.
+        If columnar is True, validated rows are stored in ColumnarStates without keeping
+        the pydantic objects around.
+        If trusted is True, rows are not validated (see validate_states).
+        """
+        (output,) = cls.iter_jsonl(
+            path_to_json_file,
+            atype=atype,
+            chunk_size=None,
+            max_rows=max_rows,
+            jsonl=jsonl,
+            columnar=columnar,
+            trusted=trusted,
+        )
+        return output
+
+    @classmethod
+    def iter_jsonl(
+        cls,
+        path_to_json_file: str,
+        atype: Optional[Type[BaseModel]] = None,
+        chunk_size: Optional[int] = 1000,
+        max_rows: Optional[int] = None,
+        jsonl: bool = True,
+        columnar: bool = False,
+        trusted: bool = False,
+        **kwargs,
+    ) -> Iterator[AG]:
+        """
+        Reads a jsonl file (or a json array file if jsonl is False) lazily, yielding
+        Agentics of at most chunk_size states (a single one with all states if
+        chunk_size is None). Json arrays are parsed incrementally.
+        If atype is not provided it will be automatically inferred from the first states.
+        Trusted rows are neither validated nor sanitized, their keys must be field names.
         """
         if jsonl:
-            states: List = []
-            c_row = 0
-            new_type = None
-            if atype:
-                new_type = atype
-            else:
-                new_type = pydantic_model_from_jsonl(path_to_json_file)
-            for line in open(path_to_json_file, encoding="utf-8"):
-                if not max_rows or c_row < max_rows:
-                    state_dict = sanitize_dict_keys(json.loads(line))
-                    states.append(new_type(**state_dict))
-                c_row += 1
-            return cls(states=states, atype=new_type)
+            new_type = atype or pydantic_model_from_jsonl(path_to_json_file)
+            rows = iter_jsonl_rows(path_to_json_file)
         else:
-            c_row = 0
-            input_states = json.load(open(path_to_json_file, encoding="utf-8"))
-            states = []
+            rows = iter_json_array(path_to_json_file)
+            new_type = atype or infer_file_atype(path_to_json_file, "json")
+        rows = islice(rows, max_rows)
+        if not trusted:
+            rows = map(sanitize_dict_keys, rows)
+        yield from cls._iter_row_chunks(
+            new_type, rows, chunk_size, columnar=columnar, trusted=trusted, **kwargs
+        )
+
+    @classmethod
+    def sample_jsonl(
+        cls,
+        path_to_json_file: str,
+        size: int,
+        atype: Optional[Type[BaseModel]] = None,
+        seed: Optional[int] = None,
+        stratify_by: Optional[str] = None,
+        trusted: bool = False,
+        **kwargs,
+    ) -> AG:
+        """
+        Samples size states (all states if fewer) uniformly from a (compressed) jsonl
+        file in a single pass, without loading the file (see agentics.core.sampling).
+        Only the sampled lines are parsed, unless stratify_by is given, in which case
+        size states are sampled for each value of that field.
+        States keep the order of the file, and the sample is reproducible for a given seed.
+        """
+        rng = random.Random(seed)
+        new_type = atype or pydantic_model_from_jsonl(path_to_json_file)
+        if stratify_by:
+            if stratify_by not in new_type.model_fields:
+                raise ValueError(f"Unknown field: {stratify_by}")
+
+            def stratum(row: dict) -> Any:
+                # keys are sanitized for the sampled rows only
+                for key, value in row.items():
+                    if sanitize_field_name(key) == stratify_by:
+                        return hashable(value)
+
+            rows = stratified_sample(
+                iter_jsonl_rows(path_to_json_file), size, key=stratum, rng=rng
+            )
+        else:
+            lines = reservoir_sample(iter_jsonl_lines(path_to_json_file), size, rng)
+            rows = [json.loads(line) for line in lines]
+        if not trusted:
+            rows = [sanitize_dict_keys(row) for row in rows]
+        (output,) = cls._iter_row_chunks(
+            new_type, rows, None, trusted=trusted, **kwargs
+        )
+        return output
+
+    @classmethod
+    def sample_csv(
+        cls,
+        csv_file: str,
+        size: int,
+        atype: Optional[Type[BaseModel]] = None,
+        seed: Optional[int] = None,
+        stratify_by: Optional[str] = None,
+        trusted: bool = False,
+        **kwargs,
+    ) -> AG:
+        """
+        Samples size states (all states if fewer) uniformly from a CSV file in a single
+        pass, without loading the file (see agentics.core.sampling). With stratify_by,
+        size states are sampled for each value of that column.
+        States keep the order of the file, and the sample is reproducible for a given seed.
+        """
+        rng = random.Random(seed)
+        new_type = atype or pydantic_model_from_csv(csv_file)
+        with open(csv_file, newline="", encoding="utf-8-sig") as f:
+            reader = csv.reader(f)
+            names = [sanitize_field_name(x) for x in next(reader, None) or []]
+            rows = (row for row in reader if row)
+            if stratify_by:
+                if stratify_by not in names:
+                    raise ValueError(f"Unknown column: {stratify_by}")
+                column = names.index(stratify_by)
+                rows = stratified_sample(
+                    rows,
+                    size,
+                    key=lambda row: row[column] if column < len(row) else None,
+                    rng=rng,
+                )
+            else:
+                rows = reservoir_sample(rows, size, rng)
+        try:
+            (output,) = cls._iter_row_chunks(
+                new_type,
+                csv_rows(names, rows, new_type),
+                None,
+                trusted=trusted,
+                **kwargs,
+            )
+        except ValidationError as e:
             if atype:
-                new_type = atype
+                raise
+            new_type = cls._csv_text_fallback(csv_file, e)
+            (output,) = cls._iter_row_chunks(
+                new_type,
+                csv_rows(names, rows, new_type),
+                None,
+                trusted=trusted,
+                **kwargs,
+            )
+        return output
+
+    @classmethod
+    def _iter_row_chunks(
+        cls,
+        atype: Type[BaseModel],
+        rows: Iterator[dict],
+        chunk_size: Optional[int],
+        columnar: bool = False,
+        trusted: bool = False,
+        **kwargs,
+    ) -> Iterator[AG]:
+        """Validates rows into Agentics of chunk_size states, always yields at least one"""
+        chunks = iter_chunks(rows, chunk_size) if chunk_size else iter([rows])
+        first = True
+        for chunk in chunks:
+            if columnar:
+                states = ColumnarStates.from_rows(atype, chunk, validate=not trusted)
             else:
-                new_type = (
-                    pydantic_model_from_dict(input_states[0])
-                    if len(input_states) > 0
-                    else BaseModel
-                )
+                states = validate_states(atype, chunk, trusted=trusted)
+            first = False
+            yield cls(states=states, atype=atype, **kwargs)
+        if first:
+            yield cls(states=[], atype=atype, **kwargs)
 
-            for state in input_states:
-                if not max_rows or c_row < max_rows:
-                    state_dict = sanitize_dict_keys(state)
-                    states.append(new_type(**state_dict))
-                c_row += 1
+    @classmethod
+    def from_parquet(
+        cls,
+        path: str,
+        atype: Optional[Type[BaseModel]] = None,
+        columns: Optional[List[str]] = None,
+        batch_rows: int = 10 * BATCH_SIZE,
+        max_rows: Optional[int] = None,
+        columnar: bool = True,
+    ) -> AG:
+        """
+        Import an object of type Agentics from a parquet file.
+        Only the columns mapping to atype fields (or to columns, when given) are read,
+        batch_rows rows at a time.
+        If atype is not provided it will be inferred from the arrow schema of the file.
+        States are stored in ColumnarStates unless columnar is False.
+        """
+        new_type = atype or pydantic_model_from_parquet(path, columns)
+        logger.debug(f"Importing Agentics of type {new_type.__name__} from {path}")
+        if columnar:
+            states = ColumnarStates.from_parquet(
+                new_type,
+                path,
+                columns=columns,
+                batch_rows=batch_rows,
+                max_rows=max_rows,
+            )
             return cls(states=states, atype=new_type)
+        states = []
+        for chunk in cls.iter_parquet(
+            path, new_type, columns=columns, batch_rows=batch_rows, max_rows=max_rows
+        ):
+            states.extend(chunk.states)
+        return cls(states=states, atype=new_type)
+
+    @classmethod
+    def iter_parquet(
+        cls,
+        path: str,
+        atype: Optional[Type[BaseModel]] = None,
+        columns: Optional[List[str]] = None,
+        batch_rows: int = 10 * BATCH_SIZE,
+        max_rows: Optional[int] = None,
+        columnar: bool = False,
+    ) -> Iterator[AG]:
+        """
+        Reads a parquet file lazily, yielding Agentics of at most batch_rows states,
+        so that only one batch of the file is decoded at a time.
+        """
+        new_type = atype or pydantic_model_from_parquet(path, columns)
+        for states in ColumnarStates.iter_parquet(
+            new_type, path, columns=columns, batch_rows=batch_rows, max_rows=max_rows
+        ):
+            yield cls(states=states if columnar else list(states), atype=new_type)
 
     ##################################
     ##### Export Functionalities #####
@@ -409,21 +1077,36 @@ class AG(BaseModel, Generic[T]):
         with open(csv_file, mode="w", newline="", encoding="utf-8") as f:
             writer = csv.DictWriter(f, fieldnames=field_names)
             writer.writeheader()
-            for state in self.states:
-                writer.writerow(state.model_dump())
+            for row in iter_state_dicts(self.states):
+                writer.writerow(row)
 
-    def to_jsonl(self, jsonl_file: str) -> Any:
+    def to_jsonl(
+        self,
+        jsonl_file: str,
+        compression: Optional[str] = None,
+        workers: int = 1,
+        chunk_size: int = BATCH_SIZE,
+    ) -> Any:
+        """
+        Export the states to a jsonl file, one line per state, written chunk_size
+        states at a time. compression is "gzip" or "zstd", inferred from the file
+        extension (.gz, .zst) when not given. With workers > 1, compression and
+        writes run in background threads (zstd on `workers` threads) while the
+        next chunk is serialized.
+        A state that can't be serialized is written as an empty atype on its line.
+        """
         if self.verbose_transduction:
             logger.debug(
                 f"Exporting {len(self.states)} states or atype {self.atype} to {jsonl_file}"
             )
-        with open(jsonl_file, mode="w", newline="", encoding="utf-8") as f:
-            for state in self.states:
-                try:
-                    f.write(json.dumps(clean_for_json(state)) + "\n")
-                except Exception as e:
-                    logger.debug(f"⚠️ Failed to serialize state: {e}")
-                    f.write(json.dumps(self.atype().model_dump()))
+        with open_compressed(
+            jsonl_file, "wb", compression=compression, threads=workers
+        ) as f:
+            write_chunks(
+                f,
+                iter_json_lines(self.states, self.atype, chunk_size=chunk_size),
+                background=workers > 1,
+            )
 
     def to_dataframe(self) -> DataFrame:
         """
@@ -432,8 +1115,28 @@ class AG(BaseModel, Generic[T]):
         Returns:
             DataFrame: A pandas DataFrame representing the current states.
         """
-        data = [state.model_dump() for state in self.states]
-        return pd.DataFrame(data)
+        if isinstance(self.states, ColumnarStates):
+            return self.states.to_dataframe()
+        return states_to_dataframe(self.atype, self.states)
+
+    def to_parquet(
+        self,
+        path: str,
+        row_group_size: int = ROW_GROUP_SIZE,
+        compression: str = "zstd",
+    ):
+        """
+        Export the states to a parquet file with one column per atype field,
+        written in row groups of row_group_size rows.
+        """
+        if self.verbose_transduction:
+            logger.debug(
+                f"Exporting {len(self.states)} states or atype {self.atype} to {path}"
+            )
+        states = self.states
+        if not isinstance(states, ColumnarStates):
+            states = ColumnarStates.from_states(self.atype, states)
+        states.to_parquet(path, row_group_size=row_group_size, compression=compression)
 
     ################################
     ##### Logical Transduction #####
@@ -444,22 +1147,36 @@ class AG(BaseModel, Generic[T]):
         Results are accumulated in the self instance and returned back as a result.
         Return None if the right operand is not of type AgenticList
         """
-        from agentics.core.atype import AGString
-
-        async def llm_call(input: AGString) -> AGString:
-            input.string = self.llm.call(input.string)
-            return input
-
-        if not self.atype and isinstance(other, str):
-            return self.llm.call(other)
-
         if not self.atype and is_str_or_list_of_str(other):
-            input_messages = AG(states=[AGString(string=x) for x in other])
-            input_messages = await input_messages.amap(llm_call)
-            return [x.string for x in input_messages.states]
+            # free text completions, running concurrently
+            transducer = RawTransducer(
+                llm=self.llm,
+                timeout=self.timeout,
+                max_concurrency=self.max_concurrency,
+            )
+            prompts = [other] if isinstance(other, str) else other
+            answers = await transducer.execute(
+                *prompts,
+                description="Completing prompts",
+                transient_pbar=self.transient_pbar,
+            )
+            if isinstance(other, str):
+                if isinstance(answers[0], Exception):
+                    raise answers[0]
+                return answers[0]
+            n_errors = sum(isinstance(x, Exception) for x in answers)
+            if n_errors and self.verbose_transduction:
+                logger.debug(f"Error: {n_errors} prompts have not been completed")
+            # failed prompts are returned as they are, as amap keeps failed states
+            return [
+                prompt if isinstance(answer, Exception) else answer
+                for prompt, answer in zip(prompts, answers)
+            ]
 
         output = self.clone()
-        output.states = []
+        output.states = (
+            self.states.empty() if isinstance(self.states, StateStore) else []
+        )
 
         input_prompts = (
             []
@@ -474,22 +1191,13 @@ class AG(BaseModel, Generic[T]):
                 prompt_template = PromptTemplate.from_template(other.prompt_template)
             else:
                 prompt_template = None
-            i = 0
-            for i in range(len(other.states)):
+            for source in iter_state_dicts(other.states, other.transduce_fields):
                 if prompt_template:
                     input_prompts.append(
-                        "SOURCE:\n"
-                        + prompt_template.invoke(
-                            other.states[i].model_dump(include=other.transduce_fields)
-                        ).text
+                        "SOURCE:\n" + prompt_template.invoke(source).text
                     )
                 else:
-                    input_prompts.append(
-                        "SOURCE:\n"
-                        + json.dumps(
-                            other.states[i].model_dump(include=other.transduce_fields)
-                        )
-                    )
+                    input_prompts.append("SOURCE:\n" + json.dumps(source))
 
         elif is_str_or_list_of_str(other):
             if isinstance(other, str):
@@ -538,12 +1246,55 @@ class AG(BaseModel, Generic[T]):
                 "Here is a list of few shots examples for your task:\n" + few_shots
             )
 
+        # Incremental transduction: states whose fingerprint is stored are not dispatched.
+        # The fingerprint covers the instructions as sent, with the few shots.
+        fingerprints, stored = None, {}
+        if self.incremental_path and isinstance(other, AG):
+            store = FingerprintStore(self.incremental_path)
+            schema = atype_json_schema(target_type)
+            model = getattr(self.llm, "model", None)
+            tools = [getattr(tool, "name", str(tool)) for tool in self.tools or []]
+            fingerprints = [
+                transduction_fingerprint(prompt, instructions, model, schema, tools)
+                for prompt in input_prompts
+            ]
+            stored = store.get_many(fingerprints)
+            dispatched = [i for i, x in enumerate(fingerprints) if x not in stored]
+            metrics.increment(
+                "transduction.reused", len(input_prompts) - len(dispatched)
+            )
+            if self.verbose_transduction:
+                logger.debug(
+                    f"Incremental transduction: {len(dispatched)}/{len(input_prompts)}"
+                    " new or changed states"
+                )
+            input_prompts = [input_prompts[i] for i in dispatched]
+
+        # Deduplication: one request per distinct prompt, copied back to its members
+        unique_prompts = input_prompts
+        if self.deduplicate_sources:
+            groups: Dict[str, int] = {}
+            members = [groups.setdefault(x, len(groups)) for x in input_prompts]
+            unique_prompts = list(groups)
+            metrics.increment("transduction.states", len(input_prompts))
+            metrics.increment(
+                "transduction.deduplicated", len(input_prompts) - len(unique_prompts)
+            )
+            if self.verbose_transduction and len(unique_prompts) < len(input_prompts):
+                logger.debug(
+                    f"Deduplication: {len(unique_prompts)} distinct sources for "
+                    f"{len(input_prompts)} states"
+                )
+
         # Perform Transduction
-        transducer_class = (
-            PydanticTransducerCrewAI
-            if type(self.llm) == LLM
-            else PydanticTransducerVLLM
-        )
+        # CrewAI agents are only needed to call tools, otherwise a single structured
+        # completion is requested per state
+        if type(self.llm) != LLM:
+            transducer_class = PydanticTransducerVLLM
+        elif self.tools:
+            transducer_class = PydanticTransducerCrewAI
+        else:
+            transducer_class = PydanticTransducerLiteLLM
         try:
             transduced_type = (
                 self.subset_atype(self.transduce_fields)
@@ -552,7 +1303,9 @@ class AG(BaseModel, Generic[T]):
             )
             pt = transducer_class(
                 transduced_type,
-                tools=self.tools,
+                tools=prepare_tools(
+                    self.tools, self.tool_cache_ttl, self.parallel_tool_calls
+                ),
                 llm=self.llm,
                 intentional_definiton=instructions,
                 verbose=self.verbose_agent,
@@ -561,13 +1314,43 @@ class AG(BaseModel, Generic[T]):
                 reasoning=self.reasoning,
                 **self.crew_prompt_params,
             )
-            transduced_results = await pt.execute(
-                *input_prompts,
-                description=f"Transducing {self.__name__} << {"AG[str]" if not isinstance(other, AG) else other.__name__}",
-                transient_pbar=self.transient_pbar
+            pt.max_concurrency = self.max_concurrency
+            transduced_results = (
+                await pt.execute(
+                    *unique_prompts,
+                    description=f"Transducing {self.__name__} << {"AG[str]" if not isinstance(other, AG) else other.__name__}",
+                    transient_pbar=self.transient_pbar,
+                )
+                if unique_prompts or fingerprints is None
+                else []
             )
+            if len(unique_prompts) < len(input_prompts):
+                transduced_results = [
+                    copy_state(transduced_results[i]) for i in members
+                ]
         except Exception as e:
-            transduced_results = self.states
+            transduced_results = (
+                self.states if fingerprints is None else [e] * len(input_prompts)
+            )
+
+        if fingerprints is not None:
+            # splice the stored outputs back in, and store the new ones
+            results = iter(transduced_results)
+            transduced_results, new_outputs = [], []
+            for fingerprint in fingerprints:
+                if fingerprint in stored:
+                    result = transduced_type.model_validate_json(stored[fingerprint])
+                else:
+                    result = next(results)
+                    # failed transductions (errors or None) are not stored
+                    if isinstance(result, BaseModel):
+                        new_outputs.append(
+                            (fingerprint, result.model_dump_json().encode())
+                        )
+                transduced_results.append(result)
+            store.put_many(new_outputs)
+            store.touch(stored)
+            store.close()
 
         n_errors = 0
         output_states = []
@@ -592,21 +1375,36 @@ class AG(BaseModel, Generic[T]):
                         f.write(self.atype().model_dump_json() + "\n")
 
         if isinstance(other, AG):
-            for i in range(len(other.states)):
-                output_state = output_states[i]
-                if isinstance(output_state, tuple):
-                    output_state_dict = dict([output_state])
-                else:
-                    output_state_dict = output_state.model_dump()
-
-                merged = self.atype(
-                    **(
-                        (self[i].model_dump() if len(self) > i else {})
-                        | other[i].model_dump()
-                        | output_state_dict
+            # target | source | output, with compiled merges of the field values.
+            # State stores are read as rows, not materialized state by state.
+            target_atype = self.atype if isinstance(self.states, StateStore) else None
+            source_atype = other.atype if isinstance(other.states, StateStore) else None
+            targets = chain(iter_states_or_rows(self.states), repeat(None))
+            merged_rows = []
+            with gc_paused():
+                for target, source, output_state in zip(
+                    targets, iter_states_or_rows(other.states), output_states
+                ):
+                    if isinstance(output_state, tuple):
+                        merged_rows.append(
+                            state_row(target) | state_row(source) | dict([output_state])
+                        )
+                        continue
+                    if target is not None:
+                        target_type = target_atype or type(target)
+                    else:
+                        target_type = None
+                    merge = compile_merge(
+                        self.atype,
+                        (target_type, None),
+                        (source_atype or type(source), None),
+                        (
+                            type(output_state) if output_state is not None else None,
+                            None,
+                        ),
                     )
-                )
-                output.states.append(merged)
+                    merged_rows.append(merge(target, source, output_state))
+            output.states.extend(validate_states(self.atype, merged_rows))
         # elif is_str_or_list_of_str(other):
         elif isinstance(other, list):
             for i in range(len(other)):
@@ -639,16 +1437,93 @@ class AG(BaseModel, Generic[T]):
         source_fields: List[str],
         target_fields: List[str],
         instructions: str = None,
+        incremental_path: Optional[str] = None,
     ):
+        """
+        Transduces source_fields into target_fields of the same states. With an
+        incremental_path, only states whose source fields (or the instructions,
+        model and target fields) changed since the previous run are dispatched.
+        """
         target = self.clone()
         self.transduce_fields = source_fields
         target.instructions = instructions or target.instructions
         target.transduce_fields = target_fields
+        target.incremental_path = incremental_path or target.incremental_path
 
         output_process = target << self
         output = await output_process
         return output
 
+    def near_duplicates(
+        self, field: str, threshold: float = 0.8, **kwargs
+    ) -> NearDuplicates:
+        """
+        Clusters the states whose text field values are near duplicates (estimated
+        Jaccard similarity of their shingles at least threshold), see
+        agentics.core.minhash.near_duplicates for the other options.
+        """
+        if field not in self.atype.model_fields:
+            raise ValueError(f"Unknown field: {field}")
+        values = self.column(field)
+        return near_duplicates(
+            (None if x is None else str(x) for x in values), threshold, **kwargs
+        )
+
+    async def transduce_near_duplicates(
+        self,
+        other: AG,
+        field: str,
+        threshold: float = 0.8,
+        flag_field: Optional[str] = None,
+        **kwargs,
+    ) -> AG:
+        """
+        Same as self << other, transducing only one representative state per cluster
+        of near duplicates of other (on its text field) and propagating its output
+        to the other members of the cluster.
+
+        If flag_field is given (a bool field of self.atype), it is set to True on the
+        states whose output was propagated rather than transduced, so that they can
+        be verified cheaply afterwards. The report of the clustering is logged.
+        """
+        if flag_field and flag_field not in self.atype.model_fields:
+            raise ValueError(f"Unknown field: {flag_field}")
+        clusters = other.near_duplicates(field, threshold, **kwargs)
+        representatives = clusters.representatives
+        # representatives are in increasing order, so the states of self taken as
+        # targets stay aligned with the representatives
+        target = self._take(i for i in representatives if i < len(self.states))
+        transduced = await (target << other._take(representatives))
+
+        output_fields = set(self.transduce_fields or self.atype.model_fields)
+        outputs = [state.model_dump(include=output_fields) for state in transduced]
+        rows = []
+        with gc_paused():
+            for i, source in enumerate(other.states):
+                label = clusters.labels[i]
+                if i == representatives[label]:
+                    row = transduced[label].model_dump()
+                else:
+                    target_state = self.states[i] if i < len(self.states) else None
+                    row = (
+                        (target_state.model_dump() if target_state else {})
+                        | source.model_dump()
+                        | outputs[label]
+                    )
+                if flag_field:
+                    row[flag_field] = i != representatives[label]
+                rows.append(row)
+        output = copy(transduced)
+        output.states = (
+            self.states.empty() if isinstance(self.states, StateStore) else []
+        )
+        output.states.extend(validate_states(self.atype, rows))
+
+        metrics.increment("transduction.near_duplicates_saved", clusters.calls_saved)
+        if self.verbose_transduction:
+            logger.debug(f"Near duplicate transduction: {clusters.report()}")
+        return output
+
     ########################################
     ##### aType Manipulation Functions #####
     ########################################
@@ -690,6 +1565,10 @@ class AG(BaseModel, Generic[T]):
 
         Usage: AG1 is an optimizer and AG2 is evaluation set.
         duplicate dataset AG2 per each AG1 optimization parameter set.
+
+        The product is a lazy view (ProductStates): combined states are built when
+        they are iterated, accessed or dispatched, and state i * len(AG2) + j
+        combines the i-th state of AG1 with the j-th state of AG2.
         """
         new_fields = {}
         for field in other.atype.model_fields.keys():
@@ -709,19 +1588,45 @@ class AG(BaseModel, Generic[T]):
                     description=self.atype.model_fields[field].description,
                 ),
             )
-        prod_atype = create_model(f"{self.__name__}__{other.__name__}", **new_fields)
+        prod_atype = cached_model(f"{self.__name__}__{other.__name__}", **new_fields)
 
-        extended_ags = []
-        for state in self.states:
-            extended_ag = deepcopy(other)
-            extended_ag.atype = prod_atype
-            extended_ag.states = [
-                prod_atype(**(other_state.model_dump() | state.model_dump()))
-                for other_state in other.states
-            ]
-            extended_ags.append(extended_ag)
+        product_ag = copy(other)
+        product_ag.atype = prod_atype
+        product_ag.states = ProductStates(
+            prod_atype, iter_state_dicts(self.states), iter_state_dicts(other.states)
+        )
+        return product_ag
 
-        return reduce((lambda x, y: AG.add_states(x, y)), extended_ags)
+    @classmethod
+    def concat(cls, *ags: AG) -> AG:
+        """
+        Concatenates the states of several AGs, in time linear in the total number
+        of states. The result takes the atype and settings of the first AG, states
+        of AGs with a different atype are converted to it. States are shared with
+        the input AGs, not copied.
+        """
+        if not ags:
+            raise ValueError("concat needs at least one AG")
+        first = ags[0]
+        output = copy(first)
+        if all(
+            isinstance(ag.states, ColumnarStates) and ag.atype is first.atype
+            for ag in ags
+        ):
+            output.states = ColumnarStates.concat(
+                first.atype, [copy(ag.states) for ag in ags]
+            )
+            return output
+        states = first.states.empty() if isinstance(first.states, StateStore) else []
+        for ag in ags:
+            if ag.atype is first.atype:
+                states.extend(ag.states)
+            else:
+                states.extend(
+                    validate_states(first.atype, list(iter_state_dicts(ag.states)))
+                )
+        output.states = states
+        return output
 
     def merge(self, other: "AG") -> "AG":
         """
@@ -733,8 +1638,22 @@ class AG(BaseModel, Generic[T]):
         Returns:
             AG with combined atype and merged states.
         """
+        merged_atype = self._merged_atype(other, "merge")
 
-        # 1) Build combined atype (prefer RIGHT field definitions on conflicts)
+        # Pairwise merge states (right wins on value conflicts)
+        merged_states = []
+        for left_state, right_state in zip_longest(
+            self.states, other.states, fillvalue=None
+        ):
+            left = left_state.model_dump() if left_state is not None else {}
+            right = right_state.model_dump() if right_state is not None else {}
+            data = left | right  # right overwrites left for same keys
+            merged_states.append(merged_atype(**data))
+
+        return AG(atype=merged_atype, states=merged_states)
+
+    def _merged_atype(self, other: "AG", operation: str) -> Type[BaseModel]:
+        """The union of the fields of both atypes, other wins on conflicts"""
         new_fields: Dict[str, tuple[Type, Field]] = {}
 
         # left first...
@@ -751,42 +1670,96 @@ class AG(BaseModel, Generic[T]):
                 Field(default=f.default, description=f.description),
             )
 
-        merged_atype = create_model(
-            f"{self.__name__}__merge__{other.__name__}", **new_fields
+        return cached_model(
+            f"{self.__name__}__{operation}__{other.__name__}", **new_fields
         )
 
-        # 2) Pairwise merge states (right wins on value conflicts)
-        merged_states = []
-        for left_state, right_state in zip_longest(
-            self.states, other.states, fillvalue=None
-        ):
-            left = left_state.model_dump() if left_state is not None else {}
-            right = right_state.model_dump() if right_state is not None else {}
-            data = left | right  # right overwrites left for same keys
-            merged_states.append(merged_atype(**data))
-
-        return AG(atype=merged_atype, states=merged_states)
+    def join(
+        self,
+        other: "AG",
+        on: Union[str, List[str], Dict[str, str]],
+        how: JoinHow = "inner",
+    ) -> "AG":
+        """
+        Hash join of two AGs on key fields, in linear time.
+
+        - on is a field name or a list of field names present in both atypes, or a
+          dict {self field: other field} when the key fields are named differently.
+        - how="inner" keeps matching pairs only, "left" also keeps the states of
+          self without a match, "outer" the unmatched states of both sides.
+        - The result atype is the one of merge: the union of the fields of both
+          atypes, other wins on name conflicts (for both schema and values). Its
+          fields are made optional for left and outer joins.
+
+        The smaller AG is loaded into a hash table and the larger one is streamed,
+        so the output follows the order of the larger AG. Joined states are written
+        in batches into a store of the same kind as self.states, so joins of
+        disk-backed AGs stream to disk.
+
+        e.g.    predictions.join(ground_truth, on="id", how="left")
+                matches.join(reference, on=["table", "column"])
+        """
+        if isinstance(on, str):
+            on = [on]
+        left_on, right_on = (
+            (list(on), list(on.values())) if isinstance(on, dict) else (on, on)
+        )
+        for fields, atype in ((left_on, self.atype), (right_on, other.atype)):
+            for field in fields:
+                if field not in atype.model_fields:
+                    raise ValueError(f"Unknown field: {field} in {atype.__name__}")
+
+        joined_atype = self._merged_atype(other, "join")
+        if how != "inner":
+            # unmatched states only fill in the fields of one side
+            joined_atype = make_all_fields_optional(
+                joined_atype, rename_type=joined_atype.__name__
+            )
+        output = copy(self)
+        output.atype = joined_atype
+        output.states = (
+            self.states.empty(joined_atype)
+            if isinstance(self.states, StateStore)
+            else []
+        )
+        rows = hash_join(
+            iter_state_dicts(self.states),
+            iter_state_dicts(other.states),
+            left_on,
+            right_on,
+            how=how,
+            build_left=len(self.states) < len(other.states),
+        )
+        for chunk in iter_chunks(rows, BATCH_SIZE):
+            output.states.extend(validate_states(joined_atype, chunk))
+        return output
 
-    def quotient(self, other: AG) -> List[AG]:
+    def quotient(self, other: AG, project: bool = True) -> List[AG]:
         """
         AG1.quotient(AG') returns the list of quotients [AG1]
 
         Revsers of the product, segment the states of AG'
 
         Usage: After evaluating the prompts we want separate the evaluated sets and reduce score from each
+
+        Segment k holds the states of AG' at offsets [k * len(AG1), (k + 1) * len(AG1)).
+        With project=False segments keep the atype of AG' and are slices of its
+        states, without copying them (views for lazy products and columnar states).
         """
         quotient_list = []
         quotient_size, quotient_counts = len(self.states), len(other.states) // len(
             self.states
         )
         for ind in range(quotient_counts):
-            quotient_ag = self.clone()
-            quotient_ag.states = [
-                self.atype(**(other_state.model_dump()))
-                for other_state in other.states[
-                    ind * quotient_size : (ind + 1) * quotient_size
-                ]
-            ]
+            segment = other.states[ind * quotient_size : (ind + 1) * quotient_size]
+            quotient_ag = copy(self)
+            if project:
+                quotient_ag.states = validate_states(
+                    self.atype, list(iter_state_dicts(segment))
+                )
+            else:
+                quotient_ag.atype = other.atype
+                quotient_ag.states = segment
             quotient_list.append(quotient_ag)
         return quotient_list
 
@@ -798,14 +1771,14 @@ class AG(BaseModel, Generic[T]):
         for target_attribute in self.atype.model_fields.items():
             target_attributes.append(
                 "TARGET_SCHEMA:\n"
-                + str(self.atype.model_json_schema())
+                + str(atype_json_schema(self.atype))
                 + "\nTARGET_ATTRIBUTE: "
                 + str(target_attribute[0])
                 + "\nSOURCE_SCHEMA:\n"
-                + str(other.atype.model_json_schema())
+                + str(atype_json_schema(other.atype))
             )
 
-        mappings = AG(atype=AttributeMapping)
+        mappings = AG(atype=AttributeMapping, llm=self.llm)
         mappings.instructions = f"""Map the TARGET_ATTRIBUTE to the right attribute of in the SOURCE_SCHEMA"""
         output = await (mappings << target_attributes)
         return ATypeMapping(
@@ -818,9 +1791,11 @@ class AG(BaseModel, Generic[T]):
         if self.verbose_agent:
             logger.debug(f"Mapping type {other.atype} into type {self.atype}")
 
-        target_schema_dict = self.atype.model_json_schema()
-        source_schema_dict = other.atype.model_json_schema()["properties"]
-        mappings = AG(atype=ATypeMapping, transduce_fields=["attribute_mappings"])
+        target_schema_dict = atype_json_schema(self.atype)
+        source_schema_dict = atype_json_schema(other.atype)["properties"]
+        mappings = AG(
+            atype=ATypeMapping, transduce_fields=["attribute_mappings"], llm=self.llm
+        )
         mappings.instructions = f"""provide each attribute mapping from the SOURCE schema to zero or more attributes of the TARGET schema, providing a pydantic output as instructed"""
         output = await (
             mappings
@@ -837,7 +1812,7 @@ class AG(BaseModel, Generic[T]):
             )
             for field in include_fields
         }
-        return create_model("_".join(include_fields), **fields)
+        return cached_model("_".join(include_fields), **fields)
 
     def rebind_atype(
         self, new_atype: Type[BaseModel], mapping: Dict[str, str] | None = None
@@ -857,23 +1832,34 @@ class AG(BaseModel, Generic[T]):
         Returns:
             AG: a new Agentics object with states of type `new_atype`.
         """
-        new_ag = deepcopy(self)
+        new_ag = copy(self)
         new_ag.atype = new_atype
-        new_ag.states = []
 
-        for state in self.states:
-            data = state.model_dump()
-
-            if mapping:
-                # keep only remapped keys
-                data = {mapping.get(k, k): v for k, v in data.items() if k in mapping}
+        if isinstance(self.states, StateStore):
+            # keep only remapped keys
+            rows = [
+                {mapping.get(k, k): v for k, v in row.items()} if mapping else row
+                for row in self.states.iter_dicts(list(mapping) if mapping else None)
+            ]
+        else:
+            # compiled projection reading only the mapped fields of each state
+            field_mapping = tuple(mapping.items()) if mapping else None
+            with gc_paused():
+                rows = [
+                    compile_merge(new_atype, (type(state), field_mapping))(state)
+                    for state in self.states
+                ]
 
-            try:
-                new_state = new_atype(**data)
-                new_ag.states.append(new_state)
-            except ValidationError as e:
-                # Skip or log; up to you how strict you want to be
-                logger.warning("Failed to rebind state %s: %s", state, e)
+        try:
+            new_ag.states = validate_states(new_atype, rows)
+        except ValidationError:
+            new_ag.states = []
+            for row in rows:
+                try:
+                    new_ag.states.append(new_atype.model_validate(row))
+                except ValidationError as e:
+                    # Skip or log; up to you how strict you want to be
+                    logger.warning(f"Failed to rebind state {row}: {e}")
 
         return new_ag
 
@@ -915,7 +1901,7 @@ class AG(BaseModel, Generic[T]):
         )
 
         # Create a new model with the added field
-        new_model = create_model(f"{self.__name__}_extended", **fields)
+        new_model = cached_model(f"{self.__name__}_extended", **fields)
 
         # Optionally re-assign it to self.atype
         return self.rebind_atype(new_model)
@@ -1,8 +1,10 @@
 import asyncio
+import json
 import os
+import re
 from abc import ABC, abstractmethod
 from collections.abc import Iterable
-from typing import Any, Callable, List, Type, Union
+from typing import Any, Callable, Dict, List, Type, Union
 
 from crewai import Agent, Crew, Process, Task
 from dotenv import load_dotenv
@@ -10,18 +12,28 @@ from loguru import logger
 from openai import AsyncOpenAI
 from pydantic import BaseModel
 
+from agentics.core.atype import atype_json_schema
+from agentics.core.cassette import cassette_call
 from agentics.core.llm_connections import watsonx_llm
 from agentics.core.utils import async_odered_progress, openai_response
 
 load_dotenv()
 
+# default bound on the number of LLM calls of a transduction running at once
+MAX_CONCURRENCY = 64
+# timeout in seconds of a structured completion when neither the AG nor its LLM set one
+COMPLETION_TIMEOUT = 200
+
 
 class AsyncExecutor(ABC):
 
     wait: int = 0.01
     max_retries: int = 2
+    max_concurrency: int | None = None
     timeout: int | None = None
+    progress_backend: str | None = None
     _retry: int = 0
+    _semaphore: asyncio.Semaphore | None = None
 
     model_config = {"arbitrary_types_allowed": True}
 
@@ -36,11 +48,18 @@ class AsyncExecutor(ABC):
     ) -> Union[BaseModel, Iterable[BaseModel]]:
         _inputs = []
         _indices = []
+        if self._retry == 0:
+            # shared by the retries, which count against the same bound
+            self._semaphore = (
+                asyncio.Semaphore(self.max_concurrency)
+                if self.max_concurrency
+                else None
+            )
         if len(inputs) == 1:
             # singular input awaits a single async call
             try:
                 return await asyncio.wait_for(
-                    self._execute(inputs[0]), timeout=self.timeout
+                    self._bounded_execute(inputs[0]), timeout=self.timeout
                 )
             except Exception as e:
                 if isinstance(e, Exception) and self._retry < self.max_retries:
@@ -51,10 +70,11 @@ class AsyncExecutor(ABC):
             # A list of inputs gathers all async calls as tasks
             answers = await async_odered_progress(
                 inputs,
-                self._execute,
+                self._bounded_execute,
                 description=description,
                 timeout=self.timeout,
                 transient_pbar=transient_pbar,
+                progress_backend=self.progress_backend,
             )
 
             for i, answer in enumerate(answers):
@@ -75,6 +95,13 @@ class AsyncExecutor(ABC):
         self._retry = 0
         return answers
 
+    async def _bounded_execute(self, input: Union[BaseModel, str]) -> Any:
+        """_execute, waiting for a slot when max_concurrency calls are running"""
+        if self._semaphore is None:
+            return await self._execute(input)
+        async with self._semaphore:
+            return await self._execute(input)
+
     @abstractmethod
     async def _execute(self, input: Union[BaseModel, str], **kwargs) -> BaseModel:
         pass
@@ -93,7 +120,41 @@ class aMap(AsyncExecutor):
         return output
 
 
+class RawTransducer(AsyncExecutor):
+    """Free text completion of prompts by an LLM, returning one string per prompt"""
+
+    llm: Any
+    max_concurrency: int | None = MAX_CONCURRENCY
+
+    def __init__(self, llm=None, model: str | None = None, **kwargs):
+        self.llm = llm or watsonx_llm
+        self.model = model or getattr(llm, "model", None) or os.getenv("VLLM_MODEL_ID")
+        super().__init__(**kwargs)
+
+    async def execute(self, *inputs: str, **kwargs) -> List[Union[str, Exception]]:
+        output = await super().execute(*inputs, **kwargs)
+        if not isinstance(output, list):
+            output = [output]
+        return output
+
+    async def _execute(self, input: str) -> str:
+        async def call() -> str:
+            if isinstance(self.llm, AsyncOpenAI):
+                return await openai_response(
+                    model=self.model, base_url=None, user_prompt=input, client=self.llm
+                )
+            # providers without an async API (CrewAI LLM) are called in worker threads
+            return await asyncio.to_thread(self.llm.call, input)
+
+        return await cassette_call(
+            "llm_call",
+            {"model": getattr(self.llm, "model", None), "prompt": input},
+            call,
+        )
+
+
 class PydanticTransducer(AsyncExecutor):
+    max_concurrency: int | None = MAX_CONCURRENCY
 
     async def execute(self, *inputs: str, **kwargs) -> List[BaseModel]:
         """Pydantic transduction always returns a list of pydantic models"""
@@ -121,6 +182,9 @@ class PydanticTransducerVLLM(PydanticTransducer):
         tools=None,
         intentional_definiton=None,
         timeout=10000,
+        max_iter=None,
+        reasoning=None,
+        model: str | None = None,
         **kwargs,
     ):
         self.atype = atype
@@ -128,67 +192,209 @@ class PydanticTransducerVLLM(PydanticTransducer):
         self.llm = llm
         self.tools = tools
         self.timeout = timeout
+        self.model = model or os.getenv("VLLM_MODEL_ID")
         self.intentional_definiton = (
             intentional_definiton
             or "Generate an object of the specified Pydantic Type from the following input."
         )
+        # crew prompt parameters are meaningful only for the CrewAI transducer
+        self.prompt_params = {
+            key: kwargs.pop(key)
+            for key in ("role", "goal", "backstory", "expected_output")
+            if key in kwargs
+        }
         self.llm_params = {
-            "extra_body": {"guided_json": self.atype.model_json_schema()},
+            "extra_body": {"guided_json": atype_json_schema(self.atype)},
             "logprobs": False,
             "n": 1,
         }
         self.llm_params.update(kwargs)
+        self.default_user_prompt = "\n".join(
+            [
+                self.intentional_definiton,
+                "Generate an object of the specified Pydantic Type from the following input.\n",
+            ]
+        )
 
-    async def execute(
+    async def _execute(self, input: str) -> BaseModel:
+        result = await openai_response(
+            model=self.model,
+            base_url=os.getenv("VLLM_URL"),
+            user_prompt=self.default_user_prompt + input[: self.MAX_CHAR_PROMPT],
+            client=self.llm if isinstance(self.llm, AsyncOpenAI) else None,
+            **self.llm_params,
+        )
+        return self.atype.model_validate_json(result)
+
+
+def _litellm_params(llm: Any) -> Dict[str, Any]:
+    """The litellm completion parameters set on a CrewAI LLM"""
+    params = {
+        name: getattr(llm, name, None)
+        for name in (
+            "model",
+            "temperature",
+            "top_p",
+            "max_tokens",
+            "seed",
+            "base_url",
+            "api_base",
+            "api_version",
+            "api_key",
+            "reasoning_effort",
+            "timeout",
+        )
+    }
+    params["max_tokens"] = params["max_tokens"] or getattr(
+        llm, "max_completion_tokens", None
+    )
+    params.update(getattr(llm, "additional_params", None) or {})
+    return {name: value for name, value in params.items() if value is not None}
+
+
+def _rejects_response_format(error: Exception) -> bool:
+    """Whether a completion failed because the provider doesn't support json schema"""
+    import litellm
+
+    if isinstance(error, litellm.UnsupportedParamsError):
+        return True
+    return isinstance(error, litellm.BadRequestError) and any(
+        x in str(error) for x in ("response_format", "json_schema")
+    )
+
+
+def _strip_code_fence(content: str) -> str:
+    """The json of a completion, some models wrap it in a ```json code block"""
+    content = content.strip()
+    if content.startswith("```"):
+        content = content.split("\n", 1)[-1].rsplit("```", 1)[0]
+    return content
+
+
+class PydanticTransducerLiteLLM(PydanticTransducer):
+    """
+    Transduction with a single completion per input in the structured output mode
+    of the provider (json schema of the atype), through the litellm async API.
+    Used instead of PydanticTransducerCrewAI for CrewAI LLMs when there are no
+    tools, which spares the agent prompts and iterations. Inputs are transduced
+    by a PydanticTransducerCrewAI instead once the provider rejects the json
+    schema response format.
+    """
+
+    llm: Any
+    intentional_definiton: str
+    verbose: bool = False
+    MAX_CHAR_PROMPT: int = 15000
+
+    def __init__(
         self,
-        input: Union[str, Iterable[str]],
-        logprobs: bool = False,
-        n_samples: int = 1,
+        atype: Type[BaseModel],
+        verbose: bool = False,
+        llm=None,
+        tools=None,
+        intentional_definiton=None,
+        timeout: float | None = 200,
+        max_iter=None,
+        reasoning=None,
         **kwargs,
-    ) -> Union[BaseModel, Iterable[BaseModel]]:
-
-        default_user_prompt = "\n".join(
+    ):
+        self.atype = atype
+        self.verbose = verbose
+        self.llm = llm or watsonx_llm
+        self.tools = tools or []
+        self.timeout = timeout
+        self.intentional_definiton = (
+            intentional_definiton
+            or "Generate an object of the specified Pydantic Type from the following input."
+        )
+        self.prompt_params = {
+            "role": "Task Executor",
+            "goal": "You execute tasks",
+            "backstory": "You are always faithful and provide only fact based answers.",
+            "expected_output": "Described by Pydantic Type",
+        }
+        self.prompt_params.update(kwargs)
+        self.max_iter = max_iter
+        self.fallback: "PydanticTransducerCrewAI | None" = None
+        self.llm_params = _litellm_params(self.llm)
+        if self.timeout is not None:
+            self.llm_params["timeout"] = self.timeout
+        self.llm_params.setdefault("timeout", COMPLETION_TIMEOUT)
+        schema = atype_json_schema(self.atype)
+        self.response_format = {
+            "type": "json_schema",
+            "json_schema": {
+                "name": re.sub(r"[^a-zA-Z0-9_-]", "_", self.atype.__name__)[:64],
+                "schema": schema,
+            },
+        }
+        self.system_prompt = "\n".join(
             [
-                self.intentional_definiton,
-                "Generate an object of the specified Pydantic Type from the following input.\n",
+                f"You are a {self.prompt_params['role']}. {self.prompt_params['goal']}.",
+                self.prompt_params["backstory"],
+                "Answer with a single JSON object conforming to this JSON schema:",
+                json.dumps(schema),
             ]
         )
-        self.llm_params.update(kwargs)
-        if isinstance(input, str):
-            result = await openai_response(
-                model=os.getenv("VLLM_MODEL_ID"),
-                base_url=os.getenv("VLLM_URL"),
-                user_prompt=default_user_prompt + str(state),
+
+    async def _execute(self, input: str) -> BaseModel:
+        if self.fallback is None:
+            try:
+                return await self._complete(input)
+            except Exception as e:
+                if not _rejects_response_format(e):
+                    raise
+                if self.fallback is None:  # concurrent calls may fail alike
+                    logger.warning(
+                        f"{self.llm_params.get('model')} doesn't support json schema "
+                        f"responses ({type(e).__name__}), transducing with CrewAI agents"
+                    )
+                    self.fallback = self._crewai_transducer()
+        return await self.fallback._execute(input)
+
+    def _crewai_transducer(self) -> "PydanticTransducerCrewAI":
+        return PydanticTransducerCrewAI(
+            self.atype,
+            verbose=self.verbose,
+            llm=self.llm,
+            tools=self.tools,
+            intentional_definiton=self.intentional_definiton,
+            max_iter=self.max_iter or PydanticTransducerCrewAI.max_iter,
+            timeout=self.timeout,
+            **self.prompt_params,
+        )
+
+    async def _complete(self, input: str) -> BaseModel:
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            {
+                "role": "user",
+                "content": self.intentional_definiton
+                + "\n"
+                + input[: self.MAX_CHAR_PROMPT],
+            },
+        ]
+
+        async def complete() -> str:
+            import litellm
+
+            response = await litellm.acompletion(
+                messages=messages,
+                response_format=self.response_format,
                 **self.llm_params,
             )
-            decoded_result = self.atype.model_validate_json(result)
-            return decoded_result
-
-        elif isinstance(input, Iterable) and all(isinstance(i, str) for i in input):
-            processes = []
-            for state in input:
-                corutine = openai_response(
-                    model=os.getenv("VLLM_MODEL_ID"),
-                    base_url=os.getenv("VLLM_URL"),
-                    user_prompt=default_user_prompt + str(state),
-                    **self.llm_params,
-                )
-                processes.append(corutine)
-            results = await asyncio.wait_for(
-                asyncio.gather(*processes, return_exceptions=True), timeout=self.timeout
-            )
+            return response.choices[0].message.content
 
-            decoded_results = []
-            for result in results:
-                if issubclass(type(result), Exception):
-                    if self.verbose:
-                        logger.debug("Something went wrongs, generating empty states")
-                    decoded_results.append(self.atype())
-                else:
-                    decoded_results.append(self.atype.model_validate_json(result))
-            return decoded_results
-        else:
-            return NotImplemented
+        content = await cassette_call(
+            "litellm_transduction",
+            {
+                "model": self.llm_params.get("model"),
+                "messages": messages,
+                "response_format": self.response_format,
+            },
+            complete,
+        )
+        return self.atype.model_validate_json(_strip_code_fence(content))
 
 
 class PydanticTransducerCrewAI(PydanticTransducer):
@@ -212,6 +418,7 @@ class PydanticTransducerCrewAI(PydanticTransducer):
     ):
         self.atype = atype
         self.llm = llm or watsonx_llm
+        self.tools = tools or []
         self.timeout = timeout
         self.intentional_definiton = (
             intentional_definiton
@@ -252,7 +459,24 @@ class PydanticTransducerCrewAI(PydanticTransducer):
         )
 
     async def _execute(self, input: str) -> BaseModel:
-        answer = await self.crew.kickoff_async(
-            {"task_description": input[: self.MAX_CHAR_PROMPT]}
+        task_description = input[: self.MAX_CHAR_PROMPT]
+
+        async def kickoff():
+            answer = await self.crew.kickoff_async(
+                {"task_description": task_description}
+            )
+            return answer.pydantic
+
+        return await cassette_call(
+            "crewai_transduction",
+            {
+                "model": getattr(self.llm, "model", None),
+                "atype": atype_json_schema(self.atype),
+                "intentional_definition": self.intentional_definiton,
+                "tools": [getattr(tool, "name", str(tool)) for tool in self.tools],
+                "input": task_description,
+            },
+            kickoff,
+            encode=lambda state: state.model_dump(mode="json") if state else None,
+            decode=lambda data: self.atype.model_validate(data) if data else None,
         )
-        return answer.pydantic
@@ -1,8 +1,23 @@
 import csv
+import hashlib
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from copy import copy
+from datetime import date, datetime
+from functools import lru_cache
+from itertools import islice
+from types import UnionType
 from typing import (
     Any,
+    Callable,
     Dict,
+    Iterable,
+    Iterator,
     List,
+    Literal,
     Optional,
     Set,
     Tuple,
@@ -12,10 +27,18 @@ from typing import (
     get_origin,
 )
 
+import numpy as np
 import pandas as pd
-from pydantic import BaseModel, Field, create_model
-
-from agentics.core.utils import sanitize_field_name
+import pyarrow as pa
+from pydantic import BaseModel, Field, TypeAdapter, create_model
+from pydantic.fields import FieldInfo
+
+from agentics.core.utils import (
+    gc_paused,
+    iter_json_array,
+    iter_jsonl_rows,
+    sanitize_field_name,
+)
 
 
 class AGString(BaseModel):
@@ -58,6 +81,167 @@ def copy_attribute_values(
     return state
 
 
+ATYPE_CACHE_SIZE = 1024
+
+_atype_cache: "OrderedDict[tuple, Type[BaseModel]]" = OrderedDict()
+_atype_cache_lock = threading.Lock()
+
+
+def _field_key(definition: Any) -> tuple:
+    annotation, default = (
+        definition if isinstance(definition, tuple) else (definition, ...)
+    )
+    # FieldInfo and mutable defaults are not hashable, their repr lists the settings
+    return annotation, repr(default)
+
+
+def cached_model(model_name: str, **field_definitions) -> Type[BaseModel]:
+    """
+    create_model for dynamically generated atypes, interned: calls with the same
+    name and field definitions return the same class, so its validators and json
+    schema are built once. The ATYPE_CACHE_SIZE most recently used classes are kept.
+    """
+    try:
+        key = (
+            model_name,
+            tuple(
+                (name, *_field_key(definition))
+                for name, definition in field_definitions.items()
+            ),
+        )
+        hash(key)
+    except TypeError:
+        return create_model(model_name, **field_definitions)
+    with _atype_cache_lock:
+        model = _atype_cache.get(key)
+        if model is not None:
+            _atype_cache.move_to_end(key)
+            return model
+    model = create_model(model_name, **field_definitions)
+    with _atype_cache_lock:
+        model = _atype_cache.setdefault(key, model)
+        _atype_cache.move_to_end(key)
+        if len(_atype_cache) > ATYPE_CACHE_SIZE:
+            _atype_cache.popitem(last=False)
+    return model
+
+
+@lru_cache(maxsize=ATYPE_CACHE_SIZE)
+def atype_json_schema(atype: Type[BaseModel]) -> Dict[str, Any]:
+    """The (cached) json schema of atype, shared between callers: don't modify it"""
+    return atype.model_json_schema()
+
+
+@lru_cache(maxsize=256)
+def states_adapter(atype: Type[BaseModel]) -> TypeAdapter:
+    """The (cached) validator of a list of states of type atype"""
+    return TypeAdapter(List[atype])
+
+
+def validate_states(
+    atype: Type[BaseModel], rows: Iterable[dict], trusted: bool = False
+) -> List[BaseModel]:
+    """
+    Validates a batch of dicts into states of type atype in a single call.
+    If trusted is True, rows are assumed to be valid already and states are built
+    without validation (model_construct). Nested models are then left as dicts,
+    so trusted is meant for flat atypes or rows produced by model_dump. For flat
+    atypes, pydantic-core validation is about as fast as construction. The gain
+    of trusted rows is on nested atypes and on the loaders, which skip key
+    sanitization.
+    """
+    if not isinstance(rows, list):
+        rows = list(rows)
+    with gc_paused():
+        if trusted:
+            return [atype.model_construct(**row) for row in rows]
+        return states_adapter(atype).validate_python(rows)
+
+
+def copy_state(state: Any) -> Any:
+    """
+    Shallow copy of a state (model_copy): the copy has its own field values, so
+    assigning a field on either side doesn't affect the other, while the values
+    themselves (e.g. nested models, lists or large strings) are shared.
+    """
+    if not isinstance(state, BaseModel):
+        return copy(state)
+    return state.model_copy()
+
+
+def _dump_value(value: Any) -> Any:
+    """Nested models as python data, for fields whose annotations differ"""
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, (list, tuple)):
+        return [_dump_value(x) for x in value]
+    if isinstance(value, dict):
+        return {k: _dump_value(v) for k, v in value.items()}
+    return value
+
+
+FieldMapping = Optional[Tuple[Tuple[str, str], ...]]
+
+
+@lru_cache(maxsize=ATYPE_CACHE_SIZE)
+def compile_merge(
+    target: Type[BaseModel],
+    *sources: Tuple[Optional[Type[BaseModel]], FieldMapping],
+) -> Callable[..., Dict[str, Any]]:
+    """
+    Builds a function merging states into the dict of field values of a target
+    state, to be validated into target. sources are (atype, mapping) pairs, one per
+    argument of the function. mapping is a tuple of (source field, target field)
+    pairs, None maps fields by name. A None atype is an absent source whose argument
+    is ignored. Later sources win on shared fields, as in a union of model_dumps.
+
+    The field plan is computed once per signature and cached, the function reads
+    only the fields it needs from the states' __dict__ (or from
+    the states themselves when they are rows, i.e. dicts of python data). Values of
+    fields with the same annotation on both sides are copied as they are (nested
+    models are shared, not copied), the others are dumped to python data.
+    """
+    allow_extra = target.model_config.get("extra") == "allow"
+    plan: Dict[str, Tuple[int, str, bool]] = {}
+    for i, (atype, mapping) in enumerate(sources):
+        if atype is None:
+            continue
+        pairs = mapping if mapping is not None else [(x, x) for x in atype.model_fields]
+        for source_field, target_field in pairs:
+            if source_field not in atype.model_fields:
+                continue
+            if target_field not in target.model_fields and not allow_extra:
+                continue
+            same = (
+                target_field in target.model_fields
+                and atype.model_fields[source_field].annotation
+                == target.model_fields[target_field].annotation
+            )
+            plan[target_field] = (i, source_field, same)
+
+    fields = tuple(
+        (target_field, i, source_field, same)
+        for target_field, (i, source_field, same) in plan.items()
+    )
+    read = sorted({i for i, _, _ in plan.values()})
+
+    def merge(*states: Any) -> Dict[str, Any]:
+        values = {}
+        for i in read:
+            state = states[i]
+            values[i] = state if type(state) is dict else state.__dict__
+        return {
+            target_field: (
+                values[i].get(source_field)
+                if same
+                else _dump_value(values[i].get(source_field))
+            )
+            for target_field, i, source_field, same in fields
+        }
+
+    return merge
+
+
 def get_active_fields(state: BaseModel, allowed_fields: Set[str] = None) -> Set[str]:
     """
     Returns the set of fields in `state` that are None and optionally intersect with allowed_fields.
@@ -68,77 +252,330 @@ def get_active_fields(state: BaseModel, allowed_fields: Set[str] = None) -> Set[
     return active_fields & allowed_fields if allowed_fields else active_fields
 
 
+#####################################
+####### Schema inference ############
+
+# number of rows (objects or CSV lines) of a file inspected to infer its atype
+INFERENCE_SAMPLE_SIZE = 1000
+# objects with more distinct keys are typed as maps (Dict[str, Any]) rather than models
+MAX_MODEL_FIELDS = 100
+
+_CSV_BOOLS = {"true": True, "false": False}
+# numbers with leading zeros (ids, zip codes) are text
+_INT_PATTERN = re.compile(r"[+-]?(0|[1-9]\d*)")
+_FLOAT_PATTERN = re.compile(r"[+-]?((0|[1-9]\d*)(\.\d*)?|\.\d+)([eE][+-]?\d+)?")
+_DATE_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}")
+_DATETIME_PATTERN = re.compile(
+    r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}:?\d{2})?"
+)
+
+
+def parse_csv_value(text: str) -> Any:
+    """The value of a CSV cell: None (empty), bool, int, float, date, datetime or str"""
+    if text == "":
+        return None
+    if (value := _CSV_BOOLS.get(text.lower())) is not None:
+        return value
+    try:
+        if _INT_PATTERN.fullmatch(text):
+            return int(text)
+        if _FLOAT_PATTERN.fullmatch(text):
+            return float(text)
+        if _DATE_PATTERN.fullmatch(text):
+            return date.fromisoformat(text)
+        if _DATETIME_PATTERN.fullmatch(text):
+            return datetime.fromisoformat(text)
+    except ValueError:
+        pass
+    return text
+
+
+class TypeSketch:
+    """
+    The types of the values observed for a field, summarized into an annotation:
+    scalar types, the sketch of the items of lists and the sketches of the fields of
+    objects (typed as sub-models). Several kinds of values make a Union, int and
+    float make a float, and no values at all make a str.
+    """
+
+    def __init__(self):
+        self.seen = False
+        self.scalars: Dict[type, None] = {}  # ordered set
+        self.items: Optional[TypeSketch] = None
+        self.fields: Optional[Dict[str, TypeSketch]] = None
+
+    def add(self, value: Any):
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            return
+        self.seen = True
+        if isinstance(value, dict):
+            if self.fields is None:
+                self.fields = {}
+            for key, item in value.items():
+                field = sanitize_field_name(str(key))
+                self.fields.setdefault(field, TypeSketch()).add(item)
+        elif isinstance(value, (list, tuple)):
+            if self.items is None:
+                self.items = TypeSketch()
+            for item in value:
+                self.items.add(item)
+        else:
+            if isinstance(value, np.generic):
+                value = value.item()
+            self.scalars[type(value)] = None
+
+    def annotation(self, name: str, text: bool = False) -> Any:
+        """
+        The optional annotation of the values, sub-models being named after name.
+        With text (CSV cells), values of several kinds are typed as str.
+        """
+        scalars = list(self.scalars)
+        if float in scalars and int in scalars:
+            scalars.remove(int)
+        if datetime in scalars and date in scalars:
+            scalars.remove(date)
+        if text and len(scalars) > 1:
+            scalars = [str]
+        options = scalars
+        if self.fields is not None:
+            if not self.fields or len(self.fields) > MAX_MODEL_FIELDS:
+                options.append(Dict[str, Any])
+            else:
+                options.append(model_from_sketches(name, self.fields))
+        if self.items is not None:
+            options.append(
+                List[self.items.annotation(name) if self.items.seen else Any]
+            )
+        if not options:
+            return Optional[str]
+        return Optional[Union[tuple(options)]]
+
+
+def model_from_sketches(
+    model_name: str, sketches: Dict[str, TypeSketch], text: bool = False
+) -> Type[BaseModel]:
+    return cached_model(
+        model_name,
+        **{
+            field: (sketch.annotation(field, text=text), None)
+            for field, sketch in sketches.items()
+        },
+    )
+
+
+def infer_atype(
+    rows: Iterable[dict], sample_size: Optional[int] = INFERENCE_SAMPLE_SIZE
+) -> Type[BaseModel]:
+    """The atype of (json) objects, inferred from the first sample_size ones"""
+    sketch = TypeSketch()
+    for row in islice(rows, sample_size):
+        sketch.add(row)
+    fields = sketch.fields or {}
+    return model_from_sketches("AType#" + ":".join(fields), fields)
+
+
+def infer_csv_atype(
+    header: Optional[List[str]],
+    rows: Iterable[List[str]],
+    sample_size: Optional[int] = INFERENCE_SAMPLE_SIZE,
+) -> Type[BaseModel]:
+    """
+    The atype of CSV rows, inferred from the first sample_size ones, with bool, int,
+    float, date and datetime columns detected (see parse_csv_value), str otherwise
+    """
+    columns = [sanitize_field_name(x) for x in header or []]
+    if not columns:
+        raise ValueError("CSV file appears to have no header.")
+    sketches = {column: TypeSketch() for column in columns}
+    for row in islice(rows, sample_size):
+        for sketch, cell in zip(sketches.values(), row):
+            sketch.add(parse_csv_value(cell))
+    return model_from_sketches("AType#" + ":".join(columns), sketches, text=True)
+
+
+def _accepts_text(annotation: Any) -> bool:
+    """Whether CSV cells are valid as they are for a field annotated annotation"""
+    if annotation in (str, Any):
+        return True
+    return get_origin(annotation) in (Union, UnionType) and any(
+        _accepts_text(x) for x in get_args(annotation)
+    )
+
+
+def csv_rows(
+    names: List[str], rows: Iterable[List[str]], atype: Type[BaseModel]
+) -> Iterator[dict]:
+    """
+    The dicts of CSV rows for atype, whose cells are parsed (parse_csv_value) for the
+    fields that do not accept text, empty cells being None
+    """
+    typed = {
+        name
+        for name in names
+        if name in atype.model_fields
+        and not _accepts_text(atype.model_fields[name].annotation)
+    }
+    if not typed:
+        return (dict(zip(names, row)) for row in rows)
+    return (
+        {
+            name: parse_csv_value(cell) if name in typed else cell
+            for name, cell in zip(names, row)
+        }
+        for row in rows
+    )
+
+
+def file_fingerprint(path: str, block_size: int = 1 << 20) -> str:
+    """
+    A cheap hash of a file: its size with its first and last block_size bytes,
+    which changes whenever the file is rewritten or appended to
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.sha256(str(size).encode())
+    with open(path, "rb") as f:
+        digest.update(f.read(block_size))
+        if size > block_size:
+            f.seek(max(block_size, size - block_size))
+            digest.update(f.read(block_size))
+    return digest.hexdigest()
+
+
+_file_atypes: "OrderedDict[tuple, Type[BaseModel]]" = OrderedDict()
+
+
+def infer_file_atype(
+    path: str,
+    kind: Literal["jsonl", "json", "csv"] = "jsonl",
+    sample_size: Optional[int] = INFERENCE_SAMPLE_SIZE,
+) -> Type[BaseModel]:
+    """
+    The atype of the states of a (compressed) jsonl file, json array file or CSV
+    file, inferred in a single pass over its first sample_size rows. Atypes are
+    cached by file_fingerprint, so that importing the same file again skips
+    inference.
+    """
+    key = (file_fingerprint(path), kind, sample_size)
+    with _atype_cache_lock:
+        if (atype := _file_atypes.get(key)) is not None:
+            _file_atypes.move_to_end(key)
+            return atype
+    if kind == "csv":
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.reader(f)
+            atype = infer_csv_atype(
+                next(reader, None), (row for row in reader if row), sample_size
+            )
+    elif kind == "json":
+        atype = infer_atype(iter_json_array(path), sample_size)
+    else:
+        atype = infer_atype(iter_jsonl_rows(path), sample_size)
+    with _atype_cache_lock:
+        _file_atypes[key] = atype
+        if len(_file_atypes) > ATYPE_CACHE_SIZE:
+            _file_atypes.popitem(last=False)
+    return atype
+
+
+def pydantic_model_from_header(header: Optional[List[str]]) -> type[BaseModel]:
+    columns = [sanitize_field_name(x) for x in header or []]
+    model_name = "AType#" + ":".join(columns)
+    if not columns:
+        raise ValueError("CSV file appears to have no header.")
+    fields = {col: (Optional[str], None) for col in columns}
+    return create_model(model_name, **fields)
+
+
 def pydantic_model_from_csv(file_path: str) -> type[BaseModel]:
-    with open(file_path, newline="", encoding="utf-8") as csvfile:
-        reader = csv.DictReader(csvfile)
-        columns = [sanitize_field_name(x) for x in reader.fieldnames]
-        model_name = "AType#" + ":".join(columns)
-        if not columns:
-            raise ValueError("CSV file appears to have no header.")
-        fields = {col: (Optional[str], None) for col in columns}
-        return create_model(model_name, **fields)
-
-
-def infer_pydantic_type(dtype: Any, sample_values: pd.Series = None) -> Any:
-    if pd.api.types.is_integer_dtype(dtype):
+    return infer_file_atype(file_path, "csv")
+
+
+def pydantic_text_model_from_csv(file_path: str) -> type[BaseModel]:
+    """
+    The atype of a CSV file with every column typed as str, the fallback for files
+    whose later rows don't match the atype inferred from the first ones
+    """
+    with open(file_path, newline="", encoding="utf-8-sig") as f:
+        return pydantic_model_from_header(next(csv.reader(f), None))
+
+
+def infer_pydantic_type(dtype: Any, sample_values: Iterable[Any] = None) -> Any:
+    """The annotation of a (pandas) column of dtype, inferred from sample_values for objects"""
+    if pd.api.types.is_bool_dtype(dtype):
+        return Optional[bool]
+    elif pd.api.types.is_integer_dtype(dtype):
         return Optional[int]
     elif pd.api.types.is_float_dtype(dtype):
         return Optional[float]
-    elif pd.api.types.is_bool_dtype(dtype):
-        return Optional[bool]
     elif pd.api.types.is_datetime64_any_dtype(dtype):
-        return Optional[str]  # Or datetime.datetime
+        return Optional[datetime]
     elif sample_values is not None:
-        # Check if the column contains lists of strings
-        for val in sample_values:
-            if isinstance(val, list) and all(isinstance(x, str) for x in val):
-                return Optional[List[str]]
-            elif isinstance(val, dict):
-                if all(isinstance(k, str) for k in val.keys()):
-                    if all(
-                        isinstance(v, (str, list))
-                        and (isinstance(v, str) or all(isinstance(i, str) for i in v))
-                        for v in val.values()
-                    ):
-                        return Optional[Dict[str, Union[str, List[str]]]]
-            break  # Only check the first non-null value
+        sketch = TypeSketch()
+        for value in sample_values:
+            sketch.add(value)
+        return sketch.annotation("Struct")
     return Optional[str]
 
 
 def pydantic_model_from_dict(dict) -> type[BaseModel]:
-    model_name = "AType#" + ":".join(dict.keys())
-    fields = {}
-
-    for col in dict.keys():
-        sample_value = dict[col]
-        pydantic_type = infer_pydantic_type(
-            type(sample_value), sample_values=[sample_value]
-        )
-        fields[col] = (pydantic_type, Field(default=None))
-    new_fields = {}
-    for field, value in fields.items():
-        new_fields[sanitize_field_name(field)] = value
-
-    return create_model(model_name, **new_fields)
+    return infer_atype([dict])
 
 
 def pydantic_model_from_jsonl(
-    file_path: str, sample_size: int = 100
+    file_path: str, sample_size: int = INFERENCE_SAMPLE_SIZE
 ) -> type[BaseModel]:
-    df = pd.read_json(file_path, lines=True, nrows=sample_size, encoding="utf-8")
+    return infer_file_atype(file_path, "jsonl", sample_size)
 
-    model_name = "AType#" + ":".join(df.columns)
-    fields = {}
 
-    for col in df.columns:
-        sample_values = df[col].head(5)
-        pydantic_type = infer_pydantic_type(df[col].dtype, sample_values=sample_values)
-        fields[col] = (pydantic_type, Field(default=None))
-    new_fields = {}
-    for field, value in fields.items():
-        new_fields[sanitize_field_name(field)] = value
+def pydantic_type_from_arrow(data_type: pa.DataType, name: str = "Struct") -> Any:
+    """Maps an arrow type to an (optional) python annotation"""
+    if pa.types.is_boolean(data_type):
+        return Optional[bool]
+    elif pa.types.is_integer(data_type):
+        return Optional[int]
+    elif pa.types.is_floating(data_type) or pa.types.is_decimal(data_type):
+        return Optional[float]
+    elif pa.types.is_list(data_type) or pa.types.is_large_list(data_type):
+        return Optional[List[pydantic_type_from_arrow(data_type.value_type, name)]]
+    elif pa.types.is_struct(data_type):
+        return Optional[
+            create_model(
+                name,
+                **{
+                    sanitize_field_name(field.name): (
+                        pydantic_type_from_arrow(field.type, field.name),
+                        Field(default=None),
+                    )
+                    for field in data_type
+                },
+            )
+        ]
+    elif pa.types.is_map(data_type):
+        return Optional[Dict[str, Any]]
+    return Optional[str]  # strings, dates and timestamps
+
+
+def pydantic_model_from_arrow_schema(
+    schema: pa.Schema, columns: Optional[List[str]] = None
+) -> Type[BaseModel]:
+    names = [x for x in schema.names if not columns or x in columns]
+    model_name = "AType#" + ":".join(names)
+    fields = {
+        sanitize_field_name(name): (
+            pydantic_type_from_arrow(schema.field(name).type, name),
+            Field(default=None),
+        )
+        for name in names
+    }
+    return create_model(model_name, **fields)
+
+
+def pydantic_model_from_parquet(
+    file_path: str, columns: Optional[List[str]] = None
+) -> Type[BaseModel]:
+    import pyarrow.parquet as pq
 
-    return create_model(model_name, **new_fields)
+    return pydantic_model_from_arrow_schema(pq.read_schema(file_path), columns)
 
 
 def pydantic_model_from_dataframe(
@@ -149,7 +586,7 @@ def pydantic_model_from_dataframe(
     model_name = "AType#" + ":".join(df_sample.columns)
     fields = {}
     for col in df_sample.columns:
-        pydantic_type = infer_pydantic_type(df_sample[col].dtype)
+        pydantic_type = infer_pydantic_type(df_sample[col].dtype, df_sample[col])
         fields[col] = (pydantic_type, Field(default=None))
 
     return create_model(model_name, **fields)
@@ -227,7 +664,7 @@ def make_all_fields_optional(
         )
 
     new_name = rename_type or f"{model_cls.__name__}Optional"
-    return create_model(new_name, **fields)
+    return cached_model(new_name, **fields)
 
 
 def pretty_print_atype(atype, indent: int = 2):
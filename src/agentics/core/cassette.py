@@ -0,0 +1,280 @@
+"""
+Record/replay of LLM interactions for deterministic offline runs.
+
+A cassette stores every request/response pair issued by the transducers, by
+raw ``llm.call`` transductions and by ``openai_response`` into a single SQLite
+file indexed by a hash of the request. In replay mode the stored responses are
+served back, optionally after a simulated latency, so that whole pipelines can
+be re-run and profiled offline with exactly repeatable LLM outputs.
+
+Usage:
+    with use_cassette("text2sql.cassette", mode="record"):
+        test = await execute_questions(test)
+
+    with use_cassette("text2sql.cassette", mode="replay", latency=0.5):
+        test = await execute_questions(test)
+
+Unmodified scripts can be run under a cassette by setting the environment
+variables AGENTICS_CASSETTE (path), AGENTICS_CASSETTE_MODE (record|replay) and
+AGENTICS_CASSETTE_LATENCY (seconds, or "recorded" to replay the original timing).
+"""
+
+import asyncio
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Literal, Optional, Union
+
+from loguru import logger
+
+from agentics.core.errors import CassetteMissError
+
+CassetteMode = Literal["record", "replay"]
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+class Cassette:
+    """
+    An indexed store of LLM request/response pairs.
+
+    Args:
+        path: the SQLite file holding the interactions
+        mode: "record" calls the LLM and stores each interaction (an existing
+            cassette is overwritten), "replay" serves stored responses
+        latency: simulated latency in seconds for replayed responses, or
+            "recorded" to sleep as long as the original call took
+        strict: in replay mode, raise CassetteMissError for requests that are
+            not in the cassette instead of calling the LLM
+        commit_every: number of recorded interactions per transaction
+    """
+
+    def __init__(
+        self,
+        path: str,
+        mode: CassetteMode = "replay",
+        latency: Union[float, Literal["recorded"]] = 0.0,
+        strict: bool = True,
+        commit_every: int = 50,
+    ):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        if mode == "replay" and not os.path.exists(path):
+            raise FileNotFoundError(f"Cassette {path} does not exist")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.strict = strict
+        self.commit_every = commit_every
+        self.n_hits = 0
+        self.n_misses = 0
+        self.n_recorded = 0
+        self._counters: Dict[str, int] = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS interactions (
+                key TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                request BLOB,
+                response BLOB,
+                elapsed REAL,
+                PRIMARY KEY (key, seq)
+            )"""
+        )
+        if mode == "record":
+            self._conn.execute("DELETE FROM interactions")
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM interactions").fetchone()[0]
+
+    @staticmethod
+    def request_key(kind: str, request: Dict[str, Any]) -> str:
+        payload = json.dumps(
+            {"kind": kind, "request": request}, sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _next_seq(self, key: str) -> int:
+        """
+        Identical requests are told apart by the order in which they are issued, a
+        replayed request beyond the number of recorded ones is a miss
+        """
+        with self._lock:
+            seq = self._counters.get(key, 0)
+            self._counters[key] = seq + 1
+        return seq
+
+    def lookup(self, key: str, seq: int) -> Optional[tuple[Any, float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, elapsed FROM interactions WHERE key = ? AND seq = ?",
+                (key, seq),
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row[0])), row[1]
+
+    def store(
+        self,
+        key: str,
+        seq: int,
+        kind: str,
+        request: Dict[str, Any],
+        response: Any,
+        elapsed: float,
+    ):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO interactions VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    seq,
+                    kind,
+                    zlib.compress(json.dumps(request, default=str).encode()),
+                    zlib.compress(json.dumps(response, default=str).encode()),
+                    elapsed,
+                ),
+            )
+            self.n_recorded += 1
+            self._pending += 1
+            if self._pending >= self.commit_every:
+                self._conn.commit()
+                self._pending = 0
+
+    async def play(
+        self,
+        kind: str,
+        request: Dict[str, Any],
+        call: Callable[[], Awaitable[Any]],
+        encode: Callable[[Any], Any] = _identity,
+        decode: Callable[[Any], Any] = _identity,
+    ) -> Any:
+        """
+        Returns the response for request, either from the cassette or from call().
+        encode/decode convert the response to and from a JSON serializable value.
+        """
+        key = self.request_key(kind, request)
+        seq = self._next_seq(key)
+        if self.mode == "replay":
+            found = self.lookup(key, seq)
+            if found is not None:
+                self.n_hits += 1
+                response, elapsed = found
+                delay = elapsed if self.latency == "recorded" else self.latency
+                if delay:
+                    await asyncio.sleep(delay)
+                return decode(response)
+            self.n_misses += 1
+            if self.strict:
+                raise CassetteMissError(
+                    f"No {kind} interaction recorded in {self.path} for request {key[:12]}"
+                )
+            logger.debug(f"Cassette miss for {kind} request {key[:12]}, calling LLM")
+            return await call()
+
+        start = time.perf_counter()
+        response = await call()
+        self.store(
+            key, seq, kind, request, encode(response), time.perf_counter() - start
+        )
+        return response
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
+
+
+_active_cassette: ContextVar[Optional[Cassette]] = ContextVar(
+    "agentics_cassette", default=None
+)
+
+
+def get_active_cassette() -> Optional[Cassette]:
+    cassette = _active_cassette.get()
+    return cassette if cassette is not None else _get_env_cassette()
+
+
+@contextmanager
+def use_cassette(
+    path: str,
+    mode: CassetteMode = "replay",
+    latency: Union[float, Literal["recorded"]] = 0.0,
+    strict: bool = True,
+):
+    """Record or replay every LLM interaction issued within the context"""
+    cassette = Cassette(path, mode=mode, latency=latency, strict=strict)
+    token = _active_cassette.set(cassette)
+    try:
+        yield cassette
+    finally:
+        _active_cassette.reset(token)
+        cassette.close()
+        logger.debug(
+            f"Cassette {path} closed: {cassette.n_recorded} recorded, "
+            f"{cassette.n_hits} replayed, {cassette.n_misses} missed"
+        )
+
+
+async def cassette_call(
+    kind: str,
+    request: Dict[str, Any],
+    call: Callable[[], Awaitable[Any]],
+    encode: Callable[[Any], Any] = _identity,
+    decode: Callable[[Any], Any] = _identity,
+) -> Any:
+    """Routes an LLM call through the active cassette, if any"""
+    cassette = get_active_cassette()
+    if cassette is None:
+        return await call()
+    return await cassette.play(kind, request, call, encode=encode, decode=decode)
+
+
+def _cassette_from_env() -> Optional[Cassette]:
+    path = os.getenv("AGENTICS_CASSETTE")
+    if not path:
+        return None
+    latency = os.getenv("AGENTICS_CASSETTE_LATENCY", "0")
+    cassette = Cassette(
+        path,
+        mode=os.getenv("AGENTICS_CASSETTE_MODE", "replay"),
+        latency=latency if latency == "recorded" else float(latency),
+    )
+    atexit.register(cassette.close)
+    return cassette
+
+
+_env_cassette: Optional[Cassette] = None
+_env_cassette_loaded = False
+_env_lock = threading.Lock()
+
+
+def _get_env_cassette() -> Optional[Cassette]:
+    """
+    The cassette set by the environment variables. It is opened at the first LLM
+    call rather than at import, so that variables loaded from .env are used and
+    importing the package never overwrites a cassette in record mode.
+    """
+    global _env_cassette, _env_cassette_loaded
+    if not _env_cassette_loaded:
+        with _env_lock:
+            if not _env_cassette_loaded:
+                _env_cassette = _cassette_from_env()
+                _env_cassette_loaded = True
+    return _env_cassette
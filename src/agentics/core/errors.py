@@ -10,3 +10,7 @@ class InvalidStateError(AgenticsError):
 
 class TransductionError(AgenticsError):
     pass
+
+
+class CassetteMissError(AgenticsError):
+    pass
@@ -0,0 +1,114 @@
+"""
+Incremental transduction: outputs of previous runs are reused for unchanged states.
+
+An AG with an incremental_path fingerprints each state it transduces from another
+AG. The fingerprint is a hash of the source prompt (the transduce_fields of the
+source state), the instructions as sent to the LLM (task preamble, instructions
+of the AG and few shot examples), the model, the names of the tools and the json
+schema of the target type.
+Fingerprints are stored next to the outputs in a SQLite file. On later runs only
+states with a new fingerprint are dispatched to the LLM, and the stored outputs are
+spliced back in for all the others:
+
+    target = AG(atype=Answer, incremental_path="answers.fingerprints")
+    answers = await (target << questions)  # only new or changed questions are sent
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from agentics.core.utils import iter_chunks
+
+# SQLite limits the number of parameters of a query
+LOOKUP_BATCH_SIZE = 500
+
+
+def transduction_fingerprint(
+    prompt: str,
+    instructions: Optional[str],
+    model: Optional[str],
+    schema: Dict[str, Any],
+    tools: Optional[List[str]] = None,
+) -> str:
+    payload = json.dumps(
+        {
+            "prompt": prompt,
+            "instructions": instructions,
+            "model": model,
+            "schema": schema,
+            "tools": sorted(tools or []),
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class FingerprintStore:
+    """Transduction outputs (json) indexed by the fingerprint of their input"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS outputs (
+                fingerprint TEXT PRIMARY KEY,
+                output BLOB NOT NULL,
+                updated REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outputs").fetchone()[0]
+
+    def get_many(self, fingerprints: Iterable[str]) -> Dict[str, bytes]:
+        """The stored outputs of the fingerprints found in the store"""
+        found = {}
+        with self._lock:
+            for chunk in iter_chunks(set(fingerprints), LOOKUP_BATCH_SIZE):
+                found.update(
+                    self._conn.execute(
+                        "SELECT fingerprint, output FROM outputs WHERE fingerprint IN "
+                        f"({', '.join('?' * len(chunk))})",
+                        chunk,
+                    )
+                )
+        return found
+
+    def put_many(self, outputs: List[Tuple[str, bytes]]):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO outputs VALUES (?, ?, ?)",
+                [(fingerprint, output, now) for fingerprint, output in outputs],
+            )
+            self._conn.commit()
+
+    def prune(self, older_than: float):
+        """Removes the outputs not produced or reused in the last older_than seconds"""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM outputs WHERE updated < ?", (time.time() - older_than,)
+            )
+            self._conn.commit()
+
+    def touch(self, fingerprints: Iterable[str]):
+        """Marks reused outputs as recently used"""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE outputs SET updated = ? WHERE fingerprint = ?",
+                [(now, fingerprint) for fingerprint in fingerprints],
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
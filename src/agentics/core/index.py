@@ -0,0 +1,312 @@
+"""
+Lazy indexes on the fields of the states of an AG, and hash joins between AGs.
+
+The query operators (AG.where, AG.sort_by, AG.group_by, AG.aggregate and
+AG.distinct) read field values through a StateIndexes, which builds a hash index
+(value -> positions) or a sorted index (positions ordered by value) for a field
+the first time an operator needs it, and reuses it afterwards.
+
+Indexes are rebuilt when the states of the AG are replaced or modified: the
+states are held in a StateList or a StateStore, which count their modifications
+(e.g. ag.states[i] = state) in a version. They are updated in place by AG.append.
+States modified in place (state.field = value) are not tracked: call
+AG.drop_indexes() after doing so.
+"""
+
+import json
+from bisect import bisect_left, bisect_right
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from pydantic import BaseModel
+
+from agentics.core.storage import StateStore
+
+# where() condition suffixes, e.g. where(age__ge=18, db_id__in=["a", "b"])
+OPERATORS = ("eq", "ne", "gt", "ge", "lt", "le", "in")
+
+
+def hashable(value: Any) -> Any:
+    """A hashable key for value, json encoding lists, dicts and pydantic objects"""
+    if isinstance(value, BaseModel):
+        value = value.model_dump(mode="json")
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return json.dumps(value, sort_keys=True, default=str)
+
+
+def parse_condition(key: str) -> Tuple[str, str]:
+    """Splits a where() keyword into a field name and an operator"""
+    field, _, op = key.rpartition("__")
+    if field and op in OPERATORS:
+        return field, op
+    return key, "eq"
+
+
+class HashIndex:
+    """Positions of the states by field value"""
+
+    def __init__(self, values: Iterable[Any]):
+        self.positions: Dict[Any, List[int]] = {}
+        for position, value in enumerate(values):
+            self.add(position, value)
+
+    def add(self, position: int, value: Any):
+        self.positions.setdefault(hashable(value), []).append(position)
+
+    def lookup(self, value: Any) -> List[int]:
+        return self.positions.get(hashable(value), [])
+
+
+class SortedIndex:
+    """Positions of the states ordered by field value, None values last"""
+
+    def __init__(self, values: Iterable[Any]):
+        pairs, self.nulls = [], []
+        for position, value in enumerate(values):
+            if value is None:
+                self.nulls.append(position)
+            else:
+                pairs.append((value, position))
+        pairs.sort(key=lambda x: x[0])
+        self.keys = [value for value, _ in pairs]
+        self.positions = [position for _, position in pairs]
+
+    def add(self, position: int, value: Any):
+        if value is None:
+            self.nulls.append(position)
+            return
+        i = bisect_right(self.keys, value)
+        self.keys.insert(i, value)
+        self.positions.insert(i, position)
+
+    def range(
+        self,
+        low: Any = None,
+        high: Any = None,
+        include_low: bool = True,
+        include_high: bool = True,
+    ) -> List[int]:
+        """Positions of the states with low <= value <= high (None is unbounded)"""
+        start, stop = 0, len(self.keys)
+        if low is not None:
+            start = (bisect_left if include_low else bisect_right)(self.keys, low)
+        if high is not None:
+            stop = (bisect_right if include_high else bisect_left)(self.keys, high)
+        return self.positions[start:stop]
+
+    def order(self, reverse: bool = False) -> List[int]:
+        if not reverse:
+            return self.positions + self.nulls
+        # reversed runs of equal keys keep their original order (stable sort)
+        order, stop = [], len(self.keys)
+        while stop > 0:
+            start = bisect_left(self.keys, self.keys[stop - 1], 0, stop)
+            order.extend(self.positions[start:stop])
+            stop = start
+        return order + self.nulls
+
+
+def states_version(states: Sequence[Optional[BaseModel]]) -> Optional[int]:
+    """The modification count of a StateList or StateStore, None for other lists"""
+    return getattr(states, "version", None)
+
+
+class StateIndexes:
+    """The indexes built so far on the states of an AG"""
+
+    def __init__(self, states: Sequence[Optional[BaseModel]], fields: Iterable[str]):
+        self.states = states
+        self.states_id = id(states)
+        self.size = len(states)
+        self.version = states_version(states)
+        self.fields = set(fields)
+        self.hash: Dict[str, HashIndex] = {}
+        self.sorted: Dict[str, SortedIndex] = {}
+
+    def valid_for(self, states: Sequence[Optional[BaseModel]]) -> bool:
+        return (
+            id(states) == self.states_id
+            and len(states) == self.size
+            and states_version(states) == self.version
+        )
+
+    def values(self, field: str) -> List[Any]:
+        """The values of field for all states, None for missing states"""
+        if field not in self.fields:
+            raise ValueError(f"Unknown field: {field}")
+        if isinstance(self.states, StateStore):
+            return self.states.column(field)
+        return [getattr(state, field, None) for state in self.states]
+
+    def hash_index(self, field: str) -> HashIndex:
+        if field not in self.hash:
+            self.hash[field] = HashIndex(self.values(field))
+        return self.hash[field]
+
+    def sorted_index(self, field: str) -> SortedIndex:
+        if field not in self.sorted:
+            self.sorted[field] = SortedIndex(self.values(field))
+        return self.sorted[field]
+
+    def appended(self, states: Sequence[Optional[BaseModel]], state: BaseModel):
+        """Updates the indexes after state has been appended to states"""
+        version = states_version(states)
+        if (
+            id(states) != self.states_id
+            or len(states) != self.size + 1
+            or (version is not None and version != self.version + 1)
+        ):
+            return
+        for field, index in list(self.hash.items()) + list(self.sorted.items()):
+            index.add(self.size, getattr(state, field, None))
+        self.size += 1
+        self.version = version
+
+    ##### Operators #####
+
+    def select(self, field: str, op: str, value: Any) -> set[int]:
+        """Positions of the states satisfying the condition field op value"""
+        if op == "eq":
+            return set(self.hash_index(field).lookup(value))
+        if op == "in":
+            index = self.hash_index(field)
+            return {position for x in value for position in index.lookup(x)}
+        if op == "ne":
+            return set(range(self.size)) - set(self.hash_index(field).lookup(value))
+        index = self.sorted_index(field)
+        if op in ("gt", "ge"):
+            return set(index.range(low=value, include_low=op == "ge"))
+        return set(index.range(high=value, include_high=op == "le"))
+
+    def where(self, conditions: Dict[str, Any]) -> List[int]:
+        positions = None
+        for key, value in conditions.items():
+            selected = self.select(*parse_condition(key), value)
+            positions = selected if positions is None else positions & selected
+        return sorted(range(self.size) if positions is None else positions)
+
+    def order(self, keys: Sequence[str]) -> List[int]:
+        """Positions sorted by keys, "-field" sorts field in descending order"""
+        if not keys:
+            return list(range(self.size))
+        *others, last = keys
+        order = self.sorted_index(last.lstrip("-")).order(last.startswith("-"))
+        # stable sorts from the least to the most significant key
+        for key in reversed(others):
+            field, reverse = key.lstrip("-"), key.startswith("-")
+            values = self.values(field)
+            present = [i for i in order if values[i] is not None]
+            present.sort(key=values.__getitem__, reverse=reverse)
+            order = present + [i for i in order if values[i] is None]
+        return order
+
+    def groups(self, fields: Sequence[str]) -> Dict[Any, List[int]]:
+        """Positions of the states by value (or tuple of values) of fields"""
+        if len(fields) == 1:
+            index = self.hash_index(fields[0])
+            return {key: list(positions) for key, positions in index.positions.items()}
+        groups: Dict[Any, List[int]] = {}
+        columns = [self.values(field) for field in fields]
+        for position, key in enumerate(zip(*columns)):
+            groups.setdefault(tuple(hashable(x) for x in key), []).append(position)
+        return groups
+
+
+def _mean(values: List[Any]) -> Optional[float]:
+    values = [x for x in values if x is not None]
+    return sum(values) / len(values) if values else None
+
+
+def _present(reducer: Callable[[List[Any]], Any]) -> Callable[[List[Any]], Any]:
+    def reduce_present(values: List[Any]) -> Any:
+        values = [x for x in values if x is not None]
+        return reducer(values) if values else None
+
+    return reduce_present
+
+
+REDUCERS: Dict[str, Callable[[List[Any]], Any]] = {
+    "count": len,
+    "sum": _present(sum),
+    "mean": _mean,
+    "min": _present(min),
+    "max": _present(max),
+    "first": lambda values: values[0] if values else None,
+    "last": lambda values: values[-1] if values else None,
+    "list": list,
+    "nunique": lambda values: len({hashable(x) for x in values}),
+}
+
+
+JoinHow = Literal["inner", "left", "outer"]
+
+
+def _join_key(row: dict, fields: Sequence[str]) -> Optional[tuple]:
+    """The join key of row, None (never matching) if any key field is None"""
+    key = tuple(row.get(field) for field in fields)
+    if any(value is None for value in key):
+        return None
+    return tuple(hashable(value) for value in key)
+
+
+def hash_join(
+    left: Iterable[dict],
+    right: Iterable[dict],
+    left_on: Sequence[str],
+    right_on: Sequence[str],
+    how: JoinHow = "inner",
+    build_left: bool = False,
+) -> Iterator[dict]:
+    """
+    Joins two streams of rows on left_on == right_on, yielding left | right rows.
+
+    The build side (left if build_left, right otherwise) is loaded into a hash
+    table and the other side is streamed, so output follows the order of the
+    streamed side. Rows without a match are kept according to how ("left" keeps
+    unmatched left rows, "outer" unmatched rows of both sides), unmatched rows of
+    the build side coming last. Rows with a None key never match.
+    """
+    if how not in ("inner", "left", "outer"):
+        raise ValueError(f"Unknown join type: {how}")
+    build, probe = (left, right) if build_left else (right, left)
+    build_on, probe_on = (left_on, right_on) if build_left else (right_on, left_on)
+    keep_build = how == "outer" or (how == "left" and build_left)
+    keep_probe = how == "outer" or (how == "left" and not build_left)
+
+    table: Dict[tuple, List[dict]] = {}
+    build_rows: List[Tuple[Optional[tuple], dict]] = []
+    for row in build:
+        key = _join_key(row, build_on)
+        if key is not None:
+            table.setdefault(key, []).append(row)
+        if keep_build:
+            build_rows.append((key, row))
+
+    matched = set()
+    for row in probe:
+        key = _join_key(row, probe_on)
+        matches = table.get(key) if key is not None else None
+        if matches:
+            if keep_build:
+                matched.add(key)
+            for other in matches:
+                yield other | row if build_left else row | other
+        elif keep_probe:
+            yield row
+
+    for key, row in build_rows:
+        if key is None or key not in matched:
+            yield row
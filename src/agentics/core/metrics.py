@@ -0,0 +1,96 @@
+"""
+Runtime metrics of Agentics executions.
+
+Progress of running executions and named counters are updated on the event loop
+thread with plain integer increments (no locks) and can be inspected at any time:
+
+    from agentics.core.metrics import get_metrics
+    get_metrics()["progress"]
+"""
+
+import time
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass, field
+from itertools import count
+from typing import Any, Dict, List, Optional
+
+_ids = count()
+
+
+@dataclass
+class ProgressState:
+    """Completion counters of a single amap/transduction execution"""
+
+    description: str
+    total: int
+    completed: int = 0
+    failed: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: Optional[float] = None
+    id: int = field(default_factory=lambda: next(_ids))
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def rate(self) -> float:
+        """Completed states per second"""
+        elapsed = self.elapsed
+        return self.completed / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self) | {
+            "elapsed": round(self.elapsed, 3),
+            "rate": round(self.rate, 3),
+            "finished": self.finished,
+        }
+
+
+class Metrics:
+    """Registry of the running (and recently finished) executions and counters"""
+
+    def __init__(self, history: int = 20):
+        self.running: Dict[int, ProgressState] = {}
+        self.finished: deque[ProgressState] = deque(maxlen=history)
+        self.counters: Dict[str, float] = defaultdict(int)
+
+    def start(self, state: ProgressState):
+        self.running[state.id] = state
+
+    def finish(self, state: ProgressState):
+        state.finished_at = time.monotonic()
+        self.running.pop(state.id, None)
+        self.finished.append(state)
+
+    def increment(self, name: str, value: float = 1):
+        self.counters[name] += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "progress": [x.to_dict() for x in list(self.running.values())],
+            "finished": [x.to_dict() for x in list(self.finished)],
+            "counters": dict(self.counters),
+        }
+
+    def reset(self):
+        self.running.clear()
+        self.finished.clear()
+        self.counters.clear()
+
+
+metrics = Metrics()
+
+
+def get_metrics() -> Dict[str, Any]:
+    """Returns a snapshot of the progress of running executions and of the counters"""
+    return metrics.snapshot()
+
+
+def get_progress() -> List[ProgressState]:
+    """Returns the live progress states of the running executions"""
+    return list(metrics.running.values())
@@ -0,0 +1,169 @@
+"""
+Near-duplicate clustering of texts with MinHash signatures and LSH banding.
+
+Each text is split into character shingles and summarized by a MinHash signature,
+whose agreement with another signature estimates the Jaccard similarity of their
+shingle sets. Signatures are cut into bands and hashed into buckets (LSH), so that
+only texts sharing a bucket are compared. Texts estimated at least threshold
+similar are clustered, and the first state of each cluster is its representative.
+
+AG.near_duplicates clusters the states of an AG on a text field, and
+AG.transduce_near_duplicates transduces one representative per cluster only.
+"""
+
+import re
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# universal hashing (a * hash + b) % prime of the shingle hashes, with a 31 bit
+# Mersenne prime so that the products fit in 64 bits
+_PRIME = np.uint64((1 << 31) - 1)
+
+
+def shingles(text: str, size: int = 5) -> set[str]:
+    """Character shingles of the lowercased text with collapsed whitespace"""
+    text = re.sub(r"\s+", " ", text.lower()).strip()
+    if len(text) <= size:
+        return {text}
+    return {text[i : i + size] for i in range(len(text) - size + 1)}
+
+
+class MinHasher:
+    """MinHash signatures of num_perm permutations, reproducible for a given seed"""
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+
+    def signature(self, tokens: Iterable[str]) -> np.ndarray:
+        hashes = (
+            np.fromiter(
+                (zlib.crc32(token.encode()) for token in tokens), dtype=np.uint64
+            )
+            % _PRIME
+        )
+        if not len(hashes):
+            return np.full(self.num_perm, _PRIME, dtype=np.uint64)
+        return ((np.outer(hashes, self.a) + self.b) % _PRIME).min(axis=0)
+
+
+def lsh_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    The (bands, rows) split of the signatures whose S-curve (1 / bands) ** (1 / rows)
+    is closest to threshold
+    """
+    candidates = ((bands, num_perm // bands) for bands in range(1, num_perm + 1))
+    return min(
+        candidates,
+        key=lambda x: abs((1 / x[0]) ** (1 / x[1]) - threshold),
+    )
+
+
+@dataclass
+class NearDuplicates:
+    """Clusters of near-duplicate states"""
+
+    labels: List[int]  # cluster of each state
+    representatives: List[int]  # position of the representative of each cluster
+    similarity: List[float]  # estimated similarity of each state to its representative
+    threshold: float
+    _members: Optional[List[List[int]]] = field(default=None, repr=False)
+
+    @property
+    def n_states(self) -> int:
+        return len(self.labels)
+
+    @property
+    def n_clusters(self) -> int:
+        return len(self.representatives)
+
+    @property
+    def calls_saved(self) -> int:
+        """LLM calls saved by transducing representatives only"""
+        return self.n_states - self.n_clusters
+
+    def members(self, cluster: int) -> List[int]:
+        if self._members is None:
+            self._members = [[] for _ in self.representatives]
+            for position, label in enumerate(self.labels):
+                self._members[label].append(position)
+        return self._members[cluster]
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "states": self.n_states,
+            "clusters": self.n_clusters,
+            "llm_calls_saved": self.calls_saved,
+            "saved_ratio": self.calls_saved / self.n_states if self.n_states else 0.0,
+            "threshold": self.threshold,
+        }
+
+
+def near_duplicates(
+    texts: Iterable[Optional[str]],
+    threshold: float = 0.8,
+    num_perm: int = 128,
+    shingle_size: int = 5,
+    seed: int = 1,
+) -> NearDuplicates:
+    """
+    Clusters texts whose estimated Jaccard similarity (on character shingles) to the
+    first text of their LSH bucket is at least threshold. None texts are clusters
+    of their own.
+    """
+    if not 0 < threshold <= 1:
+        raise ValueError("threshold must be in (0, 1]")
+    hasher = MinHasher(num_perm, seed)
+    bands, rows = lsh_bands(threshold, num_perm)
+    texts = list(texts)
+    signatures = (
+        np.stack(
+            [
+                hasher.signature(shingles(text, shingle_size) if text else ())
+                for text in texts
+            ]
+        )
+        if texts
+        else np.empty((0, num_perm), dtype=np.uint64)
+    )
+
+    # union-find of the states, merged with the first state of each shared bucket
+    parent = list(range(len(texts)))
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for band in range(bands):
+        buckets: Dict[bytes, int] = {}
+        block = signatures[:, band * rows : (band + 1) * rows]
+        for position, text in enumerate(texts):
+            if text is None:
+                continue
+            first = buckets.setdefault(block[position].tobytes(), position)
+            if first == position or find(first) == find(position):
+                continue
+            agreement = np.mean(signatures[first] == signatures[position])
+            if agreement >= threshold:
+                parent[find(position)] = find(first)
+
+    labels, representatives, similarity = [], [], []
+    clusters: Dict[int, int] = {}
+    for position in range(len(texts)):
+        root = find(position)
+        if root not in clusters:
+            clusters[root] = len(representatives)
+            representatives.append(position)
+        label = clusters[root]
+        labels.append(label)
+        similarity.append(
+            float(np.mean(signatures[representatives[label]] == signatures[position]))
+        )
+    return NearDuplicates(labels, representatives, similarity, threshold)
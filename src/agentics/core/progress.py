@@ -0,0 +1,223 @@
+"""
+Pluggable progress reporting for async executions.
+
+Backends:
+    - "rich": a Rich progress bar, for interactive terminals and notebooks
+    - "log": a throttled periodic log line, for headless batch jobs
+    - "none": no output at all, counters are still available through metrics
+    - "auto" (default): "rich" on a terminal or notebook, "log" otherwise
+
+The backend is selected with set_progress_backend() or the AGENTICS_PROGRESS
+environment variable. Custom backends can be registered with
+register_progress_backend().
+"""
+
+import os
+import time
+from abc import ABC, abstractmethod
+from functools import cache
+from typing import Dict, Optional, Type, Union
+
+from loguru import logger
+from numerize.numerize import numerize
+from rich.console import Console
+from rich.progress import (
+    BarColumn,
+    MofNCompleteColumn,
+    Progress,
+    ProgressColumn,
+    SpinnerColumn,
+    Task,
+    Text,
+    TextColumn,
+    TimeElapsedColumn,
+    TimeRemainingColumn,
+)
+
+from agentics.core.metrics import ProgressState, metrics
+
+
+class StyledColumn(ProgressColumn):
+    """Apply a Rich style to the renderable of another column."""
+
+    def __init__(self, inner: ProgressColumn, style: str = "grey50"):
+        super().__init__()
+        self.inner = inner
+        self.style = style
+
+    def render(self, task: Task):
+        r = self.inner.render(task)
+        if isinstance(r, Text):
+            r.stylize(self.style)
+            return r
+        return Text(str(r), style=self.style)
+
+
+class TransductionSpeed(ProgressColumn):
+    """Renders human readable transfer speed."""
+
+    def render(self, task: "Task") -> Text:
+        """Show data transfer speed."""
+        speed = task.finished_speed or task.speed
+        if speed is None:
+            return Text("? states/s", style="progress.data.speed")
+        return Text(f"{numerize(speed, 2)} states/s", style="progress.data.speed")
+
+
+class ProgressBackend(ABC):
+    """
+    Reports the progress of an execution of `total` states.
+    Completion counters live in a ProgressState registered in the metrics.
+    """
+
+    def __init__(self, description: str, total: int, transient: bool = False):
+        self.state = ProgressState(description=description, total=total)
+        self.transient = transient
+
+    def __enter__(self) -> "ProgressBackend":
+        metrics.start(self.state)
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        metrics.finish(self.state)
+        self.stop()
+
+    def advance(self, failed: bool = False):
+        self.state.completed += 1
+        if failed:
+            self.state.failed += 1
+        self.update()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    @abstractmethod
+    def update(self):
+        pass
+
+
+class NoProgress(ProgressBackend):
+    def update(self):
+        pass
+
+
+class LogProgress(ProgressBackend):
+    """Logs one line every `interval` seconds, and one when the execution ends"""
+
+    interval: float = float(os.getenv("AGENTICS_PROGRESS_INTERVAL", 10))
+
+    def start(self):
+        self._last_log = time.monotonic()
+
+    def update(self):
+        now = time.monotonic()
+        if now - self._last_log >= self.interval:
+            self._last_log = now
+            self.log()
+
+    def stop(self):
+        if not self.transient or self.state.failed:
+            self.log()
+
+    def log(self):
+        state = self.state
+        logger.info(
+            f"{state.description}: {state.completed}/{state.total} states"
+            f" ({state.failed} failed) in {state.elapsed:.1f}s,"
+            f" {numerize(state.rate, 2)} states/s"
+        )
+
+
+class RichProgress(ProgressBackend):
+    def start(self):
+        if self.transient:
+            columns = (
+                SpinnerColumn(style="grey50"),
+                StyledColumn(TimeElapsedColumn()),
+                TextColumn("{task.description}", style="grey50"),
+                BarColumn(
+                    bar_width=40,
+                    style="grey30",
+                    complete_style="grey58",
+                    finished_style="grey62",
+                    pulse_style="grey50",
+                ),
+                StyledColumn(MofNCompleteColumn()),
+                StyledColumn(TransductionSpeed()),
+                StyledColumn(TimeRemainingColumn()),
+            )
+        else:
+            columns = (
+                SpinnerColumn(),
+                TimeElapsedColumn(),
+                TextColumn(f"[bold]{self.state.description}"),
+                BarColumn(),
+                MofNCompleteColumn(),
+                TransductionSpeed(),
+                TimeRemainingColumn(),
+            )
+        self.progress = Progress(*columns, transient=self.transient)
+        self.progress.start()
+        self.task_id = self.progress.add_task(
+            self.state.description, total=self.state.total
+        )
+
+    def update(self):
+        # rendering happens on the Progress refresh thread, not on each completion
+        self.progress.update(self.task_id, completed=self.state.completed)
+
+    def stop(self):
+        self.progress.update(self.task_id, completed=self.state.completed)
+        self.progress.stop()
+
+
+PROGRESS_BACKENDS: Dict[str, Type[ProgressBackend]] = {
+    "rich": RichProgress,
+    "log": LogProgress,
+    "none": NoProgress,
+}
+
+_progress_backend: str = os.getenv("AGENTICS_PROGRESS", "auto")
+
+
+def register_progress_backend(name: str, backend: Type[ProgressBackend]):
+    PROGRESS_BACKENDS[name] = backend
+
+
+def set_progress_backend(backend: Union[str, Type[ProgressBackend]]):
+    """Select the progress backend by name ("auto", "rich", "log", "none") or class"""
+    global _progress_backend
+    if isinstance(backend, type):
+        register_progress_backend(backend.__name__, backend)
+        backend = backend.__name__
+    if backend != "auto" and backend not in PROGRESS_BACKENDS:
+        raise ValueError(f"Unknown progress backend: {backend}")
+    _progress_backend = backend
+
+
+@cache
+def _auto_backend() -> str:
+    console = Console()
+    return "rich" if console.is_terminal or console.is_jupyter else "log"
+
+
+def resolve_progress_backend(
+    backend: Optional[str] = None,
+) -> Type[ProgressBackend]:
+    backend = backend or _progress_backend
+    if backend == "auto":
+        backend = _auto_backend()
+    return PROGRESS_BACKENDS[backend]
+
+
+def make_progress(
+    description: str,
+    total: int,
+    transient: bool = False,
+    backend: Optional[str] = None,
+) -> ProgressBackend:
+    return resolve_progress_backend(backend)(description, total, transient=transient)
@@ -0,0 +1,71 @@
+"""
+Random sampling of streams of unknown length in a single pass and bounded memory.
+
+reservoir_sample keeps size items of a stream with Li's "Algorithm L", which draws
+how many items to skip rather than one random number per item, so skipped items
+are only iterated over. stratified_sample keeps size items per value of a key, with
+one reservoir per value. Both return the sampled items in stream order, and take
+a random.Random to be reproducible:
+
+    evaluation = AG.sample_jsonl("questions.jsonl", 500, seed=0)
+    balanced = AG.sample_csv("reviews.csv", 100, stratify_by="label", seed=0)
+"""
+
+import math
+import random
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+def _uniform(rng: random.Random) -> float:
+    """A random float in the open interval (0, 1)"""
+    while (u := rng.random()) == 0.0:
+        pass
+    return u
+
+
+def reservoir_sample(
+    items: Iterable[T], size: int, rng: Optional[random.Random] = None
+) -> List[T]:
+    """A uniform sample of size items (all items if fewer) of a stream"""
+    rng = rng or random.Random()
+    items = enumerate(items)
+    reservoir: List[Tuple[int, T]] = list(islice(items, size))
+    if len(reservoir) == size and size > 0:
+        w = math.exp(math.log(_uniform(rng)) / size)
+        while True:
+            skip = math.floor(math.log(_uniform(rng)) / math.log1p(-w))
+            item = next(islice(items, skip, None), None)
+            if item is None:
+                break
+            reservoir[rng.randrange(size)] = item
+            w *= math.exp(math.log(_uniform(rng)) / size)
+    reservoir.sort(key=lambda x: x[0])
+    return [item for _, item in reservoir]
+
+
+def stratified_sample(
+    items: Iterable[T],
+    size: int,
+    key: Callable[[T], Any],
+    rng: Optional[random.Random] = None,
+) -> List[T]:
+    """A uniform sample of size items (all items if fewer) for each value of key"""
+    rng = rng or random.Random()
+    reservoirs: Dict[Any, List[Tuple[int, T]]] = {}
+    seen: Dict[Any, int] = {}
+    for position, item in enumerate(items):
+        stratum = key(item)
+        count = seen.get(stratum, 0)
+        seen[stratum] = count + 1
+        if count < size:
+            reservoirs.setdefault(stratum, []).append((position, item))
+        elif (i := rng.randrange(count + 1)) < size:
+            reservoirs[stratum][i] = (position, item)
+    sample = sorted(
+        (x for reservoir in reservoirs.values() for x in reservoir),
+        key=lambda x: x[0],
+    )
+    return [item for _, item in sample]
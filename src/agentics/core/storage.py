@@ -0,0 +1,1418 @@
+"""
+Storage backends for the states of an AG.
+
+By default AG.states is a plain list of pydantic objects. A StateStore is a
+list-like (MutableSequence) alternative that keeps states in a different layout
+and materializes pydantic objects only when they are accessed, so that every
+operation written against lists keeps working.
+
+ColumnarStates keeps the states in an Arrow table with one column per atype
+field. Compared to a list of pydantic objects it takes a fraction of the memory,
+field projections are free (AG.column) and export paths read the columns
+directly without building pydantic objects.
+
+SQLiteStates keeps the states on disk in a SQLite file and only their ids in
+memory, for AGs larger than RAM.
+
+ProductStates is a lazy view of the cartesian product of two lists of states
+(AG.product).
+
+States returned by __getitem__ and iteration are fresh objects: assign them back
+(ag.states[i] = state) to persist changes.
+"""
+
+import csv
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import weakref
+from abc import abstractmethod
+from array import array
+from collections import OrderedDict
+from collections.abc import MutableSequence
+from copy import copy
+from datetime import date, datetime
+from itertools import islice
+from types import UnionType
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Type,
+    Union,
+    get_args,
+    get_origin,
+)
+
+import pandas as pd
+import pyarrow as pa
+from loguru import logger
+from pydantic import BaseModel
+
+from agentics.core.atype import copy_state, states_adapter
+from agentics.core.utils import clean_for_json, iter_chunks, sanitize_field_name
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BATCH_SIZE = 1024
+ROW_GROUP_SIZE = 64 * BATCH_SIZE
+
+# parquet schema metadata listing the columns stored as json strings
+JSON_COLUMNS_METADATA = b"agentics.json_columns"
+
+
+class StateList(list):
+    """
+    The list of states of an AG. version counts its modifications, so that the
+    indexes built on the states can tell when they are stale.
+    """
+
+    version = 0
+
+
+def _counts_modifications(name: str):
+    method = getattr(list, name)
+
+    def modify(self, *args, **kwargs):
+        self.version += 1
+        return method(self, *args, **kwargs)
+
+    modify.__name__ = name
+    return modify
+
+
+for _name in (
+    "__setitem__",
+    "__delitem__",
+    "__iadd__",
+    "__imul__",
+    "append",
+    "extend",
+    "insert",
+    "pop",
+    "remove",
+    "clear",
+    "sort",
+    "reverse",
+):
+    setattr(StateList, _name, _counts_modifications(_name))
+
+
+class StateStore(MutableSequence):
+    """
+    Base class of the list-like state containers of an AG. Subclasses increment
+    version on every modification (see StateList).
+    """
+
+    atype: Type[BaseModel]
+
+    # AG.amap processes the states of stores with a map_chunk_size that many at a
+    # time, so that only one chunk of states is materialized in memory
+    map_chunk_size: Optional[int] = None
+
+    version = 0
+
+    @abstractmethod
+    def empty(self, atype: Optional[Type[BaseModel]] = None) -> "StateStore":
+        """A new empty store of the same kind (and storage) for states of atype"""
+
+    def take(self, positions: Iterable[int]) -> "StateStore":
+        """A new store with the states at positions"""
+        store = self.empty()
+        store.extend(self[i] for i in positions)
+        return store
+
+    def iter_json_lines(self, chunk_size: int = BATCH_SIZE) -> Iterator[bytes]:
+        """Yields the states serialized as json lines, chunk_size states at a time"""
+        for chunk in iter_chunks(self, chunk_size):
+            yield b"".join(_state_json_line(state, self.atype) for state in chunk)
+
+    def iter_dicts(self, columns: Optional[Sequence[str]] = None) -> Iterator[dict]:
+        """Iterates over the states as python dicts, optionally projected on columns"""
+        for state in self:
+            yield state.model_dump(include=set(columns) if columns else None)
+
+    def column(self, name: str) -> List[Any]:
+        return [row[name] for row in self.iter_dicts([name])]
+
+    def __add__(self, other: Iterable[BaseModel]) -> List[BaseModel]:
+        return list(self) + list(other)
+
+    def __radd__(self, other: Iterable[BaseModel]) -> List[BaseModel]:
+        return list(other) + list(self)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (list, StateStore)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}[{self.atype.__name__}]({len(self)} states)"
+
+
+def iter_state_dicts(
+    states: Union[List[BaseModel], StateStore],
+    columns: Optional[Sequence[str]] = None,
+) -> Iterator[dict]:
+    """Iterates over states as dicts, reading columns directly from a StateStore"""
+    if isinstance(states, StateStore):
+        yield from states.iter_dicts(columns)
+    else:
+        include = set(columns) if columns else None
+        for state in states:
+            yield state.model_dump(include=include)
+
+
+def iter_states_or_rows(
+    states: Union[List[BaseModel], StateStore],
+) -> Iterator[Union[BaseModel, dict]]:
+    """The states of a list, or the rows of a StateStore without building states"""
+    if isinstance(states, StateStore):
+        return states.iter_dicts()
+    return iter(states)
+
+
+def state_row(state: Union[BaseModel, dict, None]) -> dict:
+    """A state or row yielded by iter_states_or_rows as a dict, {} for None"""
+    if state is None:
+        return {}
+    return state if type(state) is dict else state.model_dump()
+
+
+def _unwrap(annotation: Any) -> Any:
+    """Strips Optional from an annotation"""
+    args = [x for x in get_args(annotation) if x is not type(None)]
+    if get_origin(annotation) in (Union, UnionType) and len(args) == 1:
+        return args[0]
+    return annotation
+
+
+def _is_optional(annotation: Any) -> bool:
+    return annotation is Any or (
+        get_origin(annotation) in (Union, UnionType)
+        and type(None) in get_args(annotation)
+    )
+
+
+def _is_model(annotation: Any) -> bool:
+    annotation = _unwrap(annotation)
+    if get_origin(annotation) in (list, List):
+        annotation = _unwrap(get_args(annotation)[0]) if get_args(annotation) else None
+    return isinstance(annotation, type) and issubclass(annotation, BaseModel)
+
+
+ARROW_TYPES = {
+    str: pa.string(),
+    int: pa.int64(),
+    float: pa.float64(),
+    bool: pa.bool_(),
+    date: pa.date32(),
+    datetime: pa.timestamp("us"),
+}
+
+
+def arrow_type(annotation: Any) -> Optional[pa.DataType]:
+    """The arrow type of a scalar annotation, None when it has to be inferred"""
+    return ARROW_TYPES.get(_unwrap(annotation))
+
+
+def _compatible(data_type: pa.DataType, expected: pa.DataType) -> bool:
+    """Whether values of data_type are valid for a field of arrow type expected"""
+    if pa.types.is_null(data_type):
+        return True
+    if pa.types.is_string(expected):
+        return pa.types.is_string(data_type) or pa.types.is_large_string(data_type)
+    if pa.types.is_integer(expected):
+        return pa.types.is_integer(data_type)
+    if pa.types.is_floating(expected):
+        return pa.types.is_integer(data_type) or pa.types.is_floating(data_type)
+    return data_type == expected
+
+
+def _has_validation(atype: Type[BaseModel]) -> bool:
+    """
+    Whether validating a state of atype does more than checking the types of its
+    fields: constraints (e.g. Field(ge=0)), validators or string transformations
+    """
+    decorators = atype.__pydantic_decorators__
+    if (
+        decorators.field_validators
+        or decorators.model_validators
+        or decorators.validators
+        or decorators.root_validators
+    ):
+        return True
+    if any(
+        key.startswith("str_") and value for key, value in atype.model_config.items()
+    ):
+        return True
+    return any(field.metadata for field in atype.model_fields.values())
+
+
+def _table_conforms(atype: Type[BaseModel], table: pa.Table) -> bool:
+    """
+    Whether the rows of table are valid states of atype as they are, i.e. atype
+    has no constraints or validators, all fields are scalars with columns of a
+    compatible type (or missing with a None default), and nulls only appear in
+    optional fields.
+    """
+    if _has_validation(atype):
+        return False
+    for name, field in atype.model_fields.items():
+        expected = arrow_type(field.annotation)
+        if expected is None:
+            return False
+        if name not in table.column_names:
+            if field.is_required() or field.default is not None:
+                return False
+            continue
+        column = table.column(name)
+        if not _compatible(column.type, expected):
+            return False
+        if column.null_count and not _is_optional(field.annotation):
+            return False
+    return True
+
+
+def _dataframe_table(dataframe: pd.DataFrame) -> Optional[pa.Table]:
+    try:
+        return pa.Table.from_pandas(dataframe, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return None
+
+
+def dataframe_rows(dataframe: pd.DataFrame) -> Iterator[dict]:
+    """
+    Iterates over the rows of a DataFrame as dicts of python values, converted
+    column by column (through arrow when the columns have arrow types)
+    """
+    table = _dataframe_table(dataframe)
+    if table is not None:
+        for batch in table.to_batches(max_chunksize=BATCH_SIZE):
+            yield from batch.to_pylist()
+        return
+    names = list(dataframe.columns)
+    columns = [dataframe.iloc[:, i].tolist() for i in range(len(names))]
+    for values in zip(*columns):
+        yield dict(zip(names, values))
+
+
+def states_to_dataframe(
+    atype: Type[BaseModel], states: Sequence[BaseModel]
+) -> pd.DataFrame:
+    """Builds a DataFrame column by column from a list of states of type atype"""
+    decorators = atype.__pydantic_decorators__
+    if (
+        decorators.field_serializers
+        or decorators.model_serializers
+        or atype.model_computed_fields
+        or not all(type(state) is atype for state in states)
+    ):
+        return pd.DataFrame([state.model_dump() for state in states])
+    fields = list(atype.model_fields)
+    if all(arrow_type(field.annotation) for field in atype.model_fields.values()):
+        return pd.DataFrame(
+            {name: [state.__dict__[name] for state in states] for name in fields},
+            columns=fields,
+        )
+    return pd.DataFrame(states_adapter(atype).dump_python(states), columns=fields)
+
+
+def _has_struct(data_type: pa.DataType) -> bool:
+    if pa.types.is_struct(data_type) or pa.types.is_map(data_type):
+        return True
+    if pa.types.is_list(data_type) or pa.types.is_large_list(data_type):
+        return _has_struct(data_type.value_type)
+    return False
+
+
+def _to_arrow(values: List[Any], annotation: Any) -> tuple[pa.Array, bool]:
+    """
+    Converts the values of a field into an arrow array. Values that arrow can't
+    represent faithfully (e.g. dicts with varying keys) are stored as json strings.
+    Returns the array and whether it is json encoded.
+    """
+    try:
+        array = pa.array(values, type=arrow_type(annotation), from_pandas=True)
+        if not _has_struct(array.type) or _is_model(annotation):
+            return array, False
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        pass
+    return (
+        pa.array(
+            [None if v is None else json.dumps(v, default=str) for v in values],
+            type=pa.string(),
+        ),
+        True,
+    )
+
+
+def _has_map(data_type: pa.DataType) -> bool:
+    if pa.types.is_map(data_type):
+        return True
+    if pa.types.is_list(data_type) or pa.types.is_large_list(data_type):
+        return _has_map(data_type.value_type)
+    if pa.types.is_struct(data_type):
+        return any(_has_map(field.type) for field in data_type)
+    return False
+
+
+def _maps_to_dicts(value: Any, data_type: pa.DataType) -> Any:
+    """Converts the (key, value) pairs of the arrow maps within value into dicts"""
+    if value is None:
+        return None
+    if pa.types.is_map(data_type):
+        return {k: _maps_to_dicts(v, data_type.item_type) for k, v in value}
+    if pa.types.is_list(data_type) or pa.types.is_large_list(data_type):
+        return [_maps_to_dicts(x, data_type.value_type) for x in value]
+    if pa.types.is_struct(data_type):
+        return {
+            field.name: _maps_to_dicts(value.get(field.name), field.type)
+            for field in data_type
+        }
+    return value
+
+
+def _json_encode_column(table: pa.Table, name: str) -> pa.Table:
+    column = table.column(name)
+    values = [
+        None if v is None else json.dumps(_maps_to_dicts(v, column.type), default=str)
+        for v in column.to_pylist()
+    ]
+    index = table.column_names.index(name)
+    return table.set_column(index, name, pa.array(values, type=pa.string()))
+
+
+def dumps_json(value: Any) -> bytes:
+    """Compact utf-8 json, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(value, default=str)
+    return json.dumps(
+        value, default=str, ensure_ascii=False, separators=(",", ":")
+    ).encode()
+
+
+def _state_json_line(state: Optional[BaseModel], atype: Type[BaseModel]) -> bytes:
+    """
+    Serializes a state into a json line. States that can't be serialized are
+    cleaned up first and written as an empty atype as a last resort, so that line i
+    of the output always corresponds to state i.
+    """
+    if state is None:
+        return atype().model_dump_json().encode() + b"\n"
+    try:
+        return state.model_dump_json().encode() + b"\n"
+    except Exception:
+        pass
+    try:
+        return dumps_json(clean_for_json(state)) + b"\n"
+    except Exception as e:
+        logger.debug(f"⚠️ Failed to serialize state: {e}")
+        return atype().model_dump_json().encode() + b"\n"
+
+
+def _arrow_json_lines(batch: pa.RecordBatch, json_columns: set[str]) -> bytes:
+    """Serializes the rows of a record batch into json lines"""
+    lines = []
+    for row in batch.to_pylist():
+        for name in json_columns:
+            if row.get(name) is not None:
+                row[name] = json.loads(row[name])
+        lines.append(dumps_json(row))
+    lines.append(b"")
+    return b"\n".join(lines)
+
+
+def iter_json_lines(
+    states: Union[List[BaseModel], StateStore],
+    atype: Type[BaseModel],
+    chunk_size: int = BATCH_SIZE,
+) -> Iterator[bytes]:
+    """Yields the states serialized as json lines, chunk_size states at a time"""
+    if isinstance(states, StateStore):
+        yield from states.iter_json_lines(chunk_size)
+    else:
+        for chunk in iter_chunks(states, chunk_size):
+            yield b"".join(_state_json_line(state, atype) for state in chunk)
+
+
+class ColumnarStates(StateStore):
+    """
+    States stored column-wise in an Arrow table.
+
+    Appended states are buffered in a tail and assigned states are kept as
+    patches until the columns are needed, when they are compacted into the table.
+    """
+
+    def __init__(
+        self,
+        atype: Type[BaseModel],
+        table: Optional[pa.Table] = None,
+        json_columns: Optional[set[str]] = None,
+    ):
+        self.atype = atype
+        if table is None:
+            table = pa.table(
+                {
+                    name: pa.array([], type=arrow_type(field.annotation) or pa.null())
+                    for name, field in atype.model_fields.items()
+                }
+            )
+        self._table = table
+        self._json_columns = set(json_columns or ())
+        self._tail: List[BaseModel] = []
+        self._patches: Dict[int, BaseModel] = {}
+
+    ##### Construction #####
+
+    @classmethod
+    def from_dicts(
+        cls, atype: Type[BaseModel], rows: Sequence[dict]
+    ) -> "ColumnarStates":
+        columns, json_columns = {}, set()
+        for name, field in atype.model_fields.items():
+            array, is_json = _to_arrow(
+                [row.get(name) for row in rows], field.annotation
+            )
+            columns[name] = array
+            if is_json:
+                json_columns.add(name)
+        return cls(atype, pa.table(columns), json_columns)
+
+    @classmethod
+    def from_states(
+        cls, atype: Type[BaseModel], states: Iterable[BaseModel]
+    ) -> "ColumnarStates":
+        return cls.from_rows(atype, (state.model_dump() for state in states))
+
+    @classmethod
+    def from_rows(
+        cls,
+        atype: Type[BaseModel],
+        rows: Iterable[dict],
+        validate: bool = False,
+        batch_size: int = 10 * BATCH_SIZE,
+    ) -> "ColumnarStates":
+        """
+        Builds the columns from an iterable of dicts, one batch at a time, so that
+        no more than batch_size rows are held as python objects.
+        If validate is True each row is validated (and normalized) by atype first.
+        """
+        parts = []
+        for batch in iter_chunks(rows, batch_size):
+            if validate:
+                adapter = states_adapter(atype)
+                batch = adapter.dump_python(adapter.validate_python(batch))
+            parts.append(cls.from_dicts(atype, batch))
+        if not parts:
+            parts.append(cls.from_dicts(atype, []))
+        return cls.concat(atype, parts)
+
+    @classmethod
+    def concat(
+        cls, atype: Type[BaseModel], parts: Sequence["ColumnarStates"]
+    ) -> "ColumnarStates":
+        """Concatenates the tables of several stores of the same atype"""
+        if len(parts) == 1:
+            return parts[0]
+        json_columns = set().union(*(part._json_columns for part in parts))
+        tables = []
+        for part in parts:
+            part._compact()
+            table = part._table
+            for name in json_columns - part._json_columns:
+                table = _json_encode_column(table, name)
+            tables.append(table)
+        return cls(
+            atype,
+            pa.concat_tables(tables, promote_options="permissive"),
+            json_columns,
+        )
+
+    @classmethod
+    def from_arrow(
+        cls,
+        atype: Type[BaseModel],
+        table: pa.Table,
+        json_columns: Optional[set[str]] = None,
+    ) -> "ColumnarStates":
+        """
+        Wraps an arrow table, adding null columns for missing atype fields and
+        casting scalar columns to the arrow type of their field when possible.
+        Columns holding maps are stored as json objects.
+        """
+        json_columns = set(json_columns or ())
+        for name, field in atype.model_fields.items():
+            expected = arrow_type(field.annotation)
+            if name in table.column_names and _has_map(table.column(name).type):
+                # maps are read by arrow as lists of (key, value) pairs
+                table = _json_encode_column(table, name)
+                json_columns.add(name)
+            elif name not in table.column_names:
+                table = table.append_column(
+                    name, pa.nulls(table.num_rows, type=expected or pa.null())
+                )
+            elif expected and name not in json_columns:
+                column = table.column(name)
+                if column.type != expected:
+                    try:
+                        table = table.set_column(
+                            table.column_names.index(name), name, column.cast(expected)
+                        )
+                    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                        pass
+        return cls(
+            atype,
+            table.select(list(atype.model_fields)),
+            json_columns & set(atype.model_fields),
+        )
+
+    @classmethod
+    def from_dataframe(
+        cls, atype: Type[BaseModel], dataframe: pd.DataFrame, validate: bool = True
+    ) -> "ColumnarStates":
+        """
+        Converts the columns of a DataFrame through arrow. Rows are validated one by
+        one only when the column types don't guarantee that they are valid states.
+        """
+        table = _dataframe_table(dataframe)
+        if table is not None and (not validate or _table_conforms(atype, table)):
+            return cls.from_arrow(atype, table)
+        return cls.from_rows(atype, dataframe_rows(dataframe), validate=validate)
+
+    @classmethod
+    def from_parquet(
+        cls,
+        atype: Type[BaseModel],
+        path: str,
+        columns: Optional[Sequence[str]] = None,
+        batch_rows: int = 10 * BATCH_SIZE,
+        max_rows: Optional[int] = None,
+    ) -> "ColumnarStates":
+        """
+        Reads a parquet file batch by batch, decoding only the columns that map to
+        atype fields (optionally restricted to columns).
+        """
+        parts = list(
+            cls.iter_parquet(
+                atype, path, columns=columns, batch_rows=batch_rows, max_rows=max_rows
+            )
+        )
+        return cls.concat(atype, parts) if parts else cls(atype)
+
+    @classmethod
+    def iter_parquet(
+        cls,
+        atype: Type[BaseModel],
+        path: str,
+        columns: Optional[Sequence[str]] = None,
+        batch_rows: int = 10 * BATCH_SIZE,
+        max_rows: Optional[int] = None,
+    ) -> Iterator["ColumnarStates"]:
+        """Yields the states of a parquet file in stores of at most batch_rows rows"""
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        schema = parquet_file.schema_arrow
+        renames = {}
+        for raw in schema.names:
+            name = sanitize_field_name(raw)
+            if name in atype.model_fields and (
+                not columns or raw in columns or name in columns
+            ):
+                renames[raw] = name
+        json_columns = json.loads(
+            (schema.metadata or {}).get(JSON_COLUMNS_METADATA, b"[]")
+        )
+        json_columns = {renames[raw] for raw in json_columns if raw in renames}
+        remaining = max_rows
+        for batch in parquet_file.iter_batches(
+            batch_size=batch_rows, columns=list(renames)
+        ):
+            if remaining is not None:
+                if remaining <= 0:
+                    return
+                batch = batch.slice(0, remaining)
+                remaining -= batch.num_rows
+            table = pa.Table.from_batches([batch])
+            yield cls.from_arrow(
+                atype, table.rename_columns(list(renames.values())), json_columns
+            )
+
+    @classmethod
+    def from_csv(
+        cls, atype: Type[BaseModel], csv_file: str, max_rows: Optional[int] = None
+    ) -> "ColumnarStates":
+        """
+        Reads the atype columns of a CSV file straight into arrow arrays, with the
+        arrow type of scalar fields and strings for everything else.
+        Rows are validated one by one when a value can't be converted, or when
+        atype has constraints or validators.
+        """
+        import pyarrow.csv as pacsv
+
+        with open(csv_file, newline="", encoding="utf-8-sig") as f:
+            header = next(csv.reader(f), [])
+        renames = {
+            raw: sanitize_field_name(raw)
+            for raw in header
+            if sanitize_field_name(raw) in atype.model_fields
+        }
+        if _has_validation(atype):
+            return cls._from_csv_rows(atype, csv_file, renames, max_rows)
+        column_types = {
+            raw: arrow_type(atype.model_fields[name].annotation) or pa.string()
+            for raw, name in renames.items()
+        }
+        try:
+            reader = pacsv.open_csv(
+                csv_file,
+                convert_options=pacsv.ConvertOptions(
+                    column_types=column_types,
+                    include_columns=list(renames),
+                    # only empty cells are None, as in parse_csv_value
+                    null_values=[""],
+                    strings_can_be_null=False,
+                ),
+            )
+            batches, n_rows = [], 0
+            for batch in reader:
+                batches.append(batch)
+                n_rows += batch.num_rows
+                if max_rows and n_rows >= max_rows:
+                    break
+            table = pa.Table.from_batches(batches, schema=reader.schema)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            return cls._from_csv_rows(atype, csv_file, renames, max_rows)
+        if max_rows:
+            table = table.slice(0, max_rows)
+        return cls.from_arrow(atype, table.rename_columns(list(renames.values())))
+
+    @classmethod
+    def _from_csv_rows(
+        cls,
+        atype: Type[BaseModel],
+        csv_file: str,
+        renames: Dict[str, str],
+        max_rows: Optional[int] = None,
+    ) -> "ColumnarStates":
+        with open(csv_file, newline="", encoding="utf-8-sig") as f:
+            rows = (
+                {renames[k]: v for k, v in row.items() if k in renames}
+                for row in islice(csv.DictReader(f), max_rows)
+            )
+            return cls.from_rows(atype, rows, validate=True)
+
+    ##### Sequence protocol #####
+
+    def __len__(self) -> int:
+        return self._table.num_rows + len(self._tail)
+
+    def _index(self, index: int) -> int:
+        n = len(self)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("state index out of range")
+        return index
+
+    def _decode(self, row: dict) -> dict:
+        for name in self._json_columns:
+            if row.get(name) is not None:
+                row[name] = json.loads(row[name])
+        return row
+
+    def _materialize(self, rows: List[dict]) -> List[BaseModel]:
+        return [self.atype.model_validate(self._decode(row)) for row in rows]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._slice(index)
+        index = self._index(index)
+        if index in self._patches:
+            return self._patches[index]
+        if index >= self._table.num_rows:
+            return self._tail[index - self._table.num_rows]
+        return self._materialize(self._table.slice(index, 1).to_pylist())[0]
+
+    def __setitem__(self, index, state: BaseModel):
+        self.version += 1
+        if isinstance(index, slice):
+            states = list(self)
+            states[index] = state
+            self._replace(states)
+            return
+        index = self._index(index)
+        if index >= self._table.num_rows:
+            self._tail[index - self._table.num_rows] = state
+        else:
+            self._patches[index] = state
+
+    def __delitem__(self, index):
+        self.version += 1
+        if isinstance(index, slice):
+            keep = [i for i in range(len(self)) if i not in range(len(self))[index]]
+        else:
+            index = self._index(index)
+            keep = [i for i in range(len(self)) if i != index]
+        self._compact()
+        self._table = self._table.take(pa.array(keep, type=pa.int64()))
+
+    def insert(self, index: int, state: BaseModel):
+        self.version += 1
+        if index >= len(self):
+            self._tail.append(state)
+            return
+        states = list(self)
+        states.insert(index, state)
+        self._replace(states)
+
+    def append(self, state: BaseModel):
+        self.version += 1
+        self._tail.append(state)
+
+    def extend(self, states: Iterable[BaseModel]):
+        self.version += 1
+        self._tail.extend(states)
+
+    def __iter__(self) -> Iterator[BaseModel]:
+        offset = 0
+        for batch in self._table.to_batches(max_chunksize=BATCH_SIZE):
+            states = self._materialize(batch.to_pylist())
+            for i, state in enumerate(states):
+                yield self._patches.get(offset + i, state)
+            offset += batch.num_rows
+        yield from self._tail
+
+    def __deepcopy__(self, memo) -> "ColumnarStates":
+        # arrow buffers are immutable and can be shared
+        new = copy(self)
+        new._json_columns = set(self._json_columns)
+        new._tail = [state.model_copy(deep=True) for state in self._tail]
+        new._patches = {
+            i: state.model_copy(deep=True) for i, state in self._patches.items()
+        }
+        return new
+
+    def __copy__(self) -> "ColumnarStates":
+        new = ColumnarStates(self.atype, self._table, self._json_columns)
+        new._tail = [copy_state(state) for state in self._tail]
+        new._patches = {i: copy_state(state) for i, state in self._patches.items()}
+        return new
+
+    def _slice(self, index: slice) -> "ColumnarStates":
+        start, stop, step = index.indices(len(self))
+        self._compact()
+        if step == 1:
+            table = self._table.slice(start, max(stop - start, 0))
+        else:
+            table = self._table.take(
+                pa.array(range(start, stop, step), type=pa.int64())
+            )
+        return ColumnarStates(self.atype, table, self._json_columns)
+
+    def _replace(self, states: List[BaseModel]):
+        self._replace_rows([state.model_dump() for state in states])
+
+    def _replace_rows(self, rows: List[dict]):
+        other = ColumnarStates.from_dicts(self.atype, rows)
+        self._table, self._json_columns = other._table, other._json_columns
+        self._tail, self._patches = [], {}
+
+    def _compact(self):
+        """
+        Moves the tail and the patches into the arrow table. Only the batches of
+        BATCH_SIZE rows holding patches are rebuilt, other rows are not copied.
+        """
+        if not self._tail and not self._patches:
+            return
+        parts, start = [], 0
+        for batch in sorted({i // BATCH_SIZE for i in self._patches}):
+            offset = batch * BATCH_SIZE
+            if offset > start:
+                parts.append(self._view(self._table.slice(start, offset - start)))
+            rows = self._table.slice(offset, BATCH_SIZE).to_pylist()
+            rows = [
+                (
+                    self._patches[offset + i].model_dump()
+                    if offset + i in self._patches
+                    else self._decode(row)
+                )
+                for i, row in enumerate(rows)
+            ]
+            parts.append(ColumnarStates.from_dicts(self.atype, rows))
+            start = offset + len(rows)
+        if start < self._table.num_rows or not parts:
+            parts.append(self._view(self._table.slice(start)))
+        if self._tail:
+            parts.append(ColumnarStates.from_states(self.atype, self._tail))
+        try:
+            merged = ColumnarStates.concat(self.atype, parts)
+            self._table, self._json_columns = merged._table, merged._json_columns
+            self._tail, self._patches = [], {}
+            return
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass
+        # the new values don't fit the column types, e.g. a str in an int column
+        rows = [self._decode(row) for row in self._table.to_pylist()]
+        for i, state in self._patches.items():
+            rows[i] = state.model_dump()
+        rows.extend(state.model_dump() for state in self._tail)
+        self._replace_rows(rows)
+
+    def _view(self, table: pa.Table) -> "ColumnarStates":
+        return ColumnarStates(self.atype, table, self._json_columns)
+
+    ##### Column access #####
+
+    @property
+    def table(self) -> pa.Table:
+        """The arrow table holding the states (json encoded columns as strings)"""
+        self._compact()
+        return self._table
+
+    def column(self, name: str) -> List[Any]:
+        self._compact()
+        values = self._table.column(name).to_pylist()
+        if name in self._json_columns:
+            values = [None if v is None else json.loads(v) for v in values]
+        return values
+
+    def iter_dicts(self, columns: Optional[Sequence[str]] = None) -> Iterator[dict]:
+        self._compact()
+        table = self._table
+        if columns:
+            table = table.select([x for x in table.column_names if x in columns])
+        for batch in table.to_batches(max_chunksize=BATCH_SIZE):
+            for row in batch.to_pylist():
+                yield self._decode(row)
+
+    def iter_json_lines(self, chunk_size: int = BATCH_SIZE) -> Iterator[bytes]:
+        for batch in self.table.to_batches(max_chunksize=chunk_size):
+            yield _arrow_json_lines(batch, self._json_columns)
+
+    def empty(self, atype: Optional[Type[BaseModel]] = None) -> "ColumnarStates":
+        return ColumnarStates(atype or self.atype)
+
+    def take(self, positions: Iterable[int]) -> "ColumnarStates":
+        self._compact()
+        table = self._table.take(pa.array(list(positions), type=pa.int64()))
+        return ColumnarStates(self.atype, table, self._json_columns)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        table = self.table
+        if not self._json_columns and not any(
+            pa.types.is_nested(field.type) for field in table.schema
+        ):
+            return table.to_pandas()
+        return pd.DataFrame(list(self.iter_dicts()))
+
+    def to_parquet(
+        self,
+        path: str,
+        row_group_size: int = ROW_GROUP_SIZE,
+        compression: str = "zstd",
+    ):
+        """Writes the table to a parquet file, row_group_size rows at a time"""
+        import pyarrow.parquet as pq
+
+        table = self.table
+        metadata = (table.schema.metadata or {}) | {
+            JSON_COLUMNS_METADATA: json.dumps(sorted(self._json_columns)).encode()
+        }
+        pq.write_table(
+            table.replace_schema_metadata(metadata),
+            path,
+            row_group_size=row_group_size,
+            compression=compression,
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return self.table.nbytes
+
+
+def _close_database(conn: sqlite3.Connection, remove: Optional[str]):
+    conn.close()
+    if remove:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(remove + suffix):
+                os.remove(remove + suffix)
+
+
+class _StateDatabase:
+    """
+    An append-only SQLite table of json encoded states, shared by SQLiteStates
+    views. Writes are buffered and committed commit_every rows per transaction,
+    reads go through an LRU cache of cache_pages pages of page_size consecutive rows.
+
+    Rows that are no longer referenced by any view (e.g. replaced by an assignment
+    or an amap) are deleted, and the file vacuumed, once there are more than
+    max_dead_ratio dead rows per live row.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        page_size: int = BATCH_SIZE,
+        cache_pages: int = 64,
+        commit_every: int = 16 * BATCH_SIZE,
+        max_dead_ratio: float = 1.0,
+    ):
+        self.temporary = path is None
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="agentics-", suffix=".sqlite")
+            os.close(fd)
+        self.path = path
+        self.page_size = page_size
+        self.cache_pages = cache_pages
+        self.commit_every = commit_every
+        self.max_dead_ratio = max_dead_ratio
+        # views are unhashable (they compare by value), so they are keyed by id
+        self._views: "weakref.WeakValueDictionary[int, SQLiteStates]" = (
+            weakref.WeakValueDictionary()
+        )
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "PRAGMA synchronous=" + ("OFF" if self.temporary else "NORMAL")
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS states (id INTEGER PRIMARY KEY, data BLOB)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value BLOB)"
+        )
+        self._conn.commit()
+        last_id, n_rows = self._conn.execute(
+            "SELECT MAX(id), COUNT(*) FROM states"
+        ).fetchone()
+        self.next_id = 0 if last_id is None else last_id + 1
+        self.n_rows = n_rows
+        # number of live rows at the last compaction, the next one is only
+        # attempted once the table has grown by max_dead_ratio since then
+        self._n_live = 0
+        self._pending: Dict[int, bytes] = {}
+        self._pages: OrderedDict[int, Dict[int, bytes]] = OrderedDict()
+        self._finalizer = weakref.finalize(
+            self, _close_database, self._conn, path if self.temporary else None
+        )
+
+    def add(self, rows: Iterable[bytes]) -> range:
+        """Appends rows and returns their ids"""
+        with self._lock:
+            start = self.next_id
+            for data in rows:
+                self._pending[self.next_id] = data
+                self.next_id += 1
+                if len(self._pending) >= self.commit_every:
+                    self._flush()
+            self.n_rows += self.next_id - start
+            return range(start, self.next_id)
+
+    def register(self, view: "SQLiteStates"):
+        """Tracks a view, whose ids are kept by compact"""
+        self._views[id(view)] = view
+
+    def maybe_compact(self):
+        """Compacts the table if it may hold too many dead rows"""
+        threshold = max(self.commit_every, (1 + self.max_dead_ratio) * self._n_live)
+        if self.n_rows > threshold:
+            self.compact()
+
+    def compact(self):
+        """Deletes the rows that no view refers to and vacuums the file"""
+        # rows added while the live ids are collected are kept
+        boundary = self.next_id
+        live = set()
+        for view in list(self._views.values()):
+            live.update(view._ids)
+        with self._lock:
+            saved = self._conn.execute(
+                "SELECT value FROM meta WHERE key = 'order'"
+            ).fetchone()
+            if saved is not None:
+                # keep the persisted order readable until it is saved again
+                ids = array("q")
+                ids.frombytes(saved[0])
+                live.update(ids)
+            self._n_live = len(live)
+            if self.n_rows - len(live) <= self.max_dead_ratio * len(live):
+                return
+            self._flush()
+            self._conn.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS live (id INTEGER PRIMARY KEY)"
+            )
+            self._conn.execute("DELETE FROM live")
+            self._conn.executemany(
+                "INSERT INTO live VALUES (?)", ((id,) for id in live)
+            )
+            self._conn.execute(
+                "DELETE FROM states WHERE id < ? AND id NOT IN (SELECT id FROM live)",
+                (boundary,),
+            )
+            self._conn.execute("DELETE FROM live")
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+            self._pages.clear()
+            self.n_rows = self._conn.execute("SELECT COUNT(*) FROM states").fetchone()[
+                0
+            ]
+
+    def _flush(self):
+        if not self._pending:
+            return
+        self._conn.executemany(
+            "INSERT INTO states VALUES (?, ?)", self._pending.items()
+        )
+        self._conn.commit()
+        for id, data in self._pending.items():
+            page = self._pages.get(id // self.page_size)
+            if page is not None:
+                page[id] = data
+        self._pending = {}
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _page(self, key: int) -> Dict[int, bytes]:
+        page = self._pages.get(key)
+        if page is not None:
+            self._pages.move_to_end(key)
+            return page
+        start = key * self.page_size
+        page = dict(
+            self._conn.execute(
+                "SELECT id, data FROM states WHERE id >= ? AND id < ?",
+                (start, start + self.page_size),
+            )
+        )
+        self._pages[key] = page
+        if len(self._pages) > self.cache_pages:
+            self._pages.popitem(last=False)
+        return page
+
+    def get_many(self, ids: Iterable[int]) -> List[bytes]:
+        rows = []
+        page_key, page = None, None
+        with self._lock:
+            for id in ids:
+                data = self._pending.get(id)
+                if data is None:
+                    if id // self.page_size != page_key:
+                        page_key = id // self.page_size
+                        page = self._page(page_key)
+                    data = page[id]
+                rows.append(data)
+        return rows
+
+    def save_order(self, ids: array):
+        with self._lock:
+            self._flush()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('order', ?)", (ids.tobytes(),)
+            )
+            self._conn.commit()
+
+    def load_order(self) -> Optional[array]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM meta WHERE key = 'order'"
+            ).fetchone()
+        if row is None:
+            return None
+        ids = array("q")
+        ids.frombytes(row[0])
+        return ids
+
+    def close(self):
+        with self._lock:
+            self._flush()
+        self._finalizer()
+
+
+class SQLiteStates(StateStore):
+    """
+    States stored on disk in a SQLite file, for AGs that don't fit in memory.
+
+    Only the ids of the states are kept in memory: states are json encoded rows of
+    an append-only table, read through an LRU page cache and written in batched
+    transactions. Assigning a state writes a new row, so slices and copies are
+    cheap views sharing the same file. Rows no view refers to anymore are
+    reclaimed once they outnumber the live ones. Without a path the states live in a
+    temporary file removed when the last view is garbage collected. With a path,
+    flush() or close() persist the current order of the states, and
+    SQLiteStates(atype, path) reopens them.
+
+    Larger than memory inputs can be loaded chunk by chunk:
+
+        states = SQLiteStates(Person, "people.sqlite")
+        for chunk in AG.iter_jsonl("people.jsonl", atype=Person):
+            states.extend(chunk.states)
+        people = AG(atype=Person, states=states)
+    """
+
+    map_chunk_size = 16 * BATCH_SIZE
+
+    def __init__(
+        self,
+        atype: Type[BaseModel],
+        path: Optional[str] = None,
+        page_size: int = BATCH_SIZE,
+        cache_pages: int = 64,
+        commit_every: int = 16 * BATCH_SIZE,
+    ):
+        self.atype = atype
+        self._db = _StateDatabase(
+            path,
+            page_size=page_size,
+            cache_pages=cache_pages,
+            commit_every=commit_every,
+        )
+        self._ids = (None if path is None else self._db.load_order()) or array("q")
+        self._db.register(self)
+
+    @classmethod
+    def _view(cls, atype: Type[BaseModel], db: _StateDatabase, ids: array):
+        view = cls.__new__(cls)
+        view.atype = atype
+        view._db = db
+        view._ids = ids
+        db.register(view)
+        return view
+
+    @classmethod
+    def from_states(
+        cls,
+        atype: Type[BaseModel],
+        states: Iterable[Optional[BaseModel]],
+        path: Optional[str] = None,
+        **kwargs,
+    ) -> "SQLiteStates":
+        store = cls(atype, path, **kwargs)
+        store.extend(states)
+        return store
+
+    @property
+    def path(self) -> str:
+        return self._db.path
+
+    def _encode(self, state: Optional[BaseModel]) -> bytes:
+        if state is None:
+            return b"null"
+        return _state_json_line(state, self.atype)[:-1]
+
+    def _materialize(self, rows: List[bytes]) -> List[Optional[BaseModel]]:
+        if b"null" in rows:
+            return [
+                None if row == b"null" else self.atype.model_validate_json(row)
+                for row in rows
+            ]
+        return states_adapter(self.atype).validate_json(b"[" + b",".join(rows) + b"]")
+
+    def _add(self, states: Iterable[Optional[BaseModel]]) -> range:
+        return self._db.add(self._encode(state) for state in states)
+
+    ##### Sequence protocol #####
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._view(self.atype, self._db, self._ids[index])
+        return self._materialize(self._db.get_many([self._ids[index]]))[0]
+
+    def __setitem__(self, index, state):
+        self.version += 1
+        if isinstance(index, slice):
+            self._ids[index] = array("q", self._add(state))
+        else:
+            self._ids[index] = self._add([state])[0]
+        self._db.maybe_compact()
+
+    def __delitem__(self, index):
+        self.version += 1
+        del self._ids[index]
+
+    def insert(self, index: int, state: Optional[BaseModel]):
+        self.version += 1
+        self._ids.insert(index, self._add([state])[0])
+        self._db.maybe_compact()
+
+    def append(self, state: Optional[BaseModel]):
+        self.version += 1
+        self._ids.extend(self._add([state]))
+        self._db.maybe_compact()
+
+    def extend(self, states: Iterable[Optional[BaseModel]]):
+        self.version += 1
+        if states is self:
+            states = list(states)
+        self._ids.extend(self._add(states))
+        self._db.maybe_compact()
+
+    def _iter_rows(self, chunk_size: int = BATCH_SIZE) -> Iterator[List[bytes]]:
+        for start in range(0, len(self._ids), chunk_size):
+            yield self._db.get_many(self._ids[start : start + chunk_size])
+
+    def __iter__(self) -> Iterator[Optional[BaseModel]]:
+        for rows in self._iter_rows():
+            yield from self._materialize(rows)
+
+    def __copy__(self) -> "SQLiteStates":
+        # rows are never modified in place, copies only need their own ids
+        return self._view(self.atype, self._db, array("q", self._ids))
+
+    def __deepcopy__(self, memo) -> "SQLiteStates":
+        return self.__copy__()
+
+    def empty(self, atype: Optional[Type[BaseModel]] = None) -> "SQLiteStates":
+        return self._view(atype or self.atype, self._db, array("q"))
+
+    def take(self, positions: Iterable[int]) -> "SQLiteStates":
+        ids = self._ids
+        return self._view(self.atype, self._db, array("q", (ids[i] for i in positions)))
+
+    ##### Export #####
+
+    def iter_dicts(self, columns: Optional[Sequence[str]] = None) -> Iterator[dict]:
+        loads = orjson.loads if orjson is not None else json.loads
+        for rows in self._iter_rows():
+            for row in rows:
+                values = loads(row) or {}
+                if columns:
+                    values = {name: values.get(name) for name in columns}
+                yield values
+
+    def iter_json_lines(self, chunk_size: int = BATCH_SIZE) -> Iterator[bytes]:
+        empty = self.atype().model_dump_json().encode()
+        for rows in self._iter_rows(chunk_size):
+            if b"null" in rows:
+                rows = [empty if row == b"null" else row for row in rows]
+            rows.append(b"")
+            yield b"\n".join(rows)
+
+    def flush(self):
+        """Commits pending writes and, for a named file, the order of the states"""
+        if self._db.temporary:
+            self._db.flush()
+        else:
+            self._db.save_order(self._ids)
+
+    def close(self):
+        self.flush()
+        self._db.close()
+
+
+class ProductStates(StateStore):
+    """
+    The cartesian product of two lists of states, as a lazy view.
+
+    State i * len(inner) + j combines the dumps of outer state i and inner state j
+    (outer values win on shared fields) and is only built when it is accessed.
+    Slices made of whole blocks of len(inner) states are views as well. The first
+    modification materializes the product into a list, and stores made from the
+    product (empty, take) are plain lists.
+    """
+
+    map_chunk_size = 16 * BATCH_SIZE
+
+    def __init__(
+        self, atype: Type[BaseModel], outer: Iterable[dict], inner: Iterable[dict]
+    ):
+        self.atype = atype
+        self._outer = list(outer)
+        self._inner = list(inner)
+        self._states: Optional[List[BaseModel]] = None
+
+    def _rows(self, start: int = 0, stop: Optional[int] = None) -> Iterator[dict]:
+        m = len(self._inner)
+        stop = len(self) if stop is None else stop
+        for index in range(start, stop):
+            i, j = divmod(index, m)
+            yield self._inner[j] | self._outer[i]
+
+    def _materialize(self) -> List[BaseModel]:
+        if self._states is None:
+            self._states = list(self)
+            self._outer, self._inner = [], []
+        return self._states
+
+    ##### Sequence protocol #####
+
+    def __len__(self) -> int:
+        if self._states is not None:
+            return len(self._states)
+        return len(self._outer) * len(self._inner)
+
+    def __getitem__(self, index):
+        if self._states is not None:
+            return self._states[index]
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            m = len(self._inner)
+            if step == 1 and m and start % m == 0 and stop % m == 0 and start <= stop:
+                return ProductStates(
+                    self.atype, self._outer[start // m : stop // m], self._inner
+                )
+            return [self[i] for i in range(start, stop, step)]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("state index out of range")
+        return self.atype.model_validate(next(self._rows(index, index + 1)))
+
+    def __setitem__(self, index, state):
+        self.version += 1
+        self._materialize()[index] = state
+
+    def __delitem__(self, index):
+        self.version += 1
+        del self._materialize()[index]
+
+    def insert(self, index: int, state: BaseModel):
+        self.version += 1
+        self._materialize().insert(index, state)
+
+    def __iter__(self) -> Iterator[BaseModel]:
+        if self._states is not None:
+            yield from self._states
+            return
+        for chunk in iter_chunks(self._rows(), BATCH_SIZE):
+            yield from states_adapter(self.atype).validate_python(chunk)
+
+    def __copy__(self) -> "ProductStates":
+        # the dumps of the inputs are never modified, copies can share them
+        new = ProductStates(self.atype, (), ())
+        new._outer, new._inner = self._outer, self._inner
+        if self._states is not None:
+            new._states = [copy_state(state) for state in self._states]
+        return new
+
+    def __deepcopy__(self, memo) -> "ProductStates":
+        new = copy(self)
+        if self._states is not None:
+            new._states = [state.model_copy(deep=True) for state in self._states]
+        return new
+
+    def empty(self, atype: Optional[Type[BaseModel]] = None) -> List[BaseModel]:
+        return []
+
+    def iter_dicts(self, columns: Optional[Sequence[str]] = None) -> Iterator[dict]:
+        if self._states is not None:
+            yield from super().iter_dicts(columns)
+            return
+        for row in self._rows():
+            yield {name: row.get(name) for name in columns} if columns else row
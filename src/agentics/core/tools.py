@@ -0,0 +1,214 @@
+"""
+Memoized and parallel tool calls for tool-using transductions.
+
+The tools of an AG (CrewAI tools, e.g. the tools of an MCPServerAdapter, a DDGS
+web search or a SQL executor) can be wrapped before a transduction so that:
+    - with a tool_cache_ttl, the result of a tool call is reused by identical
+      calls (same tool and normalized arguments) for ttl seconds, across states
+      and transductions, and concurrent identical calls (e.g. several states
+      issuing the same search at once) wait for a single execution instead of
+      running it again;
+    - with parallel_tool_calls, a run_tools_in_parallel tool lets the agent
+      request several independent tool calls in one step, which are executed
+      concurrently.
+
+Both are opt-in: only tools whose results don't depend on when they are called
+should be cached, and the extra tool changes the prompts of the agent.
+
+    ag = AG(
+        atype=Answer, tools=[web_search], tool_cache_ttl=600, parallel_tool_calls=True
+    )
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from crewai.tools import BaseTool
+from pydantic import BaseModel, ConfigDict, Field
+
+from agentics.core.metrics import metrics
+
+TOOL_CACHE_SIZE = 4096
+MAX_PARALLEL_TOOL_CALLS = 8
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, dict):
+        return {key: _normalize(x) for key, x in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(x) for x in value]
+    return value
+
+
+def tool_call_key(name: str, arguments: Dict[str, Any]) -> str:
+    """The cache key of a call: the tool name and its normalized (json) arguments"""
+    return name + json.dumps(_normalize(arguments), sort_keys=True, default=str)
+
+
+class ToolCache:
+    """Results of tool calls by key, with an expiration time per entry"""
+
+    def __init__(self, max_size: int = TOOL_CACHE_SIZE):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._results: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._pending: Dict[str, Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+    def call(self, key: str, func: Callable[[], Any], ttl: Optional[float]) -> Any:
+        """
+        The result of func, reused for ttl seconds (forever if None) by calls with
+        the same key. Concurrent calls with the same key wait for the first one.
+        Exceptions are raised to all waiting callers and are not cached.
+        """
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._results.move_to_end(key)
+                metrics.increment("tools.cache_hits")
+                return entry[1]
+            pending = self._pending.get(key)
+            if pending is None:
+                future = self._pending[key] = Future()
+        if pending is not None:
+            metrics.increment("tools.deduplicated")
+            return pending.result()
+
+        metrics.increment("tools.calls")
+        try:
+            result = func()
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            with self._lock:
+                del self._pending[key]
+        expires = time.monotonic() + ttl if ttl is not None else float("inf")
+        with self._lock:
+            self._results[key] = (expires, result)
+            self._results.move_to_end(key)
+            if len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+        return result
+
+
+# shared by all transductions, so that states of different AGs reuse tool results
+tool_cache = ToolCache()
+
+
+class CachedTool(BaseTool):
+    """A tool whose calls go through a ToolCache"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    tool: BaseTool
+    ttl: Optional[float] = None
+    cache: ToolCache = Field(default=tool_cache, exclude=True)
+
+    def _run(self, *args: Any, **kwargs: Any) -> Any:
+        key = tool_call_key(self.tool.name, {"args": list(args), "kwargs": kwargs})
+        return self.cache.call(key, lambda: self.tool.run(*args, **kwargs), self.ttl)
+
+
+class ToolCall(BaseModel):
+    tool: str = Field(description="The name of the tool to call")
+    arguments: Dict[str, Any] = Field(
+        default_factory=dict, description="The arguments of the tool call"
+    )
+
+
+class ParallelToolCalls(BaseModel):
+    calls: List[ToolCall] = Field(
+        description="Independent tool calls, whose arguments don't depend on each other"
+    )
+
+
+class ParallelTools(BaseTool):
+    """Runs several independent calls of the other tools concurrently"""
+
+    name: str = "run_tools_in_parallel"
+    description: str = (
+        "Runs several independent tool calls at once, e.g. several searches or "
+        "queries, and returns the list of their results in the same order. Use it "
+        "instead of calling the tools one after the other when no call needs the "
+        "result of another."
+    )
+    args_schema: Type[BaseModel] = ParallelToolCalls
+    tools: Dict[str, BaseTool]
+
+    def _call(self, call: ToolCall) -> str:
+        tool = self.tools.get(call.tool)
+        if tool is None:
+            return f"Error: unknown tool {call.tool}, use one of {list(self.tools)}"
+        try:
+            return str(tool.run(**call.arguments))
+        except Exception as e:
+            return f"Error: {e}"
+
+    def _run(self, calls: List[Any]) -> str:
+        calls = [ToolCall.model_validate(call) for call in calls]
+        if not calls:
+            return "[]"
+        workers = min(len(calls), MAX_PARALLEL_TOOL_CALLS)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(self._call, calls))
+        return json.dumps(
+            [
+                {"tool": call.tool, "result": result}
+                for call, result in zip(calls, results)
+            ]
+        )
+
+
+def prepare_tools(
+    tools: Optional[List[Any]],
+    ttl: Optional[float] = 0,
+    parallel: bool = False,
+    cache: ToolCache = tool_cache,
+) -> Optional[List[Any]]:
+    """
+    Wraps the CrewAI tools into CachedTools unless ttl is 0 (None caches results
+    forever) and adds a ParallelTools over them if parallel. Other tools are kept
+    as they are.
+    """
+    if not tools:
+        return tools
+    prepared = []
+    for tool in tools:
+        if (
+            isinstance(tool, BaseTool)
+            and not isinstance(tool, (CachedTool, ParallelTools))
+            and ttl != 0
+        ):
+            tool = CachedTool(
+                name=tool.name,
+                description=tool.description,
+                args_schema=tool.args_schema,
+                result_as_answer=tool.result_as_answer,
+                tool=tool,
+                ttl=ttl,
+                cache=cache,
+            )
+        prepared.append(tool)
+    callable_tools = {
+        tool.name: tool
+        for tool in prepared
+        if isinstance(tool, BaseTool) and not isinstance(tool, ParallelTools)
+    }
+    if parallel and callable_tools and len(callable_tools) == len(prepared):
+        prepared.append(ParallelTools(tools=callable_tools))
+    return prepared
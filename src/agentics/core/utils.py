@@ -1,39 +1,34 @@
 import asyncio
+import gc
 import inspect
+import json
 import os
 import re
+import threading
 from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import islice
 from typing import (
     Any,
     Awaitable,
     Callable,
-    Dict,
+    Iterator,
     List,
     Optional,
     Sequence,
-    Union,
     get_origin,
 )
 
 import httpx
-import pandas as pd
 from dotenv import load_dotenv
 from loguru import logger
 from openai import APIStatusError, AsyncOpenAI
 from pydantic import BaseModel, Field, create_model
-from rich.progress import (
-    BarColumn,
-    MofNCompleteColumn,
-    Progress,
-    ProgressColumn,
-    SpinnerColumn,
-    Task,
-    Text,
-    TextColumn,
-    TimeElapsedColumn,
-    TimeRemainingColumn,
-)
-from numerize.numerize import numerize
+
+from agentics.core.cassette import cassette_call
+from agentics.core.progress import StyledColumn, TransductionSpeed, make_progress
 
 load_dotenv()
 
@@ -57,32 +52,7 @@ def scan_directory_recursively(path: str) -> List[str]:
     return files
 
 
-def infer_pydantic_type(dtype: Any, sample_values: pd.Series = None) -> Any:
-    if pd.api.types.is_integer_dtype(dtype):
-        return Optional[int]
-    elif pd.api.types.is_float_dtype(dtype):
-        return Optional[float]
-    elif pd.api.types.is_bool_dtype(dtype):
-        return Optional[bool]
-    elif pd.api.types.is_datetime64_any_dtype(dtype):
-        return Optional[str]  # Or datetime.datetime
-    elif sample_values is not None:
-        # Check if the column contains lists of strings
-        for val in sample_values:
-            if isinstance(val, list) and all(isinstance(x, str) for x in val):
-                return Optional[List[str]]
-            elif isinstance(val, dict):
-                if all(isinstance(k, str) for k in val.keys()):
-                    if all(
-                        isinstance(v, (str, list))
-                        and (isinstance(v, str) or all(isinstance(i, str) for i in v))
-                        for v in val.values()
-                    ):
-                        return Optional[Dict[str, Union[str, List[str]]]]
-            break  # Only check the first non-null value
-    return Optional[str]
-
-
+@lru_cache(maxsize=4096)
 def sanitize_field_name(name: str) -> str:
     name = name.strip()
     # Remove underscores only from the start
@@ -117,6 +87,176 @@ def chunk_list(lst, chunk_size):
     return [lst[i : i + chunk_size] for i in range(0, len(lst), chunk_size)]
 
 
+_gc_lock = threading.Lock()
+_gc_pauses = 0
+
+
+@contextmanager
+def gc_paused():
+    """
+    Pauses the cyclic garbage collector while a large batch of (acyclic) objects
+    such as states is built, where it would otherwise run over and over. The
+    collector is process wide: only wrap loops building objects, never code that
+    awaits or runs user callbacks. It is enabled again when the last of
+    concurrent (e.g. threaded) pauses ends.
+    """
+    global _gc_pauses
+    with _gc_lock:
+        if _gc_pauses == 0 and not gc.isenabled():
+            # disabled by the application, leave it alone
+            paused = False
+        else:
+            paused = True
+            _gc_pauses += 1
+            gc.disable()
+    try:
+        yield
+    finally:
+        if paused:
+            with _gc_lock:
+                _gc_pauses -= 1
+                if _gc_pauses == 0:
+                    gc.enable()
+
+
+def iter_chunks(iterable: Iterable[Any], chunk_size: int) -> Iterator[List[Any]]:
+    """Lazily splits an iterable into lists of chunk_size items, the last one possibly shorter"""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, chunk_size)):
+        yield chunk
+
+
+COMPRESSIONS = {".gz": "gzip", ".zst": "zstd", ".zstd": "zstd"}
+
+
+def open_compressed(
+    path: str,
+    mode: str = "rb",
+    compression: Optional[str] = None,
+    threads: int = 0,
+):
+    """
+    Opens a file that is optionally compressed with "gzip" or "zstd" (the latter
+    requires the zstandard package). The compression is inferred from the file
+    extension (.gz, .zst) when not given. zstd compresses with `threads` threads.
+    """
+    compression = compression or COMPRESSIONS.get(os.path.splitext(str(path))[1])
+    encoding = None if "b" in mode else "utf-8"
+    if compression == "gzip":
+        import gzip
+
+        return gzip.open(path, mode, encoding=encoding)
+    elif compression == "zstd":
+        import zstandard
+
+        cctx = zstandard.ZstdCompressor(threads=threads) if threads > 1 else None
+        return zstandard.open(path, mode, cctx=cctx, encoding=encoding)
+    elif compression:
+        raise ValueError(f"Unsupported compression: {compression}")
+    return open(path, mode, buffering=1 << 20, encoding=encoding)
+
+
+def write_chunks(f, chunks: Iterable[bytes], background: bool = False):
+    """
+    Writes chunks to f. In the background, the write (and compression) of a chunk
+    overlaps with the production of the next one.
+    """
+    if not background:
+        for chunk in chunks:
+            f.write(chunk)
+        return
+    with ThreadPoolExecutor(max_workers=1) as writer:
+        pending = None
+        for chunk in chunks:
+            if pending:
+                pending.result()
+            pending = writer.submit(f.write, chunk)
+        if pending:
+            pending.result()
+
+
+def iter_jsonl_lines(path: str) -> Iterator[str]:
+    """Yields the non blank lines of a (compressed) jsonl file, without parsing them"""
+    with open_compressed(path, "rt") as f:
+        for line in f:
+            if line.strip():
+                yield line
+
+
+def iter_jsonl_rows(path: str) -> Iterator[Any]:
+    """Yields the json value of each non blank line of a (compressed) jsonl file"""
+    return map(json.loads, iter_jsonl_lines(path))
+
+
+def iter_json_array(path: str, buffer_size: int = 1 << 16) -> Iterator[Any]:
+    """
+    Yields the items of a file holding a JSON array one at a time, so that the file
+    is never loaded in memory as a whole. The file is read buffer_size characters at
+    a time, and the buffer grows as needed to hold the largest item.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buffer = f.read(buffer_size).lstrip()
+        eof = not buffer
+        if not buffer.startswith("["):
+            raise json.JSONDecodeError("Expecting a JSON array", buffer, 0)
+        pos = 1
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
+            if pos < len(buffer):
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                    # a number at the end of the buffer may continue in the next read
+                    if end < len(buffer) or eof:
+                        pos = end
+                        yield item
+                        continue
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+            if eof:
+                raise json.JSONDecodeError("Unterminated JSON array", buffer, pos)
+            chunk = f.read(max(buffer_size, len(buffer) - pos))
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a text, about four characters per token"""
+    return len(text) // 4 + 1
+
+
+def chunk_states(
+    states: List[BaseModel],
+    max_size: Optional[int] = None,
+    token_budget: Optional[int] = None,
+) -> List[List[BaseModel]]:
+    """
+    Splits a list of states into consecutive chunks of at most max_size states, whose
+    json serialization is at most token_budget estimated tokens. A state exceeding the
+    budget on its own makes a chunk by itself.
+    """
+    if not token_budget:
+        return chunk_list(states, max_size or len(states) or 1)
+    chunks, chunk, chunk_tokens = [], [], 0
+    for state in states:
+        tokens = estimate_tokens(state.model_dump_json())
+        if chunk and (
+            chunk_tokens + tokens > token_budget
+            or (max_size and len(chunk) >= max_size)
+        ):
+            chunks.append(chunk)
+            chunk, chunk_tokens = [], 0
+        chunk.append(state)
+        chunk_tokens += tokens
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
 def clean_for_json(obj: Any) -> Any:
     if isinstance(obj, BaseModel):
         return {k: clean_for_json(v) for k, v in obj.model_dump().items()}
@@ -166,7 +306,13 @@ def process_raw_completion_one(raw_completion):
 
 
 async def openai_response(
-    model, base_url, user_prompt, system_prompt=None, history_messages=[], **kwargs
+    model,
+    base_url,
+    user_prompt,
+    system_prompt=None,
+    history_messages=[],
+    client: Optional[AsyncOpenAI] = None,
+    **kwargs,
 ):
     messages = []
     if system_prompt:
@@ -175,7 +321,8 @@ async def openai_response(
     messages.append({"role": "user", "content": user_prompt})
 
     try:
-        client = AsyncOpenAI(
+        # reuse the caller's client (and its connection pool) when provided
+        client = client or AsyncOpenAI(
             api_key="EMPTY",
             base_url=base_url,
             default_headers={
@@ -183,13 +330,20 @@ async def openai_response(
             },
         )
 
-        completion = await client.chat.completions.create(
-            model=model, messages=messages, timeout=100, **kwargs
+        async def complete():
+            completion = await client.chat.completions.create(
+                model=model, messages=messages, timeout=100, **kwargs
+            )
+            if kwargs.get("logprobs"):
+                return process_raw_completion_all(completion)
+            else:
+                return process_raw_completion_one(completion)
+
+        return await cassette_call(
+            "openai_response",
+            {"model": model, "messages": messages, **kwargs},
+            complete,
         )
-        if kwargs["logprobs"]:
-            return process_raw_completion_all(completion, **kwargs)
-        else:
-            return process_raw_completion_one(completion)
     except APIStatusError as e:
         logger.error(f"API Error ({e.status_code}): {e.response.json()}")
         raise
@@ -247,45 +401,26 @@ async def async_odered_progress(
     description: str = "Working",
     timeout: Optional[float] = None,
     transient_pbar: bool = False,
+    progress_backend: Optional[str] = None,
 ) -> list[Any]:
-    """Show a Rich progress bar while awaiting async execution."""
-    if transient_pbar:
-        columns = (
-            SpinnerColumn(style="grey50"),
-            StyledColumn(TimeElapsedColumn()),
-            TextColumn("{task.description}", style="grey50"),
-            BarColumn(
-                bar_width=40,
-                style="grey30",
-                complete_style="grey58",
-                finished_style="grey62",
-                pulse_style="grey50",
-            ),
-            StyledColumn(MofNCompleteColumn()),
-            StyledColumn(TransductionSpeed()),
-            StyledColumn(TimeRemainingColumn()),
-        )
-    else:
-        columns = (
-            SpinnerColumn(),
-            TimeElapsedColumn(),
-            TextColumn(f"[bold]{description}"),
-            BarColumn(),
-            MofNCompleteColumn(),
-            TransductionSpeed(),
-            TimeRemainingColumn(),
-        )
-    with Progress(*columns, transient=transient_pbar) as progress:
+    """Report progress (see agentics.core.progress) while awaiting async execution."""
+    with make_progress(
+        description,
+        total=len(inputs),
+        transient=transient_pbar,
+        backend=progress_backend,
+    ) as progress:
 
         async def track(index: int, coro: Awaitable[Any]) -> Any:
+            failed = False
             try:
                 return index, await coro
             except Exception as e:
+                failed = True
                 return index, e  # TODO: we can put the retry here
             finally:
-                progress.advance(task_id)
+                progress.advance(failed=failed)
 
-        task_id = progress.add_task(description, total=len(inputs))
         tasks = [asyncio.create_task(track(i, work(x))) for i, x in enumerate(inputs)]
         results: list[Any] = [None] * len(tasks)
 
@@ -294,30 +429,3 @@ async def async_odered_progress(
             i, val = await fut
             results[i] = val
         return results
-
-
-class StyledColumn(ProgressColumn):
-    """Apply a Rich style to the renderable of another column."""
-
-    def __init__(self, inner: ProgressColumn, style: str = "grey50"):
-        super().__init__()
-        self.inner = inner
-        self.style = style
-
-    def render(self, task: Task):
-        r = self.inner.render(task)
-        if isinstance(r, Text):
-            r.stylize(self.style)
-            return r
-        return Text(str(r), style=self.style)
-
-
-class TransductionSpeed(ProgressColumn):
-    """Renders human readable transfer speed."""
-
-    def render(self, task: "Task") -> Text:
-        """Show data transfer speed."""
-        speed = task.finished_speed or task.speed
-        if speed is None:
-            return Text("? states/s", style="progress.data.speed")
-        return Text(f"{numerize(speed, 2)} states/s", style="progress.data.speed")
@@ -0,0 +1,87 @@
+import json
+from typing import List, Optional
+
+import pytest
+from openai import AsyncOpenAI
+from pydantic import BaseModel
+
+from agentics import AG
+from agentics.core.utils import chunk_states, estimate_tokens
+from benchmarks.mock_llm_server import MockLLMServer
+
+
+class Number(BaseModel):
+    value: int = 0
+
+
+class Summary(BaseModel):
+    summary: Optional[str] = None
+
+
+def numbers(n: int, llm=None) -> AG:
+    return AG(atype=Number, states=[Number(value=i) for i in range(n)], llm=llm)
+
+
+async def add(states: List[Number]) -> Number:
+    return Number(value=sum(state.value for state in states))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fan_in", [None, 2, 3, 10, 1000])
+async def test_tree_reduction_matches_flat_reduction(fan_in):
+    output = await numbers(100).areduce(add, fan_in=fan_in)
+    assert len(output) == 1
+    assert output[0].value == sum(range(100))
+
+
+@pytest.mark.asyncio
+async def test_tree_reduction_levels():
+    calls = []
+
+    async def add_and_count(states: List[Number]) -> Number:
+        calls.append(len(states))
+        return await add(states)
+
+    await numbers(27).areduce(add_and_count, fan_in=3)
+    # 9 + 3 chunk reductions and a final one
+    assert calls == [3] * 13
+
+
+@pytest.mark.asyncio
+async def test_reducer_must_reduce():
+    async def identity(states):
+        return states
+
+    with pytest.raises(ValueError):
+        await numbers(10).areduce(identity, fan_in=2)
+
+
+def test_chunk_states_by_token_budget():
+    states = [Number(value=i) for i in range(50)]
+    budget = 3 * estimate_tokens(states[0].model_dump_json())
+    chunks = chunk_states(states, max_size=10, token_budget=budget)
+    assert sum(len(chunk) for chunk in chunks) == 50
+    assert all(len(chunk) <= 3 for chunk in chunks)
+    assert len(chunk_states(states, max_size=10)) == 5
+
+
+@pytest.mark.asyncio
+async def test_transduction_reducer_within_token_budget():
+    with MockLLMServer() as server:
+        llm = AsyncOpenAI(api_key="EMPTY", base_url=server.url, max_retries=0)
+        source = numbers(40, llm=llm)
+        reducer = source.transduction_reducer(Summary)
+        output = await source.areduce(reducer, fan_in=8, token_budget=10_000)
+        assert output.atype is Summary
+        assert len(output) == 1 and output[0].summary
+        # 5 chunks of 8 numbers, then one reduction of the 5 summaries
+        assert server.n_requests == 6
+
+
+@pytest.mark.asyncio
+async def test_states_over_token_budget():
+    ag = AG(
+        atype=Summary, states=[Summary(summary="x" * 400) for _ in range(4)], llm=None
+    )
+    with pytest.raises(ValueError, match="State 0 has 1.. estimated tokens"):
+        await ag.areduce(add, token_budget=50)
@@ -0,0 +1,194 @@
+import json
+from datetime import date
+from typing import Any, Dict, List, Optional, Union
+
+from pydantic import BaseModel, Field
+
+from agentics import AG
+from agentics.core.atype import (
+    atype_json_schema,
+    cached_model,
+    compile_merge,
+    infer_file_atype,
+    make_all_fields_optional,
+    parse_csv_value,
+)
+from agentics.core.llm_connections import available_llms
+
+
+class Movie(BaseModel):
+    title: Optional[str] = Field(None, description="The title")
+    year: Optional[int] = None
+    genres: List[str] = []
+
+
+def test_cached_model_is_interned():
+    fields = {"title": (Optional[str], None), "tags": (List[str], [])}
+    model = cached_model("Tagged", **fields)
+    assert cached_model("Tagged", **fields) is model
+    assert cached_model("Tagged", title=(Optional[str], None)) is not model
+    assert cached_model("Other", **fields) is not model
+    assert atype_json_schema(model) is atype_json_schema(model)
+    assert atype_json_schema(model) == model.model_json_schema()
+
+
+def test_dynamic_atypes_are_reused(monkeypatch):
+    monkeypatch.setitem(available_llms, "none", None)
+    ag = AG(atype=Movie, states=[Movie(title="Alien", year=1979)], llm=None)
+    assert ag.subset_atype(["title"]) is ag.subset_atype(["title"])
+    assert ag.subset_atype(["title"]) is not ag.subset_atype(["year"])
+    assert (
+        ag.add_attribute("rating", int).atype is ag.add_attribute("rating", int).atype
+    )
+    assert ag.add_attribute("rating", int).atype is not (
+        ag.add_attribute("rating", float).atype
+    )
+    assert ag.merge(ag).atype is ag.merge(ag).atype
+    assert ag.product(ag).atype is ag.product(ag).atype
+    assert make_all_fields_optional(Movie) is make_all_fields_optional(Movie)
+    assert ag("title").atype is ag("title").atype
+
+
+class Review(BaseModel):
+    title: Optional[str] = None
+    stars: Optional[int] = None
+    movie: Optional[Movie] = None
+
+
+class Rated(BaseModel):
+    title: Optional[str] = None
+    stars: Optional[float] = None
+    movie: Optional[dict] = None
+
+
+def test_compile_merge():
+    movie = Movie(title="Alien", year=1979)
+    review = Review(title="Great", stars=5, movie=movie)
+    merge = compile_merge(Review, (Movie, None), (Review, None))
+    assert compile_merge(Review, (Movie, None), (Review, None)) is merge
+    row = merge(movie, review)
+    assert row == {"title": "Great", "stars": 5, "movie": movie}
+    assert row["movie"] is movie
+
+    # differing annotations are dumped, absent sources are skipped
+    merge = compile_merge(Rated, (None, None), (Review, None))
+    assert merge(None, review)["movie"] == movie.model_dump()
+    project = compile_merge(Movie, (Review, (("title", "title"), ("stars", "year"))))
+    assert project(review) == {"title": "Great", "year": 5}
+
+    # rows read from a state store are merged like states
+    merge = compile_merge(Review, (Movie, None), (Review, None))
+    row = merge({"title": "Alien", "year": 1979}, review.model_dump())
+    assert row == {"title": "Great", "stars": 5, "movie": movie.model_dump()}
+    assert project({"title": "Good"}) == {"title": "Good", "year": None}
+
+
+def test_rebind_atype(monkeypatch):
+    ag = AG(
+        atype=Review,
+        states=[
+            Review(title=f"r{i}", stars=i, movie=Movie(title="m")) for i in range(5)
+        ],
+        llm=None,
+    )
+    rated = ag.rebind_atype(Rated)
+    assert rated.atype is Rated
+    assert rated[2].model_dump() == {
+        "title": "r2",
+        "stars": 2.0,
+        "movie": {"title": "m", "year": None, "genres": []},
+    }
+    movies = ag.rebind_atype(Movie, {"title": "title", "stars": "year"})
+    assert [x.year for x in movies] == [0, 1, 2, 3, 4]
+    assert movies[0].genres == []
+    assert ag.to_columnar().rebind_atype(Movie, {"stars": "year"})[3].year == 3
+
+
+def test_infer_jsonl_atype(tmp_path):
+    path = tmp_path / "movies.jsonl"
+    rows = [
+        {"title": "Alien", "year": 1979, "meta": {"lang": "en"}, "tags": ["sf"]},
+        {"title": "Heat", "year": None, "meta": {"rating": 8.3}, "tags": []},
+        {"title": 1917, "score": 7, "meta": None, "extra": {}},
+        {"title": "Up", "score": 8.5},
+    ]
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+    atype = infer_file_atype(path)
+    fields = {name: field.annotation for name, field in atype.model_fields.items()}
+    assert fields["title"] == Optional[Union[str, int]]
+    assert fields["year"] == Optional[int] and fields["score"] == Optional[float]
+    assert fields["tags"] == Optional[List[Optional[str]]]
+    assert fields["extra"] == Optional[Dict[str, Any]]
+    meta = fields["meta"].__args__[0]
+    assert list(meta.model_fields) == ["lang", "rating"]
+    assert infer_file_atype(path) is atype
+
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows[:2]))
+    assert infer_file_atype(path) is not atype
+
+
+def test_infer_csv_atype(tmp_path, monkeypatch):
+    monkeypatch.setitem(available_llms, "none", None)
+    assert parse_csv_value("") is None and parse_csv_value("FALSE") is False
+    assert parse_csv_value("007") == "007" and parse_csv_value("-1e3") == -1000.0
+    assert parse_csv_value("2024-02-30") == "2024-02-30"
+
+    path = tmp_path / "movies.csv"
+    path.write_text(
+        "title,year,rating,seen,released,code\n"
+        "Alien,1979,8.5,true,1979-05-25,01\n"
+        "1917,,8,false,,7\n"
+    )
+    atype = infer_file_atype(path, "csv")
+    fields = {name: field.annotation for name, field in atype.model_fields.items()}
+    assert fields == {
+        "title": Optional[str],
+        "year": Optional[int],
+        "rating": Optional[float],
+        "seen": Optional[bool],
+        "released": Optional[date],
+        "code": Optional[str],
+    }
+    ag = AG.from_csv(path)
+    assert ag.atype is atype
+    assert ag[1].model_dump() == {
+        "title": "1917",
+        "year": None,
+        "rating": 8.0,
+        "seen": False,
+        "released": None,
+        "code": "7",
+    }
+    assert list(AG.from_csv(path, columnar=True)) == ag.states
+
+
+def test_csv_rows_beyond_the_inference_sample(tmp_path, monkeypatch):
+    monkeypatch.setitem(available_llms, "none", None)
+    path = tmp_path / "counts.csv"
+    path.write_text(
+        "name,n\n" + "".join(f"r{i},{i if i < 1100 else 'n/a'}\n" for i in range(1200))
+    )
+    assert infer_file_atype(path, "csv").model_fields["n"].annotation == Optional[int]
+    for ag in (
+        AG.from_csv(path),
+        AG.from_csv(path, columnar=True),
+        AG.sample_csv(str(path), 1200),
+    ):
+        assert ag.atype.model_fields["n"].annotation == Optional[str]
+        assert [x.n for x in ag][1099:1101] == ["1099", "n/a"]
+    chunks = list(AG.iter_csv(path, chunk_size=1000))
+    assert [len(x) for x in chunks] == [1000, 200]
+    assert chunks[0][5].n == 5 and chunks[1][150].n == "n/a"
+
+
+def test_gc_paused_is_scoped():
+    import gc
+
+    from agentics.core.utils import gc_paused
+
+    assert gc.isenabled()
+    with gc_paused():
+        with gc_paused():
+            assert not gc.isenabled()
+        assert not gc.isenabled()
+    assert gc.isenabled()
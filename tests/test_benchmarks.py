@@ -0,0 +1,60 @@
+import json
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from benchmarks.mock_llm_server import LatencyModel, fake_from_schema
+from benchmarks.run_benchmarks import SCENARIOS, main
+
+
+class Inner(BaseModel):
+    name: Optional[str] = None
+    values: List[int] = []
+
+
+class Outer(BaseModel):
+    label: Optional[str] = None
+    score: float = 0
+    flag: Optional[bool] = None
+    inner: Optional[Inner] = None
+    inners: Optional[List[Inner]] = None
+
+
+def test_fake_from_schema_conforms_to_atype():
+    import random
+
+    rng = random.Random(0)
+    for _ in range(20):
+        fake = fake_from_schema(Outer.model_json_schema(), rng)
+        state = Outer.model_validate(fake)
+        assert state.label is not None
+        assert state.inner is not None
+
+
+def test_latency_model():
+    import random
+
+    assert LatencyModel.parse("fixed:50").sample(random.Random(0)) == 0.05
+    uniform = LatencyModel.parse("uniform:10,20")
+    assert all(0.01 <= uniform.sample(random.Random(i)) <= 0.02 for i in range(10))
+
+
+def test_benchmark_smoke(tmp_path):
+    report = tmp_path / "report.json"
+    assert main(["--sizes", "20", "--output", str(report)]) == 0
+
+    results = json.loads(report.read_text())
+    assert [r["scenario"] for r in results] == list(SCENARIOS)
+    for result in results:
+        assert result["n_output"] == 20
+        assert result["n_errors"] == 0
+        assert result["throughput"] > 0
+        assert result["overhead_per_item"] > 0
+        # latencies are measured through the Agentics call, not by the server
+        assert 0 < result["p50_ms"] <= result["seconds"] * 1000
+
+    # a baseline far below the measured overhead is reported as a regression
+    for result in results:
+        result["overhead_per_item"] /= 100
+    report.write_text(json.dumps(results))
+    assert main(["--sizes", "20", "--baseline", str(report)]) == 1
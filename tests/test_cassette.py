@@ -0,0 +1,91 @@
+from typing import Optional
+
+import pytest
+from openai import AsyncOpenAI
+from pydantic import BaseModel
+
+from agentics import AG
+from agentics.core import cassette as cassette_module
+from agentics.core.cassette import get_active_cassette, use_cassette
+from agentics.core.errors import CassetteMissError
+from benchmarks.mock_llm_server import MockLLMServer
+
+
+class Question(BaseModel):
+    question: Optional[str] = None
+
+
+class Answer(BaseModel):
+    answer: Optional[str] = None
+    confidence: Optional[float] = None
+
+
+def questions(n: int, llm) -> AG:
+    return AG(
+        atype=Question, states=[Question(question=f"q{i}") for i in range(n)], llm=llm
+    )
+
+
+@pytest.mark.asyncio
+async def test_record_and_replay(tmp_path):
+    path = str(tmp_path / "run.cassette")
+
+    with MockLLMServer() as server:
+        llm = AsyncOpenAI(api_key="EMPTY", base_url=server.url, max_retries=0)
+        with use_cassette(path, mode="record") as cassette:
+            recorded = await (AG(atype=Answer, llm=llm) << questions(10, llm))
+        assert cassette.n_recorded == 10
+        assert server.n_requests == 10
+
+    # the server is gone, every answer must come from the cassette
+    llm = AsyncOpenAI(api_key="EMPTY", base_url=server.url, max_retries=0)
+    with use_cassette(path, mode="replay", latency=0.001) as cassette:
+        replayed = await (AG(atype=Answer, llm=llm) << questions(10, llm))
+    assert cassette.n_hits == 10
+    assert [s.answer for s in replayed] == [s.answer for s in recorded]
+    assert replayed[0].answer is not None
+
+
+@pytest.mark.asyncio
+async def test_replay_miss_is_an_error(tmp_path):
+    path = str(tmp_path / "empty.cassette")
+    with use_cassette(path, mode="record"):
+        pass
+
+    llm = AsyncOpenAI(api_key="EMPTY", base_url="http://127.0.0.1:9/v1")
+    with use_cassette(path, mode="replay") as cassette:
+        from agentics.core.utils import openai_response
+
+        with pytest.raises(CassetteMissError):
+            await openai_response("mock", None, "hello", client=llm, logprobs=False)
+    assert cassette.n_misses == 1
+
+
+@pytest.mark.asyncio
+async def test_extra_identical_requests_miss(tmp_path):
+    from agentics.core.utils import openai_response
+
+    path = str(tmp_path / "once.cassette")
+    with MockLLMServer() as server:
+        llm = AsyncOpenAI(api_key="EMPTY", base_url=server.url, max_retries=0)
+        with use_cassette(path, mode="record"):
+            await openai_response("mock", None, "hello", client=llm, logprobs=False)
+
+        with use_cassette(path, mode="replay") as cassette:
+            await openai_response("mock", None, "hello", client=llm, logprobs=False)
+            with pytest.raises(CassetteMissError):
+                await openai_response("mock", None, "hello", client=llm, logprobs=False)
+    assert cassette.n_hits == 1 and cassette.n_misses == 1
+
+
+def test_env_cassette_is_opened_lazily(tmp_path, monkeypatch):
+    path = str(tmp_path / "env.cassette")
+    monkeypatch.setattr(cassette_module, "_env_cassette", None)
+    monkeypatch.setattr(cassette_module, "_env_cassette_loaded", False)
+    # e.g. loaded from .env after the package was imported
+    monkeypatch.setenv("AGENTICS_CASSETTE", path)
+    monkeypatch.setenv("AGENTICS_CASSETTE_MODE", "record")
+    cassette = get_active_cassette()
+    assert cassette is not None and cassette.path == path
+    assert get_active_cassette() is cassette
+    cassette.close()
@@ -0,0 +1,127 @@
+from typing import Optional
+
+import pytest
+from openai import AsyncOpenAI
+from pydantic import BaseModel
+
+from agentics import AG
+from agentics.core.async_executor import PydanticTransducerVLLM
+from agentics.core.incremental import FingerprintStore, transduction_fingerprint
+from agentics.core.metrics import metrics
+from benchmarks.mock_llm_server import MockLLMServer
+
+
+class Review(BaseModel):
+    text: Optional[str] = None
+    sentiment: Optional[str] = None
+
+
+def reviews(texts, llm) -> AG:
+    return AG(atype=Review, states=[Review(text=x) for x in texts], llm=llm)
+
+
+@pytest.mark.asyncio
+async def test_incremental_self_transduction(tmp_path):
+    path = str(tmp_path / "sentiment.fingerprints")
+    texts = [f"review {i}" for i in range(10)]
+
+    with MockLLMServer() as server:
+        llm = AsyncOpenAI(api_key="EMPTY", base_url=server.url, max_retries=0)
+        first = await reviews(texts, llm).self_transduction(
+            ["text"], ["sentiment"], incremental_path=path
+        )
+        assert server.n_requests == 10
+        assert len(FingerprintStore(path)) == 10
+
+        texts[3], texts[7] = "changed", "review 7 (edited)"
+        second = await reviews(texts + ["new"], llm).self_transduction(
+            ["text"], ["sentiment"], incremental_path=path
+        )
+        assert server.n_requests == 13
+        assert [x.text for x in second] == texts + ["new"]
+        unchanged = [i for i in range(10) if i not in (3, 7)]
+        assert [second[i].sentiment for i in unchanged] == [
+            first[i].sentiment for i in unchanged
+        ]
+
+        # different instructions are a different transduction
+        await reviews(texts, llm).self_transduction(
+            ["text"], ["sentiment"], instructions="Be terse", incremental_path=path
+        )
+        assert server.n_requests == 23
+
+
+@pytest.mark.asyncio
+async def test_few_shots_are_part_of_the_fingerprint(tmp_path):
+    path = str(tmp_path / "sentiment.fingerprints")
+    with MockLLMServer() as server:
+        llm = AsyncOpenAI(api_key="EMPTY", base_url=server.url, max_retries=0)
+        source = reviews(["review 0", "review 1", "review 2"], llm)
+        source.transduce_fields = ["text"]
+
+        def target(states=()) -> AG:
+            return AG(
+                atype=Review,
+                states=list(states),
+                llm=llm,
+                transduce_fields=["sentiment"],
+                incremental_path=path,
+            )
+
+        await (target() << source)
+        await (target() << source)
+        assert server.n_requests == 3
+        # a filled target state is a few shot example, which changes the prompt
+        await (target([Review(text="review 0", sentiment="positive")]) << source)
+        assert server.n_requests == 6
+
+
+@pytest.mark.asyncio
+async def test_failed_results_are_not_stored(tmp_path, monkeypatch):
+    path = str(tmp_path / "sentiment.fingerprints")
+    execute = PydanticTransducerVLLM.execute
+
+    async def execute_with_none(self, *prompts, **kwargs):
+        # e.g. an agent whose answer could not be parsed
+        results = await execute(self, *prompts, **kwargs)
+        return [None if "2" in x else r for x, r in zip(prompts, results)]
+
+    monkeypatch.setattr(PydanticTransducerVLLM, "execute", execute_with_none)
+    with MockLLMServer() as server:
+        llm = AsyncOpenAI(api_key="EMPTY", base_url=server.url, max_retries=0)
+        output = await reviews(["review 1", "review 2"], llm).self_transduction(
+            ["text"], ["sentiment"], incremental_path=path
+        )
+    assert [x.text for x in output] == ["review 1", "review 2"]
+    assert output[1].sentiment is None
+    assert len(FingerprintStore(path)) == 1
+
+
+def test_fingerprint_covers_tools():
+    args = ("prompt", "instructions", "model", {"type": "object"})
+    assert transduction_fingerprint(*args) == transduction_fingerprint(*args, [])
+    assert transduction_fingerprint(*args, ["search"]) != transduction_fingerprint(
+        *args
+    )
+
+
+@pytest.mark.asyncio
+async def test_duplicate_sources_are_sent_once():
+    metrics.reset()
+    texts = ["good", "bad", "good", "good", "bad", "meh"]
+    with MockLLMServer() as server:
+        llm = AsyncOpenAI(api_key="EMPTY", base_url=server.url, max_retries=0)
+        output = await reviews(texts, llm).self_transduction(["text"], ["sentiment"])
+        assert server.n_requests == 3
+        assert [x.text for x in output] == texts
+        assert output[0].sentiment == output[2].sentiment == output[3].sentiment
+        assert metrics.counters["transduction.deduplicated"] == 3
+        assert metrics.counters["transduction.states"] == 6
+
+        source = reviews(texts, llm)
+        target = source.clone()
+        target.transduce_fields = ["sentiment"]
+        target.deduplicate_sources = False
+        source.transduce_fields = ["text"]
+        await (target << source)
+        assert server.n_requests == 9
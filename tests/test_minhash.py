@@ -0,0 +1,68 @@
+from typing import Optional
+
+import pytest
+from openai import AsyncOpenAI
+from pydantic import BaseModel
+
+from agentics import AG
+from agentics.core.minhash import lsh_bands, near_duplicates
+from benchmarks.mock_llm_server import MockLLMServer
+
+TEXTS = [
+    "The battery of this phone lasts two full days, I am very happy with it.",
+    "The battery of this phone lasts two full days, I am very happy with it!!",
+    "Shipping took three weeks and the box arrived damaged.",
+    "the battery of this phone lasts two full days,  I am very happy with it.",
+    "Shipping took three weeks and the box arrived badly damaged.",
+    "Great screen, terrible speakers.",
+    None,
+]
+
+
+def test_near_duplicates():
+    clusters = near_duplicates(TEXTS, threshold=0.7)
+    assert clusters.labels == [0, 0, 1, 0, 1, 2, 3]
+    assert clusters.representatives == [0, 2, 5, 6]
+    assert clusters.members(0) == [0, 1, 3]
+    assert clusters.similarity[3] == 1.0 and clusters.similarity[1] >= 0.7
+    assert clusters.report()["llm_calls_saved"] == 3
+
+    strict = near_duplicates(TEXTS, threshold=1.0)
+    assert strict.members(0) == [0, 3] and strict.n_clusters == 6
+    with pytest.raises(ValueError):
+        near_duplicates(TEXTS, threshold=0)
+
+
+def test_lsh_bands():
+    bands, rows = lsh_bands(0.8, 128)
+    assert bands * rows <= 128
+    assert abs((1 / bands) ** (1 / rows) - 0.8) < 0.05
+
+
+class Review(BaseModel):
+    text: Optional[str] = None
+    sentiment: Optional[str] = None
+    propagated: Optional[bool] = None
+
+
+@pytest.mark.asyncio
+async def test_transduce_near_duplicates():
+    texts = [x for x in TEXTS if x]
+    source = AG(atype=Review, states=[Review(text=x) for x in texts], llm=None)
+    source.transduce_fields = ["text"]
+    with MockLLMServer() as server:
+        target = AG(
+            atype=Review,
+            llm=AsyncOpenAI(api_key="EMPTY", base_url=server.url, max_retries=0),
+            transduce_fields=["sentiment"],
+        )
+        output = await target.transduce_near_duplicates(
+            source, "text", threshold=0.7, flag_field="propagated"
+        )
+        assert server.n_requests == 3
+    assert [x.text for x in output] == texts
+    assert output[0].sentiment == output[1].sentiment == output[3].sentiment
+    assert output[2].sentiment == output[4].sentiment
+    assert [x.propagated for x in output] == [False, True, False, True, True, False]
+    with pytest.raises(ValueError):
+        await target.transduce_near_duplicates(source, "text", flag_field="unknown")
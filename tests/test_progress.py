@@ -0,0 +1,80 @@
+import asyncio
+from typing import Optional
+
+import pytest
+from pydantic import BaseModel
+
+from agentics.core.metrics import get_metrics, get_progress, metrics
+from agentics.core.progress import (
+    NoProgress,
+    ProgressBackend,
+    resolve_progress_backend,
+    set_progress_backend,
+)
+from agentics.core.utils import async_odered_progress
+
+
+class Item(BaseModel):
+    value: Optional[int] = None
+
+
+@pytest.fixture(autouse=True)
+def reset_backend():
+    metrics.reset()
+    yield
+    set_progress_backend("auto")
+
+
+async def double(item: Item) -> Item:
+    if item.value % 5 == 0:
+        raise ValueError("multiple of five")
+    await asyncio.sleep(0)
+    return Item(value=item.value * 2)
+
+
+@pytest.mark.asyncio
+async def test_counters_are_exposed_in_metrics():
+    set_progress_backend("none")
+    assert resolve_progress_backend() is NoProgress
+
+    results = await async_odered_progress(
+        [Item(value=i) for i in range(1, 21)], double, description="doubling"
+    )
+    assert [r.value for r in results if not isinstance(r, Exception)][:2] == [2, 4]
+
+    snapshot = get_metrics()
+    assert snapshot["progress"] == []
+    (finished,) = snapshot["finished"]
+    assert finished["description"] == "doubling"
+    assert (finished["completed"], finished["failed"], finished["total"]) == (20, 4, 20)
+
+
+@pytest.mark.asyncio
+async def test_custom_backend_sees_live_state():
+    seen = []
+
+    class Recorder(ProgressBackend):
+        def update(self):
+            seen.append(self.state.completed)
+            assert get_progress()[0] is self.state
+
+    set_progress_backend(Recorder)
+    await async_odered_progress([Item(value=i) for i in range(1, 4)], double)
+    assert seen == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_log_backend_is_throttled(monkeypatch):
+    from agentics.core import progress
+
+    lines = []
+    monkeypatch.setattr(progress.LogProgress, "log", lambda self: lines.append(1))
+    set_progress_backend("log")
+    await async_odered_progress([Item(value=i) for i in range(1, 101)], double)
+    # nothing within the interval, one line at the end
+    assert len(lines) == 1
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        set_progress_backend("fancy")
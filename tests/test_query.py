@@ -0,0 +1,234 @@
+from typing import List, Optional
+
+import pytest
+from pydantic import BaseModel
+
+from agentics import AG
+from agentics.core.storage import ProductStates
+
+
+class Question(BaseModel):
+    id: Optional[int] = None
+    db_id: Optional[str] = None
+    difficulty: Optional[int] = None
+    tags: Optional[List[str]] = None
+
+
+def questions(n: int = 12) -> AG:
+    return AG(
+        atype=Question,
+        states=[
+            Question(
+                id=i,
+                db_id=f"db{i % 3}",
+                difficulty=None if i == 5 else i % 4,
+                tags=["a"] if i % 2 else [],
+            )
+            for i in range(n)
+        ],
+        llm=None,
+    )
+
+
+@pytest.mark.parametrize("storage", ["list", "columnar", "disk"])
+def test_where(storage):
+    ag = questions()
+    if storage == "columnar":
+        ag.to_columnar()
+    elif storage == "disk":
+        ag.to_disk()
+    assert [x.id for x in ag.where(db_id="db1")] == [1, 4, 7, 10]
+    assert [x.id for x in ag.where(difficulty__ge=2, difficulty__lt=3)] == [2, 6, 10]
+    assert [x.id for x in ag.where(db_id__in=["db0", "db2"], difficulty__gt=2)] == [
+        3,
+        11,
+    ]
+    assert [x.id for x in ag.where(db_id__ne="db0", tags=["a"])] == [1, 5, 7, 11]
+    assert [x.id for x in ag.where(lambda x: x.id > 8, db_id="db1")] == [10]
+    with pytest.raises(ValueError):
+        ag.where(unknown=1)
+
+
+def test_sort_by():
+    ag = questions()
+    assert [x.id for x in ag.sort_by("difficulty")][:4] == [0, 4, 8, 1]
+    assert ag.sort_by("difficulty")[-1].id == 5
+    assert [x.id for x in ag.sort_by("-difficulty", "id")] == [
+        3,
+        7,
+        11,
+        2,
+        6,
+        10,
+        1,
+        9,
+        0,
+        4,
+        8,
+        5,
+    ]
+    assert [x.id for x in ag.sort_by("db_id", "-id")][:4] == [9, 6, 3, 0]
+
+
+def test_distinct_group_by_and_aggregate():
+    ag = questions()
+    assert [x.id for x in ag.distinct("db_id")] == [0, 1, 2]
+    assert [x.id for x in ag.distinct("db_id", "tags")] == [0, 1, 2, 3, 4, 5]
+    ag.append(Question(id=0, db_id="db0", difficulty=0, tags=[]))
+    assert len(ag.distinct()) == 12
+
+    groups = ag.group_by("db_id")
+    assert {key: len(group) for key, group in groups.items()} == {
+        "db0": 5,
+        "db1": 4,
+        "db2": 4,
+    }
+
+    stats = ag.aggregate(
+        "db_id",
+        n=("id", "count"),
+        hardest=("difficulty", "max"),
+        mean=("difficulty", "mean"),
+        ids=("id", "list"),
+    )
+    assert stats.fields == ["db_id", "n", "hardest", "mean", "ids"]
+    assert stats[1].model_dump() == {
+        "db_id": "db1",
+        "n": 4,
+        "hardest": 3,
+        "mean": 1.5,
+        "ids": [1, 4, 7, 10],
+    }
+
+
+def test_indexes_follow_mutations():
+    ag = questions()
+    assert len(ag.where(db_id="db0")) == 4
+    ag.append(Question(id=12, db_id="db0"))
+    assert [x.id for x in ag.where(db_id="db0")][-1] == 12
+    ag.states = ag.states[:3]
+    assert [x.id for x in ag.where(db_id="db0")] == [0]
+    ag[0].db_id = "db1"
+    assert len(ag.drop_indexes().where(db_id="db1")) == 2
+
+
+@pytest.mark.parametrize("storage", ["list", "columnar", "disk"])
+def test_indexes_follow_assignments(storage):
+    ag = questions()
+    if storage == "columnar":
+        ag.to_columnar()
+    elif storage == "disk":
+        ag.to_disk()
+    assert [x.id for x in ag.sort_by("id")][:2] == [0, 1]
+    assert [x.id for x in ag.where(db_id="db0")] == [0, 3, 6, 9]
+    ag.states[3] = Question(id=-1, db_id="db2")
+    assert [x.id for x in ag.where(db_id="db0")] == [0, 6, 9]
+    assert [x.id for x in ag.sort_by("id")][:2] == [-1, 0]
+    ag.states.append(Question(id=12, db_id="db0"))
+    ag.append(Question(id=13, db_id="db0"))
+    assert [x.id for x in ag.where(db_id="db0")] == [0, 6, 9, 12, 13]
+
+
+class Prediction(BaseModel):
+    id: Optional[int] = None
+    sql: Optional[str] = None
+
+
+class GroundTruth(BaseModel):
+    question_id: Optional[int] = None
+    gold_sql: Optional[str] = None
+
+
+@pytest.mark.parametrize("storage", ["list", "disk"])
+def test_join(storage):
+    ag = questions(6)
+    if storage == "disk":
+        ag.to_disk()
+    predictions = AG(
+        atype=Prediction,
+        states=[Prediction(id=i, sql=f"q{i}") for i in (4, 1, 1, 9)],
+        llm=None,
+    )
+    inner = ag.join(predictions, on="id")
+    assert inner.fields == ["id", "db_id", "difficulty", "tags", "sql"]
+    assert [(x.id, x.sql, x.db_id) for x in inner] == [
+        (1, "q1", "db1"),
+        (1, "q1", "db1"),
+        (4, "q4", "db1"),
+    ]
+    left = ag.join(predictions, on="id", how="left")
+    assert sorted((x.id, x.sql) for x in left) == [
+        (0, None),
+        (1, "q1"),
+        (1, "q1"),
+        (2, None),
+        (3, None),
+        (4, "q4"),
+        (5, None),
+    ]
+    outer = predictions.join(ag, on="id", how="outer")
+    assert len(outer) == 8 and {x.id for x in outer} == set(range(6)) | {9}
+
+    truth = AG(
+        atype=GroundTruth,
+        states=[GroundTruth(question_id=i, gold_sql=f"g{i}") for i in range(20)],
+        llm=None,
+    )
+    joined = ag.join(truth, on={"id": "question_id"})
+    assert [(x.id, x.question_id, x.gold_sql) for x in joined][:2] == [
+        (0, 0, "g0"),
+        (1, 1, "g1"),
+    ]
+    assert len(joined) == 6
+    with pytest.raises(ValueError):
+        ag.join(truth, on="id")
+
+
+class Prompt(BaseModel):
+    prompt: Optional[str] = None
+
+
+def test_lazy_product_and_quotient():
+    prompts = AG(
+        atype=Prompt, states=[Prompt(prompt=f"p{i}") for i in range(3)], llm=None
+    )
+    evaluation = questions(4)
+    product = prompts.product(evaluation)
+    assert isinstance(product.states, ProductStates)
+    assert len(product) == 12
+    assert product[5].model_dump() == {
+        "id": 1,
+        "db_id": "db1",
+        "difficulty": 1,
+        "tags": ["a"],
+        "prompt": "p1",
+    }
+    assert [(x.prompt, x.id) for x in product][3:5] == [("p0", 3), ("p1", 0)]
+    assert next(product.states.iter_dicts(["prompt"])) == {"prompt": "p0"}
+
+    segments = evaluation.quotient(product, project=False)
+    assert len(segments) == 3
+    assert isinstance(segments[2].states, ProductStates)
+    assert {x.prompt for x in segments[2]} == {"p2"}
+    segments = evaluation.quotient(product)
+    assert segments[1].atype is Question and segments[1].states == evaluation.states
+
+    product.states[0] = Prompt(prompt="changed")
+    assert product[0].prompt == "changed" and len(product) == 12
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_concat(columnar):
+    parts = [questions(3), questions(2), questions(4)]
+    if columnar:
+        for part in parts:
+            part.to_columnar()
+    ag = AG.concat(*parts)
+    assert [x.id for x in ag] == [0, 1, 2, 0, 1, 0, 1, 2, 3]
+    assert ag.is_columnar == columnar
+    ag.states[0] = Question(id=100)
+    assert parts[0][0].id == 0
+    mixed = AG.concat(
+        questions(2), AG(atype=Prediction, states=[Prediction(id=7)], llm=None)
+    )
+    assert mixed.atype is Question and [x.id for x in mixed] == [0, 1, 7]
@@ -0,0 +1,90 @@
+import csv
+import json
+import random
+from collections import Counter
+from typing import Optional
+
+import pytest
+from pydantic import BaseModel
+
+from agentics import AG
+from agentics.core.sampling import reservoir_sample, stratified_sample
+
+
+def test_reservoir_sample_is_uniform():
+    counts = Counter()
+    for seed in range(2000):
+        sample = reservoir_sample(range(20), 5, random.Random(seed))
+        assert len(sample) == 5 and sample == sorted(set(sample))
+        counts.update(sample)
+    assert all(400 < counts[i] < 600 for i in range(20))
+    assert reservoir_sample(range(3), 5) == [0, 1, 2]
+    assert reservoir_sample(range(3), 0) == []
+    assert reservoir_sample(range(100), 10, random.Random(1)) == reservoir_sample(
+        range(100), 10, random.Random(1)
+    )
+
+
+def test_stratified_sample():
+    items = [(i, "rare" if i % 10 == 0 else "common") for i in range(100)]
+    sample = stratified_sample(items, 4, key=lambda x: x[1], rng=random.Random(0))
+    assert Counter(label for _, label in sample) == {"rare": 4, "common": 4}
+    assert sample == sorted(sample)
+
+
+class Review(BaseModel):
+    id: Optional[int] = None
+    label: Optional[str] = None
+
+
+def reviews(n: int) -> AG:
+    return AG(
+        atype=Review,
+        states=[Review(id=i, label="pos" if i % 4 else "neg") for i in range(n)],
+        llm=None,
+    )
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_get_random_sample(columnar):
+    ag = reviews(40)
+    if columnar:
+        ag.to_columnar()
+    sample = ag.get_random_sample(0.25, seed=3)
+    assert len(sample) == 10 and len({x.id for x in sample}) == 10
+    assert [x.id for x in sample] == [x.id for x in ag.get_random_sample(0.25, seed=3)]
+    sample[0].label = "changed"
+    assert all(x.label != "changed" for x in ag)
+
+    stratified = ag.get_random_sample(0.5, seed=0, stratify_by="label")
+    assert Counter(x.label for x in stratified) == {"pos": 15, "neg": 5}
+
+
+def test_sample_files(tmp_path):
+    jsonl = tmp_path / "reviews.jsonl"
+    jsonl.write_text(
+        "".join(
+            json.dumps({"id": i, "label": "pos" if i % 4 else "neg"}) + "\n"
+            for i in range(1000)
+        )
+    )
+    sample = AG.sample_jsonl(str(jsonl), 50, atype=Review, seed=7, llm=None)
+    ids = [x.id for x in sample]
+    assert len(ids) == 50 and ids == sorted(set(ids))
+    assert ids == [x.id for x in AG.sample_jsonl(str(jsonl), 50, seed=7, llm=None)]
+    stratified = AG.sample_jsonl(str(jsonl), 20, seed=7, stratify_by="label", llm=None)
+    assert Counter(x.label for x in stratified) == {"pos": 20, "neg": 20}
+
+    path = tmp_path / "reviews.csv"
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "label"])
+        writer.writerows([i, "pos" if i % 4 else "neg"] for i in range(1000))
+    sample = AG.sample_csv(str(path), 50, seed=7, llm=None)
+    assert [int(x.id) for x in sample] == ids
+    stratified = AG.sample_csv(
+        str(path), 3, atype=Review, stratify_by="label", llm=None
+    )
+    assert sorted(x.label for x in stratified) == ["neg"] * 3 + ["pos"] * 3
+    with pytest.raises(ValueError):
+        AG.sample_csv(str(path), 3, stratify_by="unknown")
@@ -0,0 +1,489 @@
+import json
+from copy import deepcopy
+from typing import Any, List, Optional
+
+import pandas as pd
+import pytest
+from pydantic import BaseModel, Field, ValidationError, field_validator
+
+from agentics import AG
+from agentics.core.atype import states_adapter, validate_states
+from agentics.core.llm_connections import available_llms
+from agentics.core.storage import ColumnarStates, SQLiteStates
+from agentics.core.utils import iter_json_array
+
+
+class Address(BaseModel):
+    city: Optional[str] = None
+    zip: Optional[int] = None
+
+
+class Person(BaseModel):
+    name: Optional[str] = None
+    age: Optional[int] = None
+    score: Optional[float] = None
+    tags: Optional[List[str]] = None
+    address: Optional[Address] = None
+    extra: Optional[dict] = None
+
+
+def people(n: int) -> List[Person]:
+    return [
+        Person(
+            name=f"person {i}",
+            age=i,
+            score=i / 2,
+            tags=[str(i)] * (i % 3),
+            address=Address(city="Rome", zip=i) if i % 2 else None,
+            extra={"i": i} if i % 4 == 0 else None,
+        )
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+def no_llm(monkeypatch):
+    """Loaders build AGs with the default llm provider"""
+    monkeypatch.setitem(available_llms, "none", None)
+
+
+def test_round_trip():
+    states = people(50)
+    store = ColumnarStates.from_states(Person, states)
+    assert len(store) == 50
+    assert list(store) == states
+    assert store[7] == states[7]
+    assert store[-1] == states[-1]
+    assert list(store[10:20:3]) == states[10:20:3]
+    assert store.column("age") == list(range(50))
+
+
+def test_mutations():
+    states = people(10)
+    store = ColumnarStates.from_states(Person, states)
+    store[3] = Person(name="changed")
+    store.append(Person(name="last"))
+    store.insert(0, Person(name="first"))
+    del store[5]
+    states[3] = Person(name="changed")
+    states.append(Person(name="last"))
+    states.insert(0, Person(name="first"))
+    del states[5]
+    assert list(store) == states
+    assert [row["name"] for row in store.iter_dicts(["name"])] == [
+        x.name for x in states
+    ]
+
+
+def test_compaction_rebuilds_patched_batches_only():
+    from agentics.core.storage import BATCH_SIZE
+
+    states = people(3 * BATCH_SIZE)
+    store = ColumnarStates.from_states(Person, states)
+    untouched = store.table.slice(2 * BATCH_SIZE).column("name").chunks[0]
+    store[5] = states[5] = Person(name="patched", extra={"nested": [1]})
+    store.append(Person(name="appended"))
+    states.append(Person(name="appended"))
+    table = store.table
+    assert list(store) == states
+    # the rows after the patched batch still point to the same arrow buffers
+    chunk = table.slice(2 * BATCH_SIZE, 10).column("name").chunks[0]
+    assert chunk.buffers()[2].address == untouched.buffers()[2].address
+
+
+def test_deepcopy_is_independent():
+    store = ColumnarStates.from_states(Person, people(5))
+    copied = deepcopy(store)
+    copied[0] = Person(name="copy")
+    assert store[0].name == "person 0"
+    assert copied[0].name == "copy"
+
+
+def test_ag_columnar_operations():
+    ag = AG(atype=Person, states=people(20), llm=None).to_columnar()
+    assert ag.is_columnar
+    assert isinstance(ag.states, ColumnarStates)
+    assert ag[4].age == 4
+    assert ag.column("score")[4] == 2.0
+    ag.filter_states(0, 10)
+    assert len(ag) == 10
+    assert [state.age for state in ag] == list(range(10))
+    assert ag.to_list().states == people(10)
+
+
+def test_columnar_loaders(tmp_path, no_llm):
+    ag = AG(atype=Person, states=people(30), llm=None)
+    ag.to_jsonl(tmp_path / "people.jsonl")
+    loaded = AG.from_jsonl(tmp_path / "people.jsonl", atype=Person, columnar=True)
+    assert loaded.is_columnar
+    assert list(loaded.states) == ag.states
+    assert (
+        len(
+            AG.from_jsonl(
+                tmp_path / "people.jsonl", atype=Person, max_rows=5, columnar=True
+            )
+        )
+        == 5
+    )
+
+    df = pd.DataFrame({"name": ["a", "b", "c"], "age": [1, 2, 3]})
+    loaded = AG.from_dataframe(df, atype=Person, columnar=True)
+    assert loaded.to_dataframe()[["name", "age"]].to_dict("records") == df.to_dict(
+        "records"
+    )
+
+
+def test_columnar_csv(tmp_path, no_llm):
+    path = tmp_path / "people.csv"
+    path.write_text("name,age,unused\na,1,x\n,2,y\nc,3,z\n")
+    expected = AG.from_csv(path, atype=Person)
+    loaded = AG.from_csv(path, atype=Person, columnar=True)
+    assert loaded.is_columnar
+    assert list(loaded.states) == expected.states
+    assert len(AG.from_csv(path, atype=Person, max_rows=2, columnar=True)) == 2
+
+    path.write_text("name,age\na,not a number\n")
+    with pytest.raises(Exception):
+        AG.from_csv(path, atype=Person, columnar=True)
+
+
+def test_parquet_round_trip(tmp_path, no_llm):
+    path = tmp_path / "people.parquet"
+    ag = AG(atype=Person, states=people(100), llm=None)
+    ag.to_parquet(path, row_group_size=16)
+    loaded = AG.from_parquet(path, atype=Person, batch_rows=10)
+    assert loaded.is_columnar
+    assert list(loaded.states) == ag.states
+    assert AG.from_parquet(path, atype=Person, columnar=False).states == ag.states
+    assert len(AG.from_parquet(path, atype=Person, max_rows=25)) == 25
+    chunks = list(AG.iter_parquet(path, atype=Person, batch_rows=16, max_rows=40))
+    assert [len(chunk) for chunk in chunks] == [16, 16, 8]
+    assert [x for chunk in chunks for x in chunk.states] == ag.states[:40]
+
+
+def test_parquet_map_columns(tmp_path, no_llm):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = tmp_path / "maps.parquet"
+    attributes = pa.array(
+        [[("color", "red")], None, []], type=pa.map_(pa.string(), pa.string())
+    )
+    pq.write_table(pa.table({"name": ["a", "b", "c"], "attributes": attributes}), path)
+    for columnar in (True, False):
+        loaded = AG.from_parquet(path, columnar=columnar)
+        assert [x.attributes for x in loaded] == [{"color": "red"}, None, {}]
+    assert loaded.to_columnar().states.column("attributes")[0] == {"color": "red"}
+
+
+def test_parquet_projection_and_inference(tmp_path, no_llm):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = tmp_path / "wide.parquet"
+    pq.write_table(
+        pa.table(
+            {
+                "First Name": ["a", "b"],
+                "age": pa.array([1, 2], type=pa.int32()),
+                "tags": [["x"], []],
+                "address": [{"city": "Rome", "zip": 1}, None],
+                "unused": [1.0, 2.0],
+            }
+        ),
+        path,
+    )
+    loaded = AG.from_parquet(path, columns=["First Name", "age", "tags", "address"])
+    assert list(loaded.atype.model_fields) == ["FirstName", "age", "tags", "address"]
+    assert loaded[0].FirstName == "a"
+    assert loaded[0].address.city == "Rome"
+    assert loaded[1].tags == []
+
+    projected = AG.from_parquet(path, atype=Person)
+    assert projected.states.table.column_names == list(Person.model_fields)
+    assert projected[0].age == 1 and projected[0].name is None
+
+
+@pytest.mark.parametrize("buffer_size", [1, 7, 1 << 16])
+def test_iter_json_array(tmp_path, buffer_size):
+    items = [{"a": i, "text": "x]" * i} for i in range(50)] + [12345, "s", [], None]
+    path = tmp_path / "items.json"
+    path.write_text(json.dumps(items, indent=2))
+    assert list(iter_json_array(path, buffer_size=buffer_size)) == items
+
+    path.write_text("[1, 2")
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_array(path, buffer_size=buffer_size))
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_chunked_readers(tmp_path, no_llm, columnar):
+    ag = AG(atype=Person, states=people(25), llm=None)
+    ag.to_jsonl(tmp_path / "people.jsonl")
+    (tmp_path / "people.json").write_text(
+        json.dumps([state.model_dump() for state in ag.states])
+    )
+
+    chunks = list(
+        AG.iter_jsonl(
+            tmp_path / "people.jsonl", atype=Person, chunk_size=10, columnar=columnar
+        )
+    )
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    assert [state for chunk in chunks for state in chunk] == ag.states
+
+    chunks = list(
+        AG.iter_jsonl(
+            tmp_path / "people.json",
+            atype=Person,
+            jsonl=False,
+            chunk_size=10,
+            max_rows=12,
+            columnar=columnar,
+        )
+    )
+    assert [len(chunk) for chunk in chunks] == [10, 2]
+    assert (
+        AG.from_jsonl(tmp_path / "people.json", atype=Person, jsonl=False).states
+        == ag.states
+    )
+
+    (tmp_path / "people.csv").write_text("Full Name,age\na,1\nb,2\nc,3\n")
+    chunks = list(AG.iter_csv(tmp_path / "people.csv", chunk_size=2))
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    assert chunks[1][0].FullName == "c"
+    assert len(AG.from_csv(tmp_path / "people.csv", max_rows=2)) == 2
+
+
+def test_validate_states():
+    rows = [state.model_dump() for state in people(20)]
+    assert validate_states(Person, rows) == people(20)
+    assert states_adapter(Person) is states_adapter(Person)
+    trusted = validate_states(Person, [{"name": "a", "age": 1}], trusted=True)
+    assert trusted[0].age == 1 and trusted[0].model_fields_set == {"name", "age"}
+    with pytest.raises(ValidationError):
+        validate_states(Person, [{"age": 1}, {"age": "not a number"}])
+
+
+def test_trusted_loaders(tmp_path, no_llm):
+    df = pd.DataFrame({"name": ["a", "b", "c"], "age": [1, 2, 3]}, index=[5, 6, 7])
+    loaded = AG.from_dataframe(df, atype=Person, max_rows=2, trusted=True)
+    assert [state.name for state in loaded] == ["a", "b"]
+    path = tmp_path / "people.jsonl"
+    AG(atype=Person, states=people(10), llm=None).to_jsonl(path)
+    assert AG.from_jsonl(path, atype=Person, trusted=True).column("age") == list(
+        range(10)
+    )
+
+
+@pytest.mark.parametrize("suffix", ["jsonl", "jsonl.gz", "jsonl.zst"])
+@pytest.mark.parametrize("columnar", [False, True])
+def test_to_jsonl(tmp_path, no_llm, suffix, columnar):
+    if suffix.endswith("zst"):
+        pytest.importorskip("zstandard")
+    ag = AG(atype=Person, states=people(40), llm=None)
+    if columnar:
+        ag.to_columnar()
+    path = tmp_path / f"people.{suffix}"
+    ag.to_jsonl(path, chunk_size=16, workers=2)
+    assert AG.from_jsonl(path, atype=Person).states == people(40)
+
+
+class Opaque:
+    def __str__(self):
+        raise TypeError("not serializable")
+
+
+class Loose(BaseModel):
+    model_config = {"arbitrary_types_allowed": True}
+    name: Optional[str] = None
+    value: Optional[Any] = None
+
+
+def test_to_jsonl_line_framing(tmp_path, no_llm):
+    states = [Loose(name="a"), Loose(name="b", value=Opaque()), Loose(name="c")]
+    states.append(Loose(name="d", value=Loose))
+    path = tmp_path / "loose.jsonl"
+    AG(atype=Loose, states=states, llm=None).to_jsonl(path)
+    lines = path.read_text().splitlines()
+    assert [json.loads(line).get("name") for line in lines] == ["a", None, "c", "d"]
+    assert json.loads(lines[3])["value"] == "Loose"
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_clone_is_copy_on_write(columnar):
+    ag = AG(atype=Person, states=people(4), llm=None)
+    if columnar:
+        ag.to_columnar()
+        ag.append(Person(name="tail", tags=["x"]))
+    clone = ag.clone()
+    state = clone[0]
+    state.name = "changed"
+    clone.states[0] = state
+    clone[-1].name = "changed"
+    assert ag[0].name == "person 0"
+    assert ag[-1].name != "changed"
+    assert len(clone) == len(ag)
+
+
+def test_clone_shares_field_values():
+    ag = AG(atype=Person, states=people(4), llm=None)
+    clone = ag.clone()
+    assert clone[1] == ag[1] and clone[1] is not ag[1]
+    assert clone[1].address is ag[1].address
+    clone[1].address = Address(city="Paris")
+    assert ag[1].address.city == "Rome"
+    assert clone[1].model_fields_set == ag[1].model_fields_set
+
+    deep = ag.clone(deep=True)
+    assert deep[1].address == ag[1].address
+    assert deep[1].address is not ag[1].address
+
+
+class Defaults(BaseModel):
+    name: Optional[str] = None
+    count: int = 0
+    label: str = "none"
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_dataframe_round_trip(no_llm, columnar):
+    df = pd.DataFrame(
+        {"name": ["a", None, "c"], "age": [1, 2, 3], "score": [0.5, None, 1.5]},
+        index=["x", "y", "z"],
+    )
+    ag = AG.from_dataframe(df, atype=Person, columnar=columnar)
+    assert [state.name for state in ag] == ["a", None, "c"]
+    assert ag[1].score is None and ag[2].age == 3
+    out = ag.to_dataframe()
+    assert list(out.columns) == list(Person.model_fields)
+    assert out["age"].tolist() == [1, 2, 3]
+    assert out["address"].isna().all()
+
+    df = pd.DataFrame({"name": ["a", "b"], "count": [1, 2]})
+    ag = AG.from_dataframe(df, atype=Defaults, columnar=columnar)
+    assert [state.label for state in ag] == ["none", "none"]
+    assert [state.count for state in ag] == [1, 2]
+
+    with pytest.raises(ValidationError):
+        AG.from_dataframe(pd.DataFrame({"count": ["x"]}), Defaults, columnar=columnar)
+
+
+class Checked(BaseModel):
+    name: Optional[str] = None
+    age: Optional[int] = Field(None, ge=0)
+
+    @field_validator("name")
+    @classmethod
+    def upper(cls, value: Optional[str]) -> Optional[str]:
+        return value.upper() if value else value
+
+
+def test_columnar_loaders_run_validators(tmp_path, no_llm):
+    df = pd.DataFrame({"name": ["a", "b"], "age": [1, 2]})
+    ag = AG.from_dataframe(df, atype=Checked, columnar=True)
+    assert ag.states.column("name") == ["A", "B"]
+    with pytest.raises(ValidationError):
+        AG.from_dataframe(pd.DataFrame({"age": [-5]}), Checked, columnar=True)
+
+    path = tmp_path / "checked.csv"
+    df.to_csv(path, index=False)
+    assert AG.from_csv(path, atype=Checked, columnar=True).states.column("name") == [
+        "A",
+        "B",
+    ]
+
+
+def test_to_dataframe_nested_states():
+    ag = AG(atype=Person, states=people(3), llm=None)
+    out = ag.to_dataframe()
+    assert out.to_dict("records")[1]["address"] == {"city": "Rome", "zip": 1}
+    assert out["tags"].tolist() == [[], ["1"], ["2", "2"]]
+
+
+def test_sqlite_round_trip_and_mutations():
+    states = people(50)
+    store = SQLiteStates.from_states(Person, states, page_size=8, cache_pages=2)
+    assert len(store) == 50
+    assert list(store) == states
+    assert store[7] == states[7] and store[-1] == states[-1]
+    assert list(store[10:20:3]) == states[10:20:3]
+    assert store.column("age") == list(range(50))
+    store[3] = Person(name="changed")
+    store.insert(0, None)
+    store.append(Person(name="last"))
+    del store[5]
+    states[3] = Person(name="changed")
+    states.insert(0, None)
+    states.append(Person(name="last"))
+    del states[5]
+    assert list(store) == states
+    copied = deepcopy(store)
+    copied[1] = Person(name="copy")
+    assert store[1] == states[1]
+    assert store.empty().atype is Person and len(store.empty()) == 0
+
+
+def test_sqlite_reclaims_replaced_rows(tmp_path):
+    path = str(tmp_path / "people.sqlite")
+    store = SQLiteStates.from_states(Person, people(100), path, commit_every=50)
+    view = store[:10]
+    for n in range(10):
+        for i in range(100):
+            store[i] = Person(name=f"round {n}", age=i)
+    assert store._db.n_rows <= 2 * 110 + 50
+    assert list(view) == people(10)
+    assert [x.name for x in store] == ["round 9"] * 100
+    store.close()
+    assert list(SQLiteStates(Person, path))[-1] == Person(name="round 9", age=99)
+
+
+def test_sqlite_persistence(tmp_path):
+    path = str(tmp_path / "people.sqlite")
+    store = SQLiteStates.from_states(Person, people(30), path)
+    del store[0]
+    store.close()
+    assert list(SQLiteStates(Person, path)) == people(30)[1:]
+
+
+@pytest.mark.asyncio
+async def test_ag_on_disk(tmp_path, no_llm):
+    ag = AG(atype=Person, states=people(40), llm=None).to_disk()
+    assert isinstance(ag.states, SQLiteStates)
+    ag.states.map_chunk_size = 16
+
+    async def older(state: Person) -> Person:
+        state.age += 1
+        return state
+
+    await ag.amap(older)
+    assert isinstance(ag.states, SQLiteStates)
+    assert ag.column("age") == list(range(1, 41))
+    ag.filter_states(10, 20)
+    assert [state.age for state in ag] == list(range(11, 21))
+    path = tmp_path / "people.jsonl"
+    ag.to_jsonl(path, chunk_size=4)
+    assert AG.from_jsonl(path, atype=Person).column("age") == list(range(11, 21))
+
+
+@pytest.mark.asyncio
+async def test_transduction_reads_columnar_sources_as_rows(monkeypatch):
+    from openai import AsyncOpenAI
+
+    from benchmarks.mock_llm_server import MockLLMServer
+
+    class Summary(BaseModel):
+        name: Optional[str] = None
+        summary: Optional[str] = None
+
+    source = AG(atype=Person, states=people(10), llm=None).to_columnar()
+    monkeypatch.setattr(
+        ColumnarStates, "__iter__", lambda self: pytest.fail("materialized states")
+    )
+    with MockLLMServer() as server:
+        llm = AsyncOpenAI(api_key="EMPTY", base_url=server.url, max_retries=0)
+        source.llm = llm
+        target = AG(atype=Summary, llm=llm, transduce_fields=["summary"])
+        output = await (target << source)
+    assert [x.name for x in output] == [f"person {i}" for i in range(10)]
+    assert all(x.summary for x in output)
@@ -0,0 +1,90 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from crewai.tools import BaseTool
+
+from agentics.core.tools import (
+    CachedTool,
+    ParallelTools,
+    ToolCache,
+    prepare_tools,
+    tool_call_key,
+)
+
+
+class SlowSearch(BaseTool):
+    name: str = "web_search"
+    description: str = "Searches the web"
+    n_calls: int = 0
+
+    def _run(self, query: str) -> str:
+        self.n_calls += 1
+        time.sleep(0.2)
+        return f"results for {query}"
+
+
+def test_tool_call_key():
+    assert tool_call_key("t", {"b": 1, "a": " x "}) == tool_call_key(
+        "t", {"a": "x", "b": 1}
+    )
+    assert tool_call_key("t", {"a": 1}) != tool_call_key("u", {"a": 1})
+
+
+def test_positional_and_keyword_arguments_are_keyed_apart():
+    class Echo(BaseTool):
+        name: str = "echo"
+        description: str = "Echoes its arguments"
+
+        def _run(self, *args, **kwargs) -> str:
+            return json.dumps([args, kwargs])
+
+    [cached] = prepare_tools([Echo()], ttl=None, cache=ToolCache())
+    assert cached.run("x") != cached.run(args=["x"])
+
+
+def test_cached_tool_reuses_results_until_expiry():
+    search = SlowSearch()
+    [cached, parallel] = prepare_tools(
+        [search], ttl=0.5, parallel=True, cache=ToolCache()
+    )
+    assert isinstance(cached, CachedTool) and isinstance(parallel, ParallelTools)
+    assert cached.name == "web_search" and cached.args_schema == search.args_schema
+
+    assert cached.run(query="agentics") == "results for agentics"
+    assert cached.run(query=" agentics ") == "results for agentics"
+    assert search.n_calls == 1
+    time.sleep(0.5)
+    cached.run(query="agentics")
+    assert search.n_calls == 2
+
+    [uncached] = prepare_tools([search])
+    assert uncached is search
+
+
+def test_concurrent_identical_calls_run_once():
+    search = SlowSearch()
+    [cached] = prepare_tools([search], ttl=None, cache=ToolCache())
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: cached.run(query="same"), range(8)))
+    assert results == ["results for same"] * 8
+    assert search.n_calls == 1
+
+
+def test_parallel_tool_calls():
+    search = SlowSearch()
+    _, parallel = prepare_tools([search], parallel=True)
+    start = time.perf_counter()
+    results = json.loads(
+        parallel.run(
+            calls=[
+                {"tool": "web_search", "arguments": {"query": f"q{i}"}}
+                for i in range(5)
+            ]
+            + [{"tool": "unknown", "arguments": {}}]
+        )
+    )
+    assert time.perf_counter() - start < 0.5
+    assert [x["result"] for x in results[:5]] == [f"results for q{i}" for i in range(5)]
+    assert results[5]["result"].startswith("Error")
+    assert search.n_calls == 5
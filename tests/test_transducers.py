@@ -0,0 +1,136 @@
+import time
+from typing import Optional
+
+import pytest
+from crewai import LLM
+from openai import AsyncOpenAI
+from pydantic import BaseModel
+
+from agentics import AG
+from benchmarks.mock_llm_server import MockLLMServer
+
+
+@pytest.mark.asyncio
+async def test_raw_prompts_run_concurrently():
+    with MockLLMServer(latency="fixed:100") as server:
+        llm = AsyncOpenAI(api_key="EMPTY", base_url=server.url, max_retries=0)
+        ag = AG(llm=llm)
+
+        start = time.perf_counter()
+        answers = await (ag << [f"prompt {i}" for i in range(20)])
+        assert time.perf_counter() - start < 1
+        assert len(answers) == 20
+        assert all(x.startswith("mock completion") for x in answers)
+
+        ag.max_concurrency = 5
+        start = time.perf_counter()
+        await (ag << [f"prompt {i}" for i in range(20)])
+        assert time.perf_counter() - start >= 0.4
+        assert server.n_requests == 40
+
+        assert (await (ag << "a single prompt")).startswith("mock completion")
+
+
+class BlockingLLM:
+    """An LLM with a synchronous call only, like the CrewAI LLM"""
+
+    model = "blocking"
+
+    def call(self, prompt: str) -> str:
+        time.sleep(0.1)
+        if prompt == "fail":
+            raise ValueError(prompt)
+        return prompt.upper()
+
+
+@pytest.mark.asyncio
+async def test_blocking_llm_calls_run_in_threads():
+    ag = AG(llm=BlockingLLM())
+    start = time.perf_counter()
+    answers = await (ag << ["a", "b", "fail", "c", "d", "e"])
+    assert answers == ["A", "B", "fail", "C", "D", "E"]
+    assert time.perf_counter() - start < 0.6
+    with pytest.raises(ValueError):
+        await (ag << "fail")
+
+
+class Summary(BaseModel):
+    title: Optional[str] = None
+    n_words: Optional[int] = None
+
+
+@pytest.mark.asyncio
+async def test_structured_output_without_tools():
+    with MockLLMServer() as server:
+        llm = LLM(model="openai/mock", api_key="EMPTY", base_url=server.url)
+        source = AG(
+            atype=Summary, states=[Summary(title=f"t{i}") for i in range(5)], llm=llm
+        )
+        output = await source.self_transduction(["title"], ["n_words"])
+        # one completion per state, no agent iterations
+        assert server.n_requests == 5
+        assert all(isinstance(x.n_words, int) for x in output)
+        assert [x.title for x in output] == [f"t{i}" for i in range(5)]
+
+
+@pytest.mark.asyncio
+async def test_structured_output_timeout(monkeypatch):
+    import litellm
+
+    from agentics.core.async_executor import COMPLETION_TIMEOUT
+
+    timeouts = []
+
+    async def hang(**kwargs):
+        # a hung provider call is cut by the timeout of the AG
+        timeouts.append(kwargs.get("timeout"))
+        raise litellm.Timeout("timed out", model="mock", llm_provider="mock")
+
+    monkeypatch.setattr(litellm, "acompletion", hang)
+    llm = LLM(model="openai/mock", api_key="EMPTY", base_url="http://127.0.0.1:9/v1")
+    source = AG(
+        atype=Summary, states=[Summary(title="t")], llm=llm, transduction_timeout=7
+    )
+    output = await source.self_transduction(["title"], ["n_words"])
+    assert timeouts and set(timeouts) == {7}
+
+    timeouts.clear()
+    await AG(atype=Summary, states=[Summary(title="t")], llm=llm).self_transduction(
+        ["title"], ["n_words"]
+    )
+    assert set(timeouts) == {COMPLETION_TIMEOUT}
+    assert output[0].title == "t" and output[0].n_words is None
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_agents_without_json_schema(monkeypatch):
+    import litellm
+
+    from agentics.core.async_executor import (
+        PydanticTransducerCrewAI,
+        PydanticTransducerLiteLLM,
+    )
+
+    completions, kickoffs = [], []
+
+    async def reject(self, input):
+        completions.append(input)
+        raise litellm.UnsupportedParamsError(
+            message="response_format is not supported", llm_provider="mock"
+        )
+
+    async def kickoff(self, input):
+        kickoffs.append(input)
+        return self.atype(n_words=len(input.split()))
+
+    monkeypatch.setattr(PydanticTransducerLiteLLM, "_complete", reject)
+    monkeypatch.setattr(PydanticTransducerCrewAI, "_execute", kickoff)
+    llm = LLM(model="openai/mock", api_key="EMPTY", base_url="http://127.0.0.1:9/v1")
+    source = AG(
+        atype=Summary, states=[Summary(title=f"t{i}") for i in range(3)], llm=llm
+    )
+    source.max_concurrency = 1
+    output = await source.self_transduction(["title"], ["n_words"])
+    assert len(completions) == 1 and len(kickoffs) == 3
+    assert [x.title for x in output] == [f"t{i}" for i in range(3)]
+    assert all(isinstance(x.n_words, int) for x in output)